@@ -2,14 +2,25 @@
 from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session, load_only, joinedload
+from sqlalchemy import or_, and_, tuple_, text, Integer, Float
+from sqlalchemy.exc import DBAPIError
 from typing import List, Optional
 import uvicorn
+import os
 from datetime import datetime, date
 
-from models import Turma, Aluno, TurmaCreate, TurmaUpdate, AlunoCreate, AlunoUpdate, MatriculaCreate
+from models import Turma, Aluno, TurmaCreate, TurmaUpdate, AlunoCreate, AlunoUpdate, MatriculaCreate, MatriculaLoteCreate
+import database
 from database import get_db, init_db
+from busca import SQL_BUSCA_FTS, expressao_fts, expressao_fulltext
+from estatisticas import SQL_ESTATISTICAS, cache_estatisticas, montar_estatisticas
+from paginacao import selecionar_campos, codificar_cursor, decodificar_cursor, LIMITE_PADRAO, LIMITE_MAXIMO
+from contador_queries import instalar_contador, LimiteQueries
+from metricas import instalar_metricas, instalar_sqlalchemy, stats_pool_sqlalchemy
+from perfil_sql import instalar_perfil, instalar_perfil_sqlalchemy
+from matriculas import travar_turma, matricular_alunos, turma_lotada, MOTIVO_LOTADA
+from disjuntor import CircuitoAberto
 
 app = FastAPI(
     title="Sistema de Gestão Escolar",
@@ -26,6 +37,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Contador de queries por requisição (opcional, para pegar regressões N+1)
+# ESCOLA_MAX_QUERIES=N denuncia requisições acima de N statements;
+# ESCOLA_MAX_QUERIES_ESTRITO=1 faz a requisição falhar (útil em testes)
+MAX_QUERIES = os.getenv("ESCOLA_MAX_QUERIES")
+if MAX_QUERIES:
+    database.ao_criar_engine(instalar_contador)
+    app.add_middleware(
+        LimiteQueries,
+        limite=int(MAX_QUERIES),
+        estrito=os.getenv("ESCOLA_MAX_QUERIES_ESTRITO", "0") == "1",
+    )
+
+# Métricas Prometheus em GET /metrics (ESCOLA_METRICAS=0 desliga)
+# (o engine é criado sob demanda; os listeners entram quando ele existir)
+database.ao_criar_engine(instalar_sqlalchemy)
+metricas = instalar_metricas(app, "app", {
+    "pool": lambda: stats_pool_sqlalchemy(database.engine) if database.engine_criado() else {},
+    "disjuntor": lambda: database.disjuntor.stats() if database.disjuntor else {},
+})
+
+# MySQL fora do ar com o disjuntor aberto e sem failover: recusa na hora, sem esperar timeout
+@app.exception_handler(CircuitoAberto)
+async def circuito_aberto(request, exc: CircuitoAberto):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Banco de dados temporariamente indisponível"},
+        headers={"Retry-After": str(max(1, round(exc.tentar_em)))},
+    )
+
+# Perfil de SQL por requisição: X-Query-Count / X-DB-Time e log de queries lentas (ESCOLA_PERFIL_SQL=1)
+database.ao_criar_engine(instalar_perfil_sqlalchemy)
+instalar_perfil(app)
+
 # Inicializar banco de dados na inicialização
 @app.on_event("startup")
 async def startup_event():
@@ -35,29 +79,70 @@ async def startup_event():
 @app.get("/health")
 async def health_check():
     """Endpoint para verificar se a API está funcionando"""
-    return {"status": "ok", "message": "Sistema de Gestão Escolar API"}
+    resposta = {"status": "ok", "message": "Sistema de Gestão Escolar API"}
+    if database.disjuntor:
+        resposta["banco"] = database.disjuntor.estado
+    return resposta
 
 # === ENDPOINTS DE ALUNOS ===
 
-@app.get("/alunos", response_model=List[dict])
+def filtrar_busca(query, search: str):
+    """
+    Aplica o filtro de busca por nome/email.
+    Usa o índice textual do banco (FTS5/FULLTEXT, sem acentos e por prefixo)
+    e cai para LIKE quando não houver índice. Retorna (query, ordem_relevancia).
+    """
+    busca_textual = database.busca_textual(query.session.get_bind())
+    if busca_textual == "fts5" and expressao_fts(search):
+        fts = (
+            text(SQL_BUSCA_FTS.replace("?", ":busca"))
+            .bindparams(busca=expressao_fts(search))
+            .columns(id=Integer, rank=Float)
+            .subquery("busca")
+        )
+        return query.join(fts, fts.c.id == Aluno.id), fts.c.rank
+    
+    if busca_textual == "fulltext" and expressao_fulltext(search):
+        match = text("MATCH(alunos.nome, alunos.email) AGAINST (:busca IN BOOLEAN MODE)").bindparams(
+            busca=expressao_fulltext(search)
+        )
+        return query.filter(match), text(
+            "MATCH(alunos.nome, alunos.email) AGAINST (:busca_rank IN BOOLEAN MODE) DESC"
+        ).bindparams(busca_rank=expressao_fulltext(search))
+    
+    return query.filter(
+        or_(
+            Aluno.nome.ilike(f"%{search}%"),
+            Aluno.email.ilike(f"%{search}%")
+        )
+    ), None
+
+CAMPOS_ALUNO = ["id", "nome", "data_nascimento", "email", "status", "turma_id", "turma_nome"]
+
+@app.get("/alunos")
 async def listar_alunos(
     search: Optional[str] = Query(None, description="Buscar por nome ou email"),
     turma_id: Optional[int] = Query(None, description="Filtrar por turma"),
     status: Optional[str] = Query(None, description="Filtrar por status (ativo/inativo)"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO, description="Itens por página"),
+    after: Optional[str] = Query(None, description="next_cursor da página anterior"),
     db: Session = Depends(get_db)
 ):
-    """Listar alunos com filtros opcionais"""
+    """Listar alunos com filtros opcionais, paginação por cursor e seleção de campos"""
     try:
-        query = db.query(Aluno)
+        campos = selecionar_campos(fields, CAMPOS_ALUNO)
+        colunas = [getattr(Aluno, c) for c in campos if c != "turma_nome"]
+        query = db.query(Aluno).options(load_only(*colunas))
+        if "turma_nome" in campos:
+            # Turma no mesmo SELECT (LEFT JOIN), sem um SELECT extra por aluno
+            query = query.options(joinedload(Aluno.turma).load_only(Turma.nome))
+        paginado = limit is not None or bool(after)
+        relevancia = None
         
         # Aplicar filtros
         if search:
-            query = query.filter(
-                or_(
-                    Aluno.nome.ilike(f"%{search}%"),
-                    Aluno.email.ilike(f"%{search}%")
-                )
-            )
+            query, relevancia = filtrar_busca(query, search)
         
         if turma_id:
             query = query.filter(Aluno.turma_id == turma_id)
@@ -65,24 +150,44 @@ async def listar_alunos(
         if status:
             query = query.filter(Aluno.status == status)
         
+        # Paginação keyset sobre (nome, id)
+        if after:
+            nome, aluno_id = decodificar_cursor(after, 2)
+            query = query.filter(tuple_(Aluno.nome, Aluno.id) > tuple_(nome, aluno_id))
+        # Sem paginação a busca vem ordenada por relevância; o cursor só conhece (nome, id)
+        if relevancia is not None and not paginado:
+            query = query.order_by(relevancia)
+        query = query.order_by(Aluno.nome, Aluno.id)
+        
+        limite = limit or LIMITE_PADRAO
+        if paginado:
+            query = query.limit(limite + 1)
+        
         alunos = query.all()
+        proximo = None
+        if paginado and len(alunos) > limite:
+            alunos = alunos[:limite]
+            proximo = codificar_cursor([alunos[-1].nome, alunos[-1].id])
         
         # Converter para dict incluindo informações da turma
         resultado = []
         for aluno in alunos:
-            aluno_dict = {
-                "id": aluno.id,
-                "nome": aluno.nome,
-                "data_nascimento": aluno.data_nascimento.isoformat(),
-                "email": aluno.email,
-                "status": aluno.status,
-                "turma_id": aluno.turma_id,
-                "turma_nome": aluno.turma.nome if aluno.turma else None
-            }
+            aluno_dict = {}
+            for campo in campos:
+                if campo == "turma_nome":
+                    aluno_dict[campo] = aluno.turma.nome if aluno.turma else None
+                elif campo == "data_nascimento":
+                    aluno_dict[campo] = aluno.data_nascimento.isoformat()
+                else:
+                    aluno_dict[campo] = getattr(aluno, campo)
             resultado.append(aluno_dict)
         
+        if paginado:
+            return {"items": resultado, "next_cursor": proximo}
         return resultado
         
+    except (HTTPException, CircuitoAberto):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
 
@@ -117,11 +222,10 @@ async def criar_aluno(aluno: AlunoCreate, db: Session = Depends(get_db)):
             if not turma:
                 raise HTTPException(status_code=404, detail="Turma não encontrada")
             
-            alunos_na_turma = db.query(Aluno).filter(Aluno.turma_id == aluno.turma_id).count()
-            if alunos_na_turma >= turma.capacidade:
+            if turma.ocupacao >= turma.capacidade:
                 raise HTTPException(
                     status_code=422,
-                    detail="Turma já atingiu a capacidade máxima"
+                    detail=MOTIVO_LOTADA
                 )
         
         # Criar aluno
@@ -140,8 +244,13 @@ async def criar_aluno(aluno: AlunoCreate, db: Session = Depends(get_db)):
             "message": "Aluno criado com sucesso"
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitoAberto):
         raise
+    except DBAPIError as e:
+        db.rollback()
+        if turma_lotada(e):  # A turma encheu entre a checagem e o commit: o trigger recusou
+            raise HTTPException(status_code=422, detail=MOTIVO_LOTADA)
+        raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
@@ -182,13 +291,11 @@ async def atualizar_aluno(aluno_id: int, aluno: AlunoUpdate, db: Session = Depen
                 raise HTTPException(status_code=404, detail="Turma não encontrada")
             
             # Verificar capacidade (excluindo o aluno atual)
-            alunos_na_turma = db.query(Aluno).filter(
-                and_(Aluno.turma_id == aluno.turma_id, Aluno.id != aluno_id)
-            ).count()
+            alunos_na_turma = turma.ocupacao - (1 if db_aluno.turma_id == aluno.turma_id else 0)
             if alunos_na_turma >= turma.capacidade:
                 raise HTTPException(
                     status_code=422,
-                    detail="Turma já atingiu a capacidade máxima"
+                    detail=MOTIVO_LOTADA
                 )
         
         # Atualizar campos fornecidos
@@ -208,8 +315,13 @@ async def atualizar_aluno(aluno_id: int, aluno: AlunoUpdate, db: Session = Depen
             "message": "Aluno atualizado com sucesso"
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitoAberto):
         raise
+    except DBAPIError as e:
+        db.rollback()
+        if turma_lotada(e):  # A turma encheu entre a checagem e o commit: o trigger recusou
+            raise HTTPException(status_code=422, detail=MOTIVO_LOTADA)
+        raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
@@ -227,7 +339,7 @@ async def excluir_aluno(aluno_id: int, db: Session = Depends(get_db)):
         
         return {"message": "Aluno excluído com sucesso"}
         
-    except HTTPException:
+    except (HTTPException, CircuitoAberto):
         raise
     except Exception as e:
         db.rollback()
@@ -243,18 +355,19 @@ async def listar_turmas(db: Session = Depends(get_db)):
         
         resultado = []
         for turma in turmas:
-            alunos_count = db.query(Aluno).filter(Aluno.turma_id == turma.id).count()
             turma_dict = {
                 "id": turma.id,
                 "nome": turma.nome,
                 "capacidade": turma.capacidade,
-                "ocupacao": alunos_count,
-                "disponivel": turma.capacidade - alunos_count
+                "ocupacao": turma.ocupacao,
+                "disponivel": turma.capacidade - turma.ocupacao
             }
             resultado.append(turma_dict)
         
         return resultado
         
+    except (HTTPException, CircuitoAberto):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
 
@@ -298,7 +411,7 @@ async def criar_turma(turma: TurmaCreate, db: Session = Depends(get_db)):
             "message": "Turma criada com sucesso"
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitoAberto):
         raise
     except Exception as e:
         db.rollback()
@@ -327,7 +440,7 @@ async def atualizar_turma(turma_id: int, turma: TurmaUpdate, db: Session = Depen
         
         # Verificar se nova capacidade não é menor que alunos já matriculados
         if turma.capacidade:
-            alunos_matriculados = db.query(Aluno).filter(Aluno.turma_id == turma_id).count()
+            alunos_matriculados = db_turma.ocupacao
             if turma.capacidade < alunos_matriculados:
                 raise HTTPException(
                     status_code=422,
@@ -352,18 +465,16 @@ async def atualizar_turma(turma_id: int, turma: TurmaUpdate, db: Session = Depen
         db.commit()
         db.refresh(db_turma)
         
-        alunos_count = db.query(Aluno).filter(Aluno.turma_id == turma_id).count()
-        
         return {
             "id": db_turma.id,
             "nome": db_turma.nome,
             "capacidade": db_turma.capacidade,
-            "ocupacao": alunos_count,
-            "disponivel": db_turma.capacidade - alunos_count,
+            "ocupacao": db_turma.ocupacao,
+            "disponivel": db_turma.capacidade - db_turma.ocupacao,
             "message": "Turma atualizada com sucesso"
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitoAberto):
         raise
     except Exception as e:
         db.rollback()
@@ -378,7 +489,7 @@ async def excluir_turma(turma_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Turma não encontrada")
         
         # Verificar se há alunos matriculados
-        alunos_count = db.query(Aluno).filter(Aluno.turma_id == turma_id).count()
+        alunos_count = db_turma.ocupacao
         if alunos_count > 0:
             raise HTTPException(
                 status_code=422,
@@ -390,7 +501,7 @@ async def excluir_turma(turma_id: int, db: Session = Depends(get_db)):
         
         return {"message": "Turma excluída com sucesso"}
         
-    except HTTPException:
+    except (HTTPException, CircuitoAberto):
         raise
     except Exception as e:
         db.rollback()
@@ -408,18 +519,10 @@ async def realizar_matricula(matricula: MatriculaCreate, db: Session = Depends(g
             raise HTTPException(status_code=404, detail="Aluno não encontrado")
         
         # Verificar se turma existe
-        turma = db.query(Turma).filter(Turma.id == matricula.turma_id).first()
+        turma = travar_turma(db, matricula.turma_id)
         if not turma:
             raise HTTPException(status_code=404, detail="Turma não encontrada")
         
-        # Verificar capacidade da turma
-        alunos_na_turma = db.query(Aluno).filter(Aluno.turma_id == matricula.turma_id).count()
-        if alunos_na_turma >= turma.capacidade:
-            raise HTTPException(
-                status_code=422,
-                detail="Turma já atingiu a capacidade máxima"
-            )
-        
         # Verificar se aluno já está matriculado em outra turma
         if aluno.turma_id:
             raise HTTPException(
@@ -427,9 +530,11 @@ async def realizar_matricula(matricula: MatriculaCreate, db: Session = Depends(g
                 detail="Aluno já está matriculado em outra turma"
             )
         
-        # Realizar matrícula
-        aluno.turma_id = matricula.turma_id
-        aluno.status = "ativo"
+        # Realizar matrícula (a vaga é conferida no próprio UPDATE)
+        resultado = matricular_alunos(db, turma.id, [aluno.id])
+        if resultado["rejeitados"]:
+            db.rollback()
+            raise HTTPException(status_code=422, detail=resultado["rejeitados"][0]["motivo"])
         
         db.commit()
         db.refresh(aluno)
@@ -443,7 +548,35 @@ async def realizar_matricula(matricula: MatriculaCreate, db: Session = Depends(g
             "message": "Matrícula realizada com sucesso"
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitoAberto):
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
+
+@app.post("/matriculas/lote", response_model=dict)
+async def realizar_matriculas_em_lote(lote: MatriculaLoteCreate, db: Session = Depends(get_db)):
+    """Matricular vários alunos em uma turma, até onde houver vaga, em uma única transação"""
+    try:
+        turma = travar_turma(db, lote.turma_id)
+        if not turma:
+            raise HTTPException(status_code=404, detail="Turma não encontrada")
+        
+        resultado = matricular_alunos(db, turma.id, lote.aluno_ids)
+        resposta = {
+            "turma_id": turma.id,
+            "turma_nome": turma.nome,
+            "aceitos": resultado["aceitos"],
+            "rejeitados": resultado["rejeitados"],
+            "ocupacao": resultado["ocupacao"],
+            "vagas_restantes": turma.capacidade - resultado["ocupacao"],
+            "message": f"{len(resultado['aceitos'])} matrícula(s) realizada(s)"
+        }
+        db.commit()
+        
+        return resposta
+        
+    except (HTTPException, CircuitoAberto):
         raise
     except Exception as e:
         db.rollback()
@@ -453,35 +586,15 @@ async def realizar_matricula(matricula: MatriculaCreate, db: Session = Depends(g
 
 @app.get("/estatisticas")
 async def obter_estatisticas(db: Session = Depends(get_db)):
-    """Obter estatísticas gerais do sistema"""
+    """Obter estatísticas gerais do sistema (uma consulta, em cache até a próxima escrita)"""
     try:
-        total_alunos = db.query(Aluno).count()
-        alunos_ativos = db.query(Aluno).filter(Aluno.status == "ativo").count()
-        alunos_inativos = db.query(Aluno).filter(Aluno.status == "inativo").count()
-        total_turmas = db.query(Turma).count()
-        
-        # Estatísticas por turma
-        turmas_stats = []
-        turmas = db.query(Turma).all()
-        for turma in turmas:
-            alunos_count = db.query(Aluno).filter(Aluno.turma_id == turma.id).count()
-            turmas_stats.append({
-                "turma_id": turma.id,
-                "turma_nome": turma.nome,
-                "capacidade": turma.capacidade,
-                "ocupacao": alunos_count,
-                "percentual_ocupacao": round((alunos_count / turma.capacidade) * 100, 1) if turma.capacidade > 0 else 0
-            })
-        
-        return {
-            "total_alunos": total_alunos,
-            "alunos_ativos": alunos_ativos,
-            "alunos_inativos": alunos_inativos,
-            "total_turmas": total_turmas,
-            "alunos_sem_turma": total_alunos - sum(ts["ocupacao"] for ts in turmas_stats),
-            "turmas_estatisticas": turmas_stats
-        }
+        estatisticas, frescor = cache_estatisticas.obter(
+            lambda: montar_estatisticas(db.execute(text(SQL_ESTATISTICAS)).all())
+        )
+        return {**estatisticas, "cache": frescor}
         
+    except (HTTPException, CircuitoAberto):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
 
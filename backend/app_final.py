@@ -9,10 +9,16 @@ from typing import Optional, List
 import pymysql
 import uvicorn
 from datetime import date, datetime
-import hashlib
 import jwt
 import os
 
+from db_async import DBExecutor, AsyncConnection
+from tokens import CacheTokens
+from serializacao import responder_lista
+from metricas import instalar_metricas, medir_conexao
+from perfil_sql import instalar_perfil, perfilar_conexao
+from senhas import gerar_hash, verificar, hash_senha, verificar_senha, executor_senhas
+
 # Modelos Pydantic
 class UsuarioLogin(BaseModel):
     username: str
@@ -75,19 +81,22 @@ DB_CONFIG = {
     'charset': 'utf8mb4'
 }
 
+DB_WORKERS = int(os.getenv("ESCOLA_DB_WORKERS", "8"))  # Queries simultâneas fora do event loop
+
 SECRET_KEY = "escola_secretkey_2025_fabio_sistema"
 ALGORITHM = "HS256"
 
 # Security
 security = HTTPBearer()
+cache_tokens = CacheTokens()  # Tokens já verificados (ESCOLA_TOKEN_CACHE_TAMANHO / _TTL)
 
 def hash_password(password: str) -> str:
-    """Cria hash da senha"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Cria hash da senha (KDF com salt; bloqueante, use hash_senha nos endpoints)"""
+    return gerar_hash(password)
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    """Verifica se a senha está correta"""
-    return hash_password(password) == hashed_password
+    """Verifica se a senha está correta (bloqueante, use verificar_senha nos endpoints)"""
+    return verificar(password, hashed_password)
 
 def create_access_token(user_id: int, username: str, tipo_usuario: str):
     """Cria token JWT"""
@@ -99,30 +108,46 @@ def create_access_token(user_id: int, username: str, tipo_usuario: str):
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
+db_executor = DBExecutor(max_workers=DB_WORKERS)
+
 def get_db_connection():
     """Cria conexão com o banco"""
     return pymysql.connect(**DB_CONFIG)
 
+async def get_db():
+    """
+    Dependency: conexão aberta, usada e fechada no db_executor,
+    sem bloquear o event loop. Commit ao final, rollback em caso de erro.
+    """
+    connection = await db_executor.run(get_db_connection)
+    db = AsyncConnection(perfilar_conexao(medir_conexao(connection)), db_executor)
+    try:
+        yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        await db_executor.run(connection.close)
+
+def verificar_token(token: str):
+    """Checa assinatura/expiração do JWT; retorna (usuário, exp)"""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    user_id = payload.get("user_id")
+    if user_id is None:
+        raise jwt.InvalidTokenError("user_id ausente")
+    usuario = {
+        "id": user_id,
+        "username": payload.get("username"),
+        "tipo_usuario": payload.get("tipo_usuario")
+    }
+    return usuario, payload.get("exp")
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verifica token JWT e retorna usuário atual"""
+    """Verifica token JWT e retorna usuário atual (tokens já verificados vêm do cache)"""
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        username = payload.get("username")
-        tipo_usuario = payload.get("tipo_usuario")
-        
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Token inválido")
-            
-        return {
-            "id": user_id,
-            "username": username,
-            "tipo_usuario": tipo_usuario
-        }
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Token inválido")
-    except Exception as e:
+        return cache_tokens.obter(credentials.credentials, verificar_token)
+    except Exception:
         raise HTTPException(status_code=401, detail="Token inválido")
 
 def require_admin(current_user: dict = Depends(get_current_user)):
@@ -143,6 +168,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas Prometheus em GET /metrics (ESCOLA_METRICAS=0 desliga)
+metricas = instalar_metricas(app, "app_final", {"tokens": cache_tokens.stats})
+
+# Perfil de SQL por requisição: X-Query-Count / X-DB-Time e log de queries lentas (ESCOLA_PERFIL_SQL=1)
+instalar_perfil(app)
+
 @app.on_event("startup")
 async def startup_event():
     """Inicializar banco de dados e criar tabelas"""
@@ -155,7 +186,7 @@ async def startup_event():
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 username VARCHAR(50) UNIQUE NOT NULL,
                 email VARCHAR(100) UNIQUE NOT NULL,
-                senha_hash VARCHAR(64) NOT NULL,
+                senha_hash VARCHAR(255) NOT NULL,
                 tipo_usuario ENUM('admin', 'usuario') DEFAULT 'usuario',
                 ativo BOOLEAN DEFAULT TRUE,
                 data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -163,6 +194,17 @@ async def startup_event():
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
             """)
             
+            # Bancos antigos: senha_hash tinha 64 caracteres (SHA-256 hex).
+            # O ALTER reescreve a tabela: só roda quando a coluna ainda é curta.
+            cursor.execute("""
+            SELECT CHARACTER_MAXIMUM_LENGTH FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'usuarios' AND COLUMN_NAME = 'senha_hash'
+            """)
+            coluna = cursor.fetchone()
+            if coluna and coluna[0] is not None and coluna[0] < 255:
+                cursor.execute("ALTER TABLE usuarios MODIFY senha_hash VARCHAR(255) NOT NULL")
+                print("🔧 Coluna usuarios.senha_hash ampliada para VARCHAR(255)")
+            
             # Criar admin padrão
             admin_password = hash_password('admin123')
             cursor.execute("""
@@ -176,346 +218,275 @@ async def startup_event():
     except Exception as e:
         print(f"❌ Erro na inicialização do banco: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    db_executor.shutdown()
+    executor_senhas.shutdown()
+
 # ENDPOINTS DE AUTENTICAÇÃO
 @app.post("/login")
-async def login(usuario: UsuarioLogin):
+async def login(usuario: UsuarioLogin, db: AsyncConnection = Depends(get_db)):
     """Login do usuário"""
-    connection = get_db_connection()
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, username, email, senha_hash, tipo_usuario, ativo 
-                FROM usuarios WHERE username=%s AND ativo=1
-            """, (usuario.username,))
-            
-            user_data = cursor.fetchone()
-            if not user_data:
-                raise HTTPException(status_code=401, detail="Usuário ou senha incorretos")
-            
-            user_id, username, email, senha_hash, tipo_usuario, ativo = user_data
-            
-            if not verify_password(usuario.password, senha_hash):
-                raise HTTPException(status_code=401, detail="Usuário ou senha incorretos")
-            
-            # Atualizar último login
-            cursor.execute("UPDATE usuarios SET ultimo_login=NOW() WHERE id=%s", (user_id,))
-            connection.commit()
-            
-            # Criar token
-            token = create_access_token(user_id, username, tipo_usuario)
-            
-            return {
-                "access_token": token,
-                "token_type": "bearer",
-                "user": {
-                    "id": user_id,
-                    "username": username,
-                    "email": email,
-                    "tipo_usuario": tipo_usuario
-                }
-            }
-    finally:
-        connection.close()
+    user_data = await db.fetchone("""
+        SELECT id, username, email, senha_hash, tipo_usuario, ativo 
+        FROM usuarios WHERE username=%s AND ativo=1
+    """, (usuario.username,))
+    
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Usuário ou senha incorretos")
+    
+    user_id, username, email, senha_hash, tipo_usuario, ativo = user_data
+    
+    senha_ok, novo_hash = await verificar_senha(usuario.password, senha_hash)
+    if not senha_ok:
+        raise HTTPException(status_code=401, detail="Usuário ou senha incorretos")
+    
+    # Atualizar último login (e regravar o hash se estiver no formato antigo)
+    if novo_hash:
+        await db.execute("UPDATE usuarios SET ultimo_login=NOW(), senha_hash=%s WHERE id=%s", (novo_hash, user_id))
+    else:
+        await db.execute("UPDATE usuarios SET ultimo_login=NOW() WHERE id=%s", (user_id,))
+    await db.commit()
+    
+    # Criar token
+    token = create_access_token(user_id, username, tipo_usuario)
+    
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "user": {
+            "id": user_id,
+            "username": username,
+            "email": email,
+            "tipo_usuario": tipo_usuario
+        }
+    }
 
 @app.post("/register")
-async def register(usuario: UsuarioCreate):
+async def register(usuario: UsuarioCreate, db: AsyncConnection = Depends(get_db)):
     """Registro de novo usuário"""
-    connection = get_db_connection()
     try:
-        with connection.cursor() as cursor:
-            # Verificar se usuário já existe
-            cursor.execute("SELECT id FROM usuarios WHERE username=%s OR email=%s", 
-                         (usuario.username, usuario.email))
-            if cursor.fetchone():
-                raise HTTPException(status_code=400, detail="Usuário ou email já existe")
-            
-            # Criar usuário
-            senha_hash = hash_password(usuario.password)
-            cursor.execute("""
-                INSERT INTO usuarios (username, email, senha_hash, tipo_usuario) 
-                VALUES (%s, %s, %s, %s)
-            """, (usuario.username, usuario.email, senha_hash, usuario.tipo_usuario))
-            
-            connection.commit()
-            user_id = cursor.lastrowid
-            
-            return {
-                "message": "Usuário criado com sucesso",
-                "user": {
-                    "id": user_id,
-                    "username": usuario.username,
-                    "email": usuario.email,
-                    "tipo_usuario": usuario.tipo_usuario
-                }
+        # Verificar se usuário já existe
+        if await db.fetchone("SELECT id FROM usuarios WHERE username=%s OR email=%s", 
+                             (usuario.username, usuario.email)):
+            raise HTTPException(status_code=400, detail="Usuário ou email já existe")
+        
+        # Criar usuário
+        senha_hash = await hash_senha(usuario.password)
+        cursor = await db.execute("""
+            INSERT INTO usuarios (username, email, senha_hash, tipo_usuario) 
+            VALUES (%s, %s, %s, %s)
+        """, (usuario.username, usuario.email, senha_hash, usuario.tipo_usuario))
+        
+        await db.commit()
+        user_id = cursor.lastrowid
+        
+        return {
+            "message": "Usuário criado com sucesso",
+            "user": {
+                "id": user_id,
+                "username": usuario.username,
+                "email": usuario.email,
+                "tipo_usuario": usuario.tipo_usuario
             }
+        }
     except Exception as e:
-        connection.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        connection.close()
 
 @app.get("/me")
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(current_user: dict = Depends(get_current_user), db: AsyncConnection = Depends(get_db)):
     """Informações do usuário atual"""
-    connection = get_db_connection()
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, username, email, tipo_usuario, ativo, data_criacao, ultimo_login
-                FROM usuarios WHERE id=%s
-            """, (current_user["id"],))
-            
-            user_data = cursor.fetchone()
-            if not user_data:
-                raise HTTPException(status_code=404, detail="Usuário não encontrado")
-            
-            return {
-                "id": user_data[0],
-                "username": user_data[1],
-                "email": user_data[2],
-                "tipo_usuario": user_data[3],
-                "ativo": user_data[4],
-                "data_criacao": user_data[5],
-                "ultimo_login": user_data[6]
-            }
-    finally:
-        connection.close()
+    user_data = await db.fetchone("""
+        SELECT id, username, email, tipo_usuario, ativo, data_criacao, ultimo_login
+        FROM usuarios WHERE id=%s
+    """, (current_user["id"],))
+    
+    if not user_data:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    return {
+        "id": user_data[0],
+        "username": user_data[1],
+        "email": user_data[2],
+        "tipo_usuario": user_data[3],
+        "ativo": user_data[4],
+        "data_criacao": user_data[5],
+        "ultimo_login": user_data[6]
+    }
 
 @app.get("/perfil", response_model=PerfilUsuario)
-async def get_perfil_completo(current_user: dict = Depends(get_current_user)):
+async def get_perfil_completo(current_user: dict = Depends(get_current_user), db: AsyncConnection = Depends(get_db)):
     """Perfil completo do usuário com estatísticas"""
-    connection = get_db_connection()
+    # Buscar dados do usuário
+    user_data = await db.fetchone("""
+        SELECT id, username, email, tipo_usuario, data_criacao, ultimo_login
+        FROM usuarios WHERE id=%s
+    """, (current_user["id"],))
+    
+    if not user_data:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    # Calcular tempo de login atual (desde o último login até agora)
+    tempo_login = "Primeira sessão"
+    if user_data[5]:  # ultimo_login
+        agora = datetime.now()
+        ultimo_login = user_data[5]
+        if isinstance(ultimo_login, str):
+            ultimo_login = datetime.fromisoformat(ultimo_login)
+        delta = agora - ultimo_login
+        horas = int(delta.total_seconds() // 3600)
+        minutos = int((delta.total_seconds() % 3600) // 60)
+        tempo_login = f"{horas}h {minutos}min"
+    
+    # Contar alunos cadastrados (se for admin)
+    total_alunos = 0
+    if user_data[3] == 'admin':  # Se for admin
+        result = await db.fetchone("SELECT COUNT(*) FROM alunos")
+        total_alunos = result[0] if result else 0
+    
+    # Contar matrículas (se existir tabela de matrículas)
+    total_matriculas = 0
     try:
-        with connection.cursor() as cursor:
-            # Buscar dados do usuário
-            cursor.execute("""
-                SELECT id, username, email, tipo_usuario, data_criacao, ultimo_login
-                FROM usuarios WHERE id=%s
-            """, (current_user["id"],))
-            
-            user_data = cursor.fetchone()
-            if not user_data:
-                raise HTTPException(status_code=404, detail="Usuário não encontrado")
-            
-            # Calcular tempo de login atual (desde o último login até agora)
-            tempo_login = "Primeira sessão"
-            if user_data[5]:  # ultimo_login
-                agora = datetime.now()
-                ultimo_login = user_data[5]
-                if isinstance(ultimo_login, str):
-                    ultimo_login = datetime.fromisoformat(ultimo_login)
-                delta = agora - ultimo_login
-                horas = int(delta.total_seconds() // 3600)
-                minutos = int((delta.total_seconds() % 3600) // 60)
-                tempo_login = f"{horas}h {minutos}min"
-            
-            # Contar alunos cadastrados (se for admin)
-            total_alunos = 0
-            if user_data[3] == 'admin':  # Se for admin
-                cursor.execute("SELECT COUNT(*) FROM alunos")
-                result = cursor.fetchone()
-                total_alunos = result[0] if result else 0
-            
-            # Contar matrículas (se existir tabela de matrículas)
-            total_matriculas = 0
-            try:
-                cursor.execute("SELECT COUNT(*) FROM matriculas")
-                result = cursor.fetchone()
-                total_matriculas = result[0] if result else 0
-            except:
-                total_matriculas = 0
-            
-            return PerfilUsuario(
-                id=user_data[0],
-                username=user_data[1],
-                email=user_data[2],
-                tipo_usuario=user_data[3],
-                data_criacao=user_data[4].strftime("%d/%m/%Y %H:%M") if user_data[4] else "N/A",
-                ultimo_login=user_data[5].strftime("%d/%m/%Y %H:%M") if user_data[5] else "Nunca",
-                tempo_login_atual=tempo_login,
-                total_alunos_cadastrados=total_alunos,
-                total_matriculas_realizadas=total_matriculas,
-                sessoes_ativas=1  # Sempre 1 pois está logado
-            )
-    finally:
-        connection.close()
+        result = await db.fetchone("SELECT COUNT(*) FROM matriculas")
+        total_matriculas = result[0] if result else 0
+    except:
+        total_matriculas = 0
+    
+    return PerfilUsuario(
+        id=user_data[0],
+        username=user_data[1],
+        email=user_data[2],
+        tipo_usuario=user_data[3],
+        data_criacao=user_data[4].strftime("%d/%m/%Y %H:%M") if user_data[4] else "N/A",
+        ultimo_login=user_data[5].strftime("%d/%m/%Y %H:%M") if user_data[5] else "Nunca",
+        tempo_login_atual=tempo_login,
+        total_alunos_cadastrados=total_alunos,
+        total_matriculas_realizadas=total_matriculas,
+        sessoes_ativas=1  # Sempre 1 pois está logado
+    )
 
 # ENDPOINTS ALUNOS (Protegidos)
 @app.get("/alunos", response_model=List[Aluno])
-async def listar_alunos(current_user: dict = Depends(get_current_user)):
-    connection = get_db_connection()
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT id, nome, data_nascimento, email, status, turma_id FROM alunos ORDER BY nome")
-            alunos = cursor.fetchall()
-            
-            result = []
-            for aluno in alunos:
-                result.append({
-                    "id": aluno[0],
-                    "nome": aluno[1],
-                    "data_nascimento": aluno[2],
-                    "email": aluno[3],
-                    "status": aluno[4],
-                    "turma_id": aluno[5]
-                })
-            return result
-    finally:
-        connection.close()
+async def listar_alunos(current_user: dict = Depends(get_current_user), db: AsyncConnection = Depends(get_db)):
+    alunos = await db.fetchdicts("SELECT id, nome, data_nascimento, email, status, turma_id FROM alunos ORDER BY nome")
+    return responder_lista(alunos)
 
 @app.post("/alunos", response_model=Aluno)
-async def criar_aluno(aluno: AlunoCreate, admin_user: dict = Depends(require_admin)):
-    connection = get_db_connection()
+async def criar_aluno(aluno: AlunoCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
     try:
-        with connection.cursor() as cursor:
-            sql = "INSERT INTO alunos (nome, data_nascimento, email, status, turma_id) VALUES (%s, %s, %s, %s, %s)"
-            cursor.execute(sql, (aluno.nome, aluno.data_nascimento, aluno.email, aluno.status, aluno.turma_id))
-            connection.commit()
-            aluno_id = cursor.lastrowid
-            
-            return {
-                "id": aluno_id,
-                "nome": aluno.nome,
-                "data_nascimento": aluno.data_nascimento,
-                "email": aluno.email,
-                "status": aluno.status,
-                "turma_id": aluno.turma_id
-            }
+        sql = "INSERT INTO alunos (nome, data_nascimento, email, status, turma_id) VALUES (%s, %s, %s, %s, %s)"
+        cursor = await db.execute(sql, (aluno.nome, aluno.data_nascimento, aluno.email, aluno.status, aluno.turma_id))
+        await db.commit()
+        aluno_id = cursor.lastrowid
+        
+        return {
+            "id": aluno_id,
+            "nome": aluno.nome,
+            "data_nascimento": aluno.data_nascimento,
+            "email": aluno.email,
+            "status": aluno.status,
+            "turma_id": aluno.turma_id
+        }
     except Exception as e:
-        connection.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        connection.close()
 
 @app.put("/alunos/{aluno_id}", response_model=Aluno)
-async def atualizar_aluno(aluno_id: int, aluno: AlunoCreate, admin_user: dict = Depends(require_admin)):
-    connection = get_db_connection()
+async def atualizar_aluno(aluno_id: int, aluno: AlunoCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
     try:
-        with connection.cursor() as cursor:
-            sql = "UPDATE alunos SET nome=%s, data_nascimento=%s, email=%s, status=%s, turma_id=%s WHERE id=%s"
-            cursor.execute(sql, (aluno.nome, aluno.data_nascimento, aluno.email, aluno.status, aluno.turma_id, aluno_id))
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="Aluno não encontrado")
-                
-            connection.commit()
+        sql = "UPDATE alunos SET nome=%s, data_nascimento=%s, email=%s, status=%s, turma_id=%s WHERE id=%s"
+        cursor = await db.execute(sql, (aluno.nome, aluno.data_nascimento, aluno.email, aluno.status, aluno.turma_id, aluno_id))
+        
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Aluno não encontrado")
             
-            return {
-                "id": aluno_id,
-                "nome": aluno.nome,
-                "data_nascimento": aluno.data_nascimento,
-                "email": aluno.email,
-                "status": aluno.status,
-                "turma_id": aluno.turma_id
-            }
+        await db.commit()
+        
+        return {
+            "id": aluno_id,
+            "nome": aluno.nome,
+            "data_nascimento": aluno.data_nascimento,
+            "email": aluno.email,
+            "status": aluno.status,
+            "turma_id": aluno.turma_id
+        }
     except Exception as e:
-        connection.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        connection.close()
 
 @app.delete("/alunos/{aluno_id}")
-async def deletar_aluno(aluno_id: int, admin_user: dict = Depends(require_admin)):
-    connection = get_db_connection()
+async def deletar_aluno(aluno_id: int, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("DELETE FROM alunos WHERE id=%s", (aluno_id,))
+        cursor = await db.execute("DELETE FROM alunos WHERE id=%s", (aluno_id,))
+        
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Aluno não encontrado")
             
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="Aluno não encontrado")
-                
-            connection.commit()
-            return {"message": "Aluno deletado com sucesso"}
+        await db.commit()
+        return {"message": "Aluno deletado com sucesso"}
     except Exception as e:
-        connection.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        connection.close()
 
 # ENDPOINTS TURMAS (Protegidos)
 @app.get("/turmas", response_model=List[Turma])
-async def listar_turmas(current_user: dict = Depends(get_current_user)):
-    connection = get_db_connection()
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT id, nome, capacidade FROM turmas ORDER BY nome")
-            turmas = cursor.fetchall()
-            
-            result = []
-            for turma in turmas:
-                result.append({
-                    "id": turma[0],
-                    "nome": turma[1],
-                    "capacidade": turma[2]
-                })
-            return result
-    finally:
-        connection.close()
+async def listar_turmas(current_user: dict = Depends(get_current_user), db: AsyncConnection = Depends(get_db)):
+    turmas = await db.fetchdicts("SELECT id, nome, capacidade FROM turmas ORDER BY nome")
+    return responder_lista(turmas)
 
 @app.post("/turmas", response_model=Turma)
-async def criar_turma(turma: TurmaCreate, admin_user: dict = Depends(require_admin)):
-    connection = get_db_connection()
+async def criar_turma(turma: TurmaCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
     try:
-        with connection.cursor() as cursor:
-            sql = "INSERT INTO turmas (nome, capacidade) VALUES (%s, %s)"
-            cursor.execute(sql, (turma.nome, turma.capacidade))
-            connection.commit()
-            
-            turma_id = cursor.lastrowid
-            
-            return {
-                "id": turma_id,
-                "nome": turma.nome,
-                "capacidade": turma.capacidade
-            }
+        sql = "INSERT INTO turmas (nome, capacidade) VALUES (%s, %s)"
+        cursor = await db.execute(sql, (turma.nome, turma.capacidade))
+        await db.commit()
+        
+        turma_id = cursor.lastrowid
+        
+        return {
+            "id": turma_id,
+            "nome": turma.nome,
+            "capacidade": turma.capacidade
+        }
     except Exception as e:
-        connection.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        connection.close()
 
 @app.put("/turmas/{turma_id}", response_model=Turma)
-async def atualizar_turma(turma_id: int, turma: TurmaCreate, admin_user: dict = Depends(require_admin)):
-    connection = get_db_connection()
+async def atualizar_turma(turma_id: int, turma: TurmaCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
     try:
-        with connection.cursor() as cursor:
-            sql = "UPDATE turmas SET nome=%s, capacidade=%s WHERE id=%s"
-            cursor.execute(sql, (turma.nome, turma.capacidade, turma_id))
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="Turma não encontrada")
-                
-            connection.commit()
+        sql = "UPDATE turmas SET nome=%s, capacidade=%s WHERE id=%s"
+        cursor = await db.execute(sql, (turma.nome, turma.capacidade, turma_id))
+        
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Turma não encontrada")
             
-            return {
-                "id": turma_id,
-                "nome": turma.nome,
-                "capacidade": turma.capacidade
-            }
+        await db.commit()
+        
+        return {
+            "id": turma_id,
+            "nome": turma.nome,
+            "capacidade": turma.capacidade
+        }
     except Exception as e:
-        connection.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        connection.close()
 
 @app.delete("/turmas/{turma_id}")
-async def deletar_turma(turma_id: int, admin_user: dict = Depends(require_admin)):
-    connection = get_db_connection()
+async def deletar_turma(turma_id: int, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("DELETE FROM turmas WHERE id=%s", (turma_id,))
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="Turma não encontrada")
-                
-            connection.commit()
+        cursor = await db.execute("DELETE FROM turmas WHERE id=%s", (turma_id,))
+        
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Turma não encontrada")
             
-            return {"message": "Turma deletada com sucesso"}
+        await db.commit()
+        
+        return {"message": "Turma deletada com sucesso"}
     except Exception as e:
-        connection.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        connection.close()
 
 @app.get("/")
 async def root():
@@ -524,12 +495,16 @@ async def root():
 @app.get("/test-db")
 async def test_db():
     try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT COUNT(*) FROM alunos")
-            count = cursor.fetchone()[0]
-        connection.close()
-        return {"status": "OK", "alunos": count}
+        def contar_alunos():
+            connection = get_db_connection()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*) FROM alunos")
+                    return cursor.fetchone()[0]
+            finally:
+                connection.close()
+        count = await db_executor.run(contar_alunos)
+        return {"status": "OK", "alunos": count, "tokens": cache_tokens.stats()}
     except Exception as e:
         return {"status": "ERROR", "error": str(e)}
 
@@ -1,6 +1,6 @@
 # Servidor Backend Simples - Sistema Escola
 # Funciona diretamente com PyMySQL, sem SQLAlchemy
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import pymysql
@@ -10,6 +10,15 @@ import json
 from typing import Optional, List, Dict, Any
 import re
 
+from paginacao import Paginacao, LIMITE_MAXIMO
+from busca import expressao_fulltext, possui_fulltext_mysql
+from ocupacao import instalar_ocupacao
+from matriculas import matricular_cursor, turma_lotada, MOTIVO_LOTADA, MOTIVO_OUTRA_TURMA
+from estatisticas import SQL_ESTATISTICAS, cache_estatisticas, montar_estatisticas
+from cache import invalidar_tabelas
+from metricas import instalar_metricas, medir_conexao
+from perfil_sql import instalar_perfil, perfilar_conexao
+
 app = FastAPI(
     title="Sistema de Gestão Escolar",
     description="API para gerenciamento de alunos e turmas escolares",
@@ -25,6 +34,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas Prometheus em GET /metrics (ESCOLA_METRICAS=0 desliga)
+metricas = instalar_metricas(app, "app_simples")
+
+# Perfil de SQL por requisição: X-Query-Count / X-DB-Time e log de queries lentas (ESCOLA_PERFIL_SQL=1)
+instalar_perfil(app)
+
 # Configuração do banco
 DB_CONFIG = {
     'host': 'localhost',
@@ -38,10 +53,32 @@ DB_CONFIG = {
 def get_db_connection():
     """Obter conexão com o banco"""
     try:
-        return pymysql.connect(**DB_CONFIG)
+        return perfilar_conexao(medir_conexao(pymysql.connect(**DB_CONFIG)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro de conexão: {str(e)}")
 
+# Colunas expostas em /alunos e chaves da paginação por cursor
+PAGINACAO_ALUNOS = Paginacao(
+    {"id": "a.id", "nome": "a.nome", "data_nascimento": "a.data_nascimento", "email": "a.email",
+     "status": "a.status", "turma_id": "a.turma_id", "turma_nome": "t.nome"},
+    ordem=["nome", "id"],
+    placeholder="%s",
+)
+
+_fulltext_alunos = None  # Índice FULLTEXT verificado na primeira busca
+
+def usar_fulltext() -> bool:
+    """Usa MATCH ... AGAINST apenas se o banco já tiver o índice FULLTEXT"""
+    global _fulltext_alunos
+    if _fulltext_alunos is None:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                _fulltext_alunos = possui_fulltext_mysql(cursor)
+        finally:
+            conn.close()
+    return _fulltext_alunos
+
 def validar_email(email: str) -> bool:
     """Validar formato de email"""
     if not email:
@@ -65,6 +102,19 @@ def calcular_idade(data_nascimento: str) -> int:
     except:
         return 0
 
+@app.on_event("startup")
+def preparar_banco():
+    """Garante turmas.ocupacao e seus triggers em bancos criados antes da coluna"""
+    try:
+        conn = get_db_connection()
+        try:
+            if instalar_ocupacao(conn, "mysql"):
+                print("✅ Ocupação das turmas calculada")
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ Não foi possível preparar turmas.ocupacao: {e}")
+
 # === ENDPOINTS ===
 
 @app.get("/health")
@@ -76,51 +126,65 @@ def health_check():
 def listar_alunos(
     search: Optional[str] = None,
     turma_id: Optional[int] = None,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO, description="Itens por página"),
+    after: Optional[str] = Query(None, description="next_cursor da página anterior")
 ):
-    """Listar alunos com filtros"""
+    """Listar alunos com filtros, paginação por cursor e seleção de campos"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        
-        # Query base
-        sql = """
-        SELECT a.*, t.nome as turma_nome 
-        FROM alunos a 
-        LEFT JOIN turmas t ON a.turma_id = t.id 
-        WHERE 1=1
-        """
+        where = []
         params = []
+        relevancia = None
         
         # Aplicar filtros
         if search:
-            sql += " AND (a.nome LIKE %s OR a.email LIKE %s)"
-            params.extend([f"%{search}%", f"%{search}%"])
+            # FULLTEXT por prefixo, ordenado por relevância; LIKE para termos curtos
+            expressao = expressao_fulltext(search)
+            if expressao and usar_fulltext():
+                where.append("MATCH(a.nome, a.email) AGAINST (%s IN BOOLEAN MODE)")
+                params.append(expressao)
+                relevancia = "MATCH(a.nome, a.email) AGAINST (%s IN BOOLEAN MODE) DESC"
+            else:
+                where.append("(a.nome LIKE %s OR a.email LIKE %s)")
+                params.extend([f"%{search}%", f"%{search}%"])
         
         if turma_id:
-            sql += " AND a.turma_id = %s"
+            where.append("a.turma_id = %s")
             params.append(turma_id)
             
         if status:
-            sql += " AND a.status = %s"
+            where.append("a.status = %s")
             params.append(status)
         
-        sql += " ORDER BY a.nome"
+        sql, params, campos = PAGINACAO_ALUNOS.consulta(
+            "FROM alunos a LEFT JOIN turmas t ON a.turma_id = t.id",
+            where, params, fields=fields, limit=limit, after=after,
+            relevancia=relevancia, params_relevancia=[expressao] if relevancia else None
+        )
         
-        cursor.execute(sql, params)
-        alunos = cursor.fetchall()
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            linhas = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        
+        resposta = PAGINACAO_ALUNOS.resposta(linhas, campos, limit, after)
+        alunos = resposta["items"] if isinstance(resposta, dict) else resposta
         
         # Converter datas para string
         for aluno in alunos:
-            if aluno['data_nascimento']:
+            if aluno.get('data_nascimento'):
                 aluno['data_nascimento'] = aluno['data_nascimento'].strftime('%Y-%m-%d')
                 aluno['idade'] = calcular_idade(aluno['data_nascimento'])
         
-        cursor.close()
-        conn.close()
-        
-        return alunos
+        return resposta
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -157,7 +221,7 @@ def criar_aluno(aluno_data: dict):
             cursor = conn.cursor()
             
             # Verificar se turma existe
-            cursor.execute("SELECT capacidade FROM turmas WHERE id = %s", (turma_id,))
+            cursor.execute("SELECT capacidade, ocupacao FROM turmas WHERE id = %s", (turma_id,))
             turma = cursor.fetchone()
             if not turma:
                 cursor.close()
@@ -165,12 +229,11 @@ def criar_aluno(aluno_data: dict):
                 raise HTTPException(status_code=404, detail="Turma não encontrada")
             
             # Verificar capacidade
-            cursor.execute("SELECT COUNT(*) FROM alunos WHERE turma_id = %s", (turma_id,))
-            ocupacao = cursor.fetchone()[0]
+            ocupacao = turma[1]
             if ocupacao >= turma[0]:
                 cursor.close()
                 conn.close()
-                raise HTTPException(status_code=422, detail="Turma já está lotada")
+                raise HTTPException(status_code=422, detail=MOTIVO_LOTADA)
             
             cursor.close()
             conn.close()
@@ -188,6 +251,7 @@ def criar_aluno(aluno_data: dict):
         aluno_id = cursor.lastrowid
         
         conn.commit()
+        invalidar_tabelas("alunos", "turmas")
         cursor.close()
         conn.close()
         
@@ -203,6 +267,10 @@ def criar_aluno(aluno_data: dict):
         
     except HTTPException:
         raise
+    except pymysql.MySQLError as e:
+        if turma_lotada(e):  # A turma encheu depois da checagem: o trigger recusou a escrita
+            raise HTTPException(status_code=422, detail=MOTIVO_LOTADA)
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -260,8 +328,12 @@ def atualizar_aluno(aluno_id: int, aluno_data: dict):
         if 'turma_id' in aluno_data:
             turma_id = aluno_data['turma_id']
             if turma_id:
-                # Verificar turma
-                cursor.execute("SELECT capacidade FROM turmas WHERE id = %s", (turma_id,))
+                # Verificar turma (ocupação excluindo o aluno atual)
+                cursor.execute("""
+                    SELECT t.capacidade,
+                           t.ocupacao - (SELECT COUNT(*) FROM alunos WHERE id = %s AND turma_id = t.id)
+                    FROM turmas t WHERE t.id = %s
+                """, (aluno_id, turma_id))
                 turma = cursor.fetchone()
                 if not turma:
                     cursor.close()
@@ -269,12 +341,11 @@ def atualizar_aluno(aluno_id: int, aluno_data: dict):
                     raise HTTPException(status_code=404, detail="Turma não encontrada")
                 
                 # Verificar capacidade (excluindo aluno atual)
-                cursor.execute("SELECT COUNT(*) FROM alunos WHERE turma_id = %s AND id != %s", (turma_id, aluno_id))
-                ocupacao = cursor.fetchone()[0]
+                ocupacao = turma[1]
                 if ocupacao >= turma[0]:
                     cursor.close()
                     conn.close()
-                    raise HTTPException(status_code=422, detail="Turma já está lotada")
+                    raise HTTPException(status_code=422, detail=MOTIVO_LOTADA)
             
             campos.append("turma_id = %s")
             valores.append(turma_id)
@@ -284,6 +355,7 @@ def atualizar_aluno(aluno_id: int, aluno_data: dict):
             valores.append(aluno_id)
             cursor.execute(sql, valores)
             conn.commit()
+            invalidar_tabelas("alunos", "turmas")
         
         cursor.close()
         conn.close()
@@ -292,6 +364,10 @@ def atualizar_aluno(aluno_id: int, aluno_data: dict):
         
     except HTTPException:
         raise
+    except pymysql.MySQLError as e:
+        if turma_lotada(e):  # A turma encheu depois da checagem: o trigger recusou a escrita
+            raise HTTPException(status_code=422, detail=MOTIVO_LOTADA)
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -312,6 +388,7 @@ def excluir_aluno(aluno_id: int):
         # Excluir
         cursor.execute("DELETE FROM alunos WHERE id = %s", (aluno_id,))
         conn.commit()
+        invalidar_tabelas("alunos", "turmas")
         
         cursor.close()
         conn.close()
@@ -331,10 +408,8 @@ def listar_turmas():
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
         sql = """
-        SELECT t.*, COUNT(a.id) as ocupacao
+        SELECT t.id, t.nome, t.capacidade, t.ocupacao
         FROM turmas t
-        LEFT JOIN alunos a ON t.id = a.turma_id
-        GROUP BY t.id, t.nome, t.capacidade
         ORDER BY t.nome
         """
         
@@ -381,6 +456,7 @@ def criar_turma(turma_data: dict):
         turma_id = cursor.lastrowid
         
         conn.commit()
+        invalidar_tabelas("turmas")
         cursor.close()
         conn.close()
         
@@ -424,7 +500,7 @@ def atualizar_turma(turma_id: int, turma_data: dict):
         
         # Verificar capacidade vs ocupação atual
         if capacidade:
-            cursor.execute("SELECT COUNT(*) FROM alunos WHERE turma_id = %s", (turma_id,))
+            cursor.execute("SELECT ocupacao FROM turmas WHERE id = %s", (turma_id,))
             ocupacao = cursor.fetchone()[0]
             if capacidade < ocupacao:
                 cursor.close()
@@ -448,6 +524,7 @@ def atualizar_turma(turma_id: int, turma_data: dict):
             valores.append(turma_id)
             cursor.execute(sql, valores)
             conn.commit()
+            invalidar_tabelas("turmas")
         
         cursor.close()
         conn.close()
@@ -474,7 +551,7 @@ def excluir_turma(turma_id: int):
             raise HTTPException(status_code=404, detail="Turma não encontrada")
         
         # Verificar se há alunos
-        cursor.execute("SELECT COUNT(*) FROM alunos WHERE turma_id = %s", (turma_id,))
+        cursor.execute("SELECT ocupacao FROM turmas WHERE id = %s", (turma_id,))
         alunos_count = cursor.fetchone()[0]
         if alunos_count > 0:
             cursor.close()
@@ -484,6 +561,7 @@ def excluir_turma(turma_id: int):
         # Excluir
         cursor.execute("DELETE FROM turmas WHERE id = %s", (turma_id,))
         conn.commit()
+        invalidar_tabelas("turmas")
         
         cursor.close()
         conn.close()
@@ -519,27 +597,26 @@ def realizar_matricula(matricula_data: dict):
         if aluno[1]:  # já tem turma
             cursor.close()
             conn.close()
-            raise HTTPException(status_code=422, detail="Aluno já está matriculado em uma turma")
+            raise HTTPException(status_code=422, detail=MOTIVO_OUTRA_TURMA)
         
-        # Verificar turma
-        cursor.execute("SELECT nome, capacidade FROM turmas WHERE id = %s", (turma_id,))
+        # Verificar turma (linha travada até o commit)
+        cursor.execute("SELECT nome FROM turmas WHERE id = %s FOR UPDATE", (turma_id,))
         turma = cursor.fetchone()
         if not turma:
+            conn.rollback()
             cursor.close()
             conn.close()
             raise HTTPException(status_code=404, detail="Turma não encontrada")
         
-        # Verificar capacidade
-        cursor.execute("SELECT COUNT(*) FROM alunos WHERE turma_id = %s", (turma_id,))
-        ocupacao = cursor.fetchone()[0]
-        if ocupacao >= turma[1]:
+        # Realizar matrícula (a capacidade é conferida no próprio UPDATE)
+        resultado = matricular_cursor(cursor, turma_id, [aluno_id])
+        if resultado["rejeitados"]:
+            conn.rollback()
             cursor.close()
             conn.close()
-            raise HTTPException(status_code=422, detail="Turma já está lotada")
-        
-        # Realizar matrícula
-        cursor.execute("UPDATE alunos SET turma_id = %s, status = 'ativo' WHERE id = %s", (turma_id, aluno_id))
+            raise HTTPException(status_code=422, detail=resultado["rejeitados"][0]["motivo"])
         conn.commit()
+        invalidar_tabelas("alunos", "turmas")
         
         cursor.close()
         conn.close()
@@ -558,62 +635,69 @@ def realizar_matricula(matricula_data: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/estatisticas")
-def obter_estatisticas():
-    """Obter estatísticas gerais"""
+@app.post("/matriculas/lote")
+def realizar_matriculas_em_lote(lote_data: dict):
+    """Matricular vários alunos em uma turma, até onde houver vaga, em uma única transação"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        turma_id = lote_data.get('turma_id')
+        aluno_ids = lote_data.get('aluno_ids')
         
-        # Estatísticas básicas
-        cursor.execute("SELECT COUNT(*) FROM alunos")
-        total_alunos = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM alunos WHERE status = 'ativo'")
-        alunos_ativos = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM alunos WHERE status = 'inativo'")
-        alunos_inativos = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM turmas")
-        total_turmas = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM alunos WHERE turma_id IS NULL")
-        alunos_sem_turma = cursor.fetchone()[0]
-        
-        # Estatísticas por turma
-        cursor.execute("""
-            SELECT t.id, t.nome, t.capacidade, COUNT(a.id) as ocupacao
-            FROM turmas t
-            LEFT JOIN alunos a ON t.id = a.turma_id
-            GROUP BY t.id, t.nome, t.capacidade
-            ORDER BY t.nome
-        """)
-        
-        turmas_stats = []
-        for turma in cursor.fetchall():
-            tid, nome, capacidade, ocupacao = turma
-            percentual = (ocupacao / capacidade) * 100 if capacidade > 0 else 0
-            turmas_stats.append({
-                "turma_id": tid,
-                "turma_nome": nome,
-                "capacidade": capacidade,
-                "ocupacao": ocupacao,
-                "percentual_ocupacao": round(percentual, 1)
-            })
+        if not turma_id or not isinstance(aluno_ids, list) or not aluno_ids:
+            raise HTTPException(status_code=422, detail="turma_id e aluno_ids são obrigatórios")
+        if len(aluno_ids) > 500:
+            raise HTTPException(status_code=422, detail="Máximo de 500 alunos por lote")
+        if not all(isinstance(i, int) and i > 0 for i in aluno_ids):
+            raise HTTPException(status_code=422, detail="IDs de alunos devem ser números positivos")
         
-        cursor.close()
-        conn.close()
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT nome, capacidade FROM turmas WHERE id = %s FOR UPDATE", (turma_id,))
+                turma = cursor.fetchone()
+                if not turma:
+                    raise HTTPException(status_code=404, detail="Turma não encontrada")
+                
+                resultado = matricular_cursor(cursor, turma_id, aluno_ids)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        if resultado["aceitos"]:
+            invalidar_tabelas("alunos", "turmas")
         
         return {
-            "total_alunos": total_alunos,
-            "alunos_ativos": alunos_ativos,
-            "alunos_inativos": alunos_inativos,
-            "total_turmas": total_turmas,
-            "alunos_sem_turma": alunos_sem_turma,
-            "turmas_estatisticas": turmas_stats
+            "turma_id": turma_id,
+            "turma_nome": turma[0],
+            "aceitos": resultado["aceitos"],
+            "rejeitados": resultado["rejeitados"],
+            "ocupacao": resultado["ocupacao"],
+            "vagas_restantes": turma[1] - resultado["ocupacao"],
+            "message": f"{len(resultado['aceitos'])} matrícula(s) realizada(s)"
         }
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/estatisticas")
+def obter_estatisticas():
+    """Obter estatísticas gerais (uma consulta, em cache até a próxima escrita)"""
+    try:
+        def calcular():
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(SQL_ESTATISTICAS)
+                    return montar_estatisticas(cursor.fetchall(), ordenar_por="turma_nome")
+            finally:
+                conn.close()
+        
+        estatisticas, frescor = cache_estatisticas.obter(calcular)
+        return {**estatisticas, "cache": frescor}
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,17 +1,35 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 import sqlite3
 import uvicorn
 from datetime import date, datetime
-import hashlib
 import jwt
 import os
+import time
+from contextlib import asynccontextmanager
+
+from sqlite_pool import SQLitePool, RastreadorConexoes
+from db_async import DBExecutor, AsyncConnection
+from tokens import CacheTokens
+from cache import invalidar_tabelas, instalar_versoes_sqlite, iniciar_versoes_banco, parar_versoes_banco
+from condicional import responder_condicional
+from compressao import Compressao
+from metricas import instalar_metricas, medir_conexao
+from perfil_sql import instalar_perfil, perfilar_conexao
+from cache_respostas import ArmazemRespostas, CacheRespostas, Regra, ESCOPO_USUARIO
+from sessoes import RegistroSessoes
+from senhas import gerar_hash, verificar, hash_senha, verificar_senha, executor_senhas
+from paginacao import Paginacao, LIMITE_MAXIMO
+from serializacao import responder_lista
+from exportacao import exportar
+from importacao import Importacao, importar, registros_csv, registros_json, detectar_formato
+from solicitacoes import MAX_LOTE, LoteRecusado, processar_lote
 
 # Modelos Pydantic
 class UsuarioLogin(BaseModel):
@@ -109,59 +127,155 @@ class SolicitacaoMatricula(SolicitacaoMatriculaBase):
     resposta_admin: Optional[str] = None
     aluno_id: Optional[int] = None  # ID do aluno criado se aprovado
 
+class SolicitacoesLote(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_LOTE)
+    turma_id: Optional[int] = None  # Só na aprovação
+    resposta_admin: Optional[str] = None
+
 # Configuração do banco e JWT
-DB_PATH = "escola.db"
+DB_PATH = os.getenv("ESCOLA_DB_PATH", "escola.db")
+DB_POOL_SIZE = int(os.getenv("ESCOLA_DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("ESCOLA_DB_POOL_TIMEOUT", "30"))
+DB_DEBUG = os.getenv("ESCOLA_DB_DEBUG", "0") == "1"  # Rastreia conexões não devolvidas
+DB_WORKERS = int(os.getenv("ESCOLA_DB_WORKERS", str(DB_POOL_SIZE)))  # Queries simultâneas fora do event loop (a espera por conexão não ocupa thread)
 SECRET_KEY = "escola_secretkey_2025_fabio_sistema"
+SESSAO_DURACAO = float(os.getenv("ESCOLA_SESSAO_HORAS", "24")) * 3600  # Validade do token/sessão
 ALGORITHM = "HS256"
 
 # Security
 security = HTTPBearer()
+cache_tokens = CacheTokens()  # Tokens já verificados (ESCOLA_TOKEN_CACHE_TAMANHO / _TTL)
+registro_sessoes = RegistroSessoes()  # Sessões ativas (tabela sessoes + índice em memória)
+
+# Listagens pagináveis: colunas expostas e chaves de ordenação (keyset)
+PAGINACAO_ALUNOS = Paginacao(
+    {"id": "id", "nome": "nome", "data_nascimento": "data_nascimento",
+     "email": "email", "status": "status", "turma_id": "turma_id"},
+    ordem=["nome", "id"],
+)
+PAGINACAO_TURMAS = Paginacao({"id": "id", "nome": "nome", "capacidade": "capacidade"}, ordem=["nome", "id"])
+PAGINACAO_PROFESSORES = Paginacao(
+    {"id": "id", "nome": "nome", "email": "email", "especialidade": "especialidade",
+     "telefone": "telefone", "status": "status"},
+    ordem=["nome", "id"],
+)
+PAGINACAO_VINCULACOES = Paginacao(
+    {"id": "v.id", "usuario_id": "v.usuario_id", "usuario_nome": "u.username",
+     "aluno_id": "v.aluno_id", "aluno_nome": "a.nome", "tipo_vinculo": "v.tipo_vinculo"},
+    ordem=["usuario_nome", "aluno_nome", "id"],
+)
+PAGINACAO_SOLICITACOES = Paginacao(
+    {"id": "s.id", "usuario_id": "s.usuario_id", "nome_aluno": "s.nome_aluno",
+     "data_nascimento": "s.data_nascimento", "email_aluno": "s.email_aluno",
+     "observacoes": "s.observacoes", "turma_solicitada": "s.turma_solicitada",
+     "status": "s.status", "data_solicitacao": "s.data_solicitacao",
+     "data_resposta": "s.data_resposta", "resposta_admin": "s.resposta_admin",
+     "aluno_id": "s.aluno_id", "username": "u.username", "email_usuario": "u.email"},
+    ordem=["data_solicitacao", "id"],
+    decrescente=True,
+)
+
+def parametros_listagem(
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO, description="Itens por página"),
+    after: Optional[str] = Query(None, description="next_cursor da página anterior")
+) -> dict:
+    """Parâmetros comuns das listagens: projeção de campos e paginação por cursor"""
+    return {"fields": fields, "limit": limit, "after": after}
 
 def hash_password(password: str) -> str:
-    """Cria hash da senha"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Cria hash da senha (KDF com salt; bloqueante, use hash_senha nos endpoints)"""
+    return gerar_hash(password)
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    """Verifica se a senha está correta"""
-    return hash_password(password) == hashed_password
+    """Verifica se a senha está correta (bloqueante, use verificar_senha nos endpoints)"""
+    return verificar(password, hashed_password)
 
-def create_access_token(user_id: int, username: str, tipo_usuario: str):
-    """Cria token JWT"""
+def create_access_token(user_id: int, username: str, tipo_usuario: str, sessao_id: str, expira_em: float):
+    """Cria token JWT da sessão informada"""
     payload = {
         "user_id": user_id,
         "username": username,
         "tipo_usuario": tipo_usuario,
-        "exp": datetime.utcnow().timestamp() + 3600 * 24  # 24 horas
+        "sid": sessao_id,
+        "exp": expira_em
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
+_pool = None
+db_executor = DBExecutor(max_workers=DB_WORKERS)
+
+def get_pool() -> SQLitePool:
+    """Retorna o pool de conexões, criando-o no primeiro uso"""
+    global _pool
+    if _pool is None:
+        _pool = SQLitePool(DB_PATH, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, debug=DB_DEBUG)
+    return _pool
+
 def get_db_connection():
-    """Cria conexão com o banco SQLite"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Conexão do pool SQLite (commit/rollback e devolução ao sair do with)"""
+    return get_pool().connection()
+
+async def get_db():
+    """
+    Dependency: uma conexão e uma transação por requisição.
+    Commit ao final, rollback se o endpoint lançar exceção e
+    devolução garantida ao pool em qualquer caso. Todas as
+    operações rodam no db_executor, fora do event loop.
+    """
+    async with abrir_db() as db:
+        yield db
+
+@asynccontextmanager
+async def abrir_db():
+    """Mesma conexão/transação de get_db, para trechos curtos dentro do endpoint"""
+    pool = get_pool()
+    executor = db_executor
+    conn = await pool.acquire_async(executor)
+    db = AsyncConnection(perfilar_conexao(medir_conexao(conn)), executor)
+    try:
+        yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        await pool.release_async(conn, executor)
+
+def verificar_token(token: str):
+    """Checa assinatura/expiração do JWT; retorna (usuário, exp)"""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    user_id = payload.get("user_id")
+    if user_id is None or payload.get("sid") is None:
+        raise jwt.InvalidTokenError("user_id/sid ausente")
+    usuario = {
+        "id": user_id,
+        "username": payload.get("username"),
+        "tipo_usuario": payload.get("tipo_usuario"),
+        "sid": payload["sid"]
+    }
+    return usuario, payload.get("exp")
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verifica token JWT e retorna usuário atual"""
+    """Verifica token JWT e retorna usuário atual (tokens já verificados vêm do cache)"""
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        username = payload.get("username")
-        tipo_usuario = payload.get("tipo_usuario")
-        
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Token inválido")
-            
-        return {
-            "id": user_id,
-            "username": username,
-            "tipo_usuario": tipo_usuario
-        }
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Token inválido")
-    except Exception as e:
+        usuario = cache_tokens.obter(credentials.credentials, verificar_token)
+    except Exception:
         raise HTTPException(status_code=401, detail="Token inválido")
+    
+    # Sessão encerrada (logout) ou expirada: checagem em memória; só uma sessão
+    # criada em outro worker vai ao banco, na primeira requisição que ela faz aqui
+    if not sessao_ativa(usuario["sid"]):
+        raise HTTPException(status_code=401, detail="Sessão encerrada")
+    return usuario
+
+def sessao_ativa(sid: str) -> bool:
+    if registro_sessoes.ativa(sid):
+        return True
+    if registro_sessoes.recusada(sid):
+        return False
+    with get_db_connection() as conn:
+        return registro_sessoes.buscar(conn, sid)
 
 def require_admin(current_user: dict = Depends(get_current_user)):
     """Verifica se o usuário é administrador"""
@@ -169,9 +283,53 @@ def require_admin(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Acesso negado. Apenas administradores.")
     return current_user
 
+def lista_condicional(*tabelas: str, por_usuario: bool = False):
+    """
+    Dependency das listagens: ETag pelas versões das tabelas lidas e 304 se o
+    cliente já tem a versão atual. Deve vir antes de get_db na assinatura
+    para que o 304 saia sem abrir conexão.
+    """
+    def dependencia(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+        escopo = current_user["id"] if por_usuario else None
+        responder_condicional(request, response, tabelas, escopo)
+    return dependencia
+
+def identificar_usuario(authorization: str) -> Optional[dict]:
+    """Usuário do header Authorization para o cache de respostas (None se não autenticado)"""
+    if not authorization.startswith("Bearer "):
+        return None
+    try:
+        usuario = cache_tokens.obter(authorization[7:], verificar_token)
+    except Exception:
+        return None
+    # Sessão fora do índice (outro worker): sem cache; o endpoint confere no banco
+    return usuario if registro_sessoes.ativa(usuario["sid"]) else None
+
+# Cache de respostas das listagens (invalidado pelas escritas nas mesmas tabelas)
+# Com vários workers (ou escritas por scripts/SQL manual) quem invalida é a versão
+# em versoes_tabelas, lida a cada ESCOLA_VERSOES_INTERVALO s: uma resposta pode
+# ficar até esse intervalo atrasada, nunca até o fim do TTL. Toda tabela usada
+# nas regras abaixo precisa estar em TABELAS_VERSIONADAS.
+cache_respostas = ArmazemRespostas(
+    max_itens=int(os.getenv("ESCOLA_CACHE_RESPOSTAS_ITENS", "512")),
+    max_bytes=int(os.getenv("ESCOLA_CACHE_RESPOSTAS_MB", "32")) * 1024 * 1024
+)
+TABELAS_VERSIONADAS = ("turmas", "professores", "alunos", "vinculacoes", "solicitacoes_matricula")
+REGRAS_CACHE = {
+    "/turmas": Regra(["turmas"], ttl=300),
+    "/professores": Regra(["professores"], ttl=300),
+    "/alunos": Regra(["alunos"], ttl=60),
+    "/vinculacoes": Regra(["vinculacoes", "alunos"], ttl=60),
+    "/meus-alunos": Regra(["alunos", "turmas", "vinculacoes"], ttl=60, escopo=ESCOPO_USUARIO),
+    "/solicitacoes-matricula": Regra(["solicitacoes_matricula"], ttl=30, escopo=ESCOPO_USUARIO),
+}
+
 # Criar app FastAPI
 app = FastAPI(title="Sistema Escolar")
 
+# Cache de respostas (adicionado antes do CORS para que os cabeçalhos CORS não fiquem guardados)
+app.add_middleware(CacheRespostas, armazem=cache_respostas, regras=REGRAS_CACHE, identificar=identificar_usuario)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -181,6 +339,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compressão gzip/brotli (ESCOLA_COMPRESSAO_MINIMO / _NIVEL / ESCOLA_BROTLI_NIVEL; ESCOLA_COMPRESSAO=0 desliga)
+if os.getenv("ESCOLA_COMPRESSAO", "1") == "1":
+    app.add_middleware(Compressao)
+
+if DB_DEBUG:
+    app.add_middleware(RastreadorConexoes, pool_factory=get_pool)
+
+# Perfil de SQL por requisição: X-Query-Count / X-DB-Time e log de queries lentas (ESCOLA_PERFIL_SQL=1)
+instalar_perfil(app)
+
+# Métricas Prometheus em GET /metrics (ESCOLA_METRICAS=0 desliga)
+metricas = instalar_metricas(app, "app_sqlite", {
+    "pool": lambda: get_pool().stats(),
+    "tokens": cache_tokens.stats,
+    "respostas": lambda: {k: v for k, v in cache_respostas.stats().items() if k != "rotas"},
+    "sessoes": registro_sessoes.stats,
+})
+
 def init_database():
     """Inicializar banco de dados e criar tabelas"""
     try:
@@ -193,7 +369,7 @@ def init_database():
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username VARCHAR(50) UNIQUE NOT NULL,
                 email VARCHAR(100) UNIQUE NOT NULL,
-                senha_hash VARCHAR(64) NOT NULL,
+                senha_hash VARCHAR(255) NOT NULL,
                 tipo_usuario TEXT DEFAULT 'usuario',
                 ativo BOOLEAN DEFAULT 1,
                 data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -270,6 +446,19 @@ def init_database():
             )
             """)
             
+            # Índices usados pela ordenação/paginação das listagens
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_alunos_nome ON alunos(nome)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_professores_nome ON professores(nome)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_solicitacoes_data ON solicitacoes_matricula(data_solicitacao)")
+            cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_solicitacoes_usuario_data
+            ON solicitacoes_matricula(usuario_id, data_solicitacao)
+            """)
+            
+            # Versão de cada tabela listada, incrementada por trigger a cada escrita
+            # (ETags e cache de respostas enxergam também escritas de fora do processo)
+            instalar_versoes_sqlite(cursor, TABELAS_VERSIONADAS)
+            
             # Criar admin padrão
             admin_password = hash_password('admin123')
             cursor.execute("""
@@ -333,633 +522,690 @@ def init_database():
                 VALUES (?, ?, ?, ?)
                 """, (username, email, senha_hash, tipo))
             
+            # Tabela de sessões e índice em memória das sessões ativas
+            registro_sessoes.carregar(conn)
+            
             conn.commit()
             print("✅ Banco SQLite inicializado com sucesso!")
             
     except Exception as e:
         print(f"❌ Erro na inicialização do banco: {e}")
 
+def ler_versoes_tabelas() -> dict:
+    with get_db_connection() as conn:
+        registro_sessoes.sincronizar(conn)  # Logouts feitos em outros workers
+        return dict(conn.execute("SELECT tabela, versao FROM versoes_tabelas").fetchall())
+
 @app.on_event("startup")
 async def startup_event():
     init_database()
+    try:
+        iniciar_versoes_banco(ler_versoes_tabelas)
+    except Exception as e:
+        print(f"⚠️ Versões das tabelas indisponíveis, ETags só por processo: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    global _pool
+    parar_versoes_banco()
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+    db_executor.shutdown()
+    executor_senhas.shutdown()
 
 # ENDPOINTS DE AUTENTICAÇÃO
 @app.post("/login")
 async def login(usuario: UsuarioLogin):
     """Login do usuário"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+    # A conexão volta ao pool antes da verificação da senha (KDF lento)
+    async with abrir_db() as db:
+        user_data = await db.fetchone("""
             SELECT id, username, email, senha_hash, tipo_usuario, ativo 
             FROM usuarios WHERE username=? AND ativo=1
         """, (usuario.username,))
+    
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Usuário ou senha incorretos")
+    
+    user_id, username, email, senha_hash, tipo_usuario, ativo = user_data
+    
+    senha_ok, novo_hash = await verificar_senha(usuario.password, senha_hash)
+    if not senha_ok:
+        raise HTTPException(status_code=401, detail="Usuário ou senha incorretos")
+    
+    async with abrir_db() as db:
+        # Atualizar último login (e regravar o hash se estiver no formato antigo)
+        if novo_hash:
+            await db.execute("UPDATE usuarios SET ultimo_login=datetime('now'), senha_hash=? WHERE id=?", (novo_hash, user_id))
+        else:
+            await db.execute("UPDATE usuarios SET ultimo_login=datetime('now') WHERE id=?", (user_id,))
         
-        user_data = cursor.fetchone()
-        if not user_data:
-            raise HTTPException(status_code=401, detail="Usuário ou senha incorretos")
-        
-        user_id, username, email, senha_hash, tipo_usuario, ativo = user_data
-        
-        if not verify_password(usuario.password, senha_hash):
-            raise HTTPException(status_code=401, detail="Usuário ou senha incorretos")
-        
-        # Atualizar último login
-        cursor.execute("UPDATE usuarios SET ultimo_login=datetime('now') WHERE id=?", (user_id,))
-        conn.commit()
-        
-        # Criar token
-        token = create_access_token(user_id, username, tipo_usuario)
-        
-        return {
-            "access_token": token,
-            "token_type": "bearer",
-            "user": {
-                "id": user_id,
-                "username": username,
-                "email": email,
-                "tipo_usuario": tipo_usuario
-            }
+        # Criar sessão
+        sessao_id, criada_em, expira_em = await db.run(registro_sessoes.criar, user_id, SESSAO_DURACAO)
+    registro_sessoes.incluir(sessao_id, user_id, criada_em, expira_em)
+    token = create_access_token(user_id, username, tipo_usuario, sessao_id, expira_em)
+    
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "user": {
+            "id": user_id,
+            "username": username,
+            "email": email,
+            "tipo_usuario": tipo_usuario
         }
+    }
 
 @app.post("/register")
-async def register(usuario: UsuarioCreate):
+async def register(usuario: UsuarioCreate, db: AsyncConnection = Depends(get_db)):
     """Registro de novo usuário"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Verificar se usuário já existe
-        cursor.execute("SELECT id FROM usuarios WHERE username=? OR email=?", 
-                     (usuario.username, usuario.email))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Usuário ou email já existe")
-        
-        # Criar usuário
-        senha_hash = hash_password(usuario.password)
-        cursor.execute("""
-            INSERT INTO usuarios (username, email, senha_hash, tipo_usuario) 
-            VALUES (?, ?, ?, ?)
-        """, (usuario.username, usuario.email, senha_hash, usuario.tipo_usuario))
-        
-        conn.commit()
-        user_id = cursor.lastrowid
-        
-        return {
-            "message": "Usuário criado com sucesso",
-            "user": {
-                "id": user_id,
-                "username": usuario.username,
-                "email": usuario.email,
-                "tipo_usuario": usuario.tipo_usuario
-            }
+    # Verificar se usuário já existe
+    existente = await db.fetchone("SELECT id FROM usuarios WHERE username=? OR email=?", 
+                                  (usuario.username, usuario.email))
+    if existente:
+        raise HTTPException(status_code=400, detail="Usuário ou email já existe")
+    
+    # Criar usuário
+    senha_hash = await hash_senha(usuario.password)
+    cursor = await db.execute("""
+        INSERT INTO usuarios (username, email, senha_hash, tipo_usuario) 
+        VALUES (?, ?, ?, ?)
+    """, (usuario.username, usuario.email, senha_hash, usuario.tipo_usuario))
+    
+    await db.commit()
+    user_id = cursor.lastrowid
+    
+    return {
+        "message": "Usuário criado com sucesso",
+        "user": {
+            "id": user_id,
+            "username": usuario.username,
+            "email": usuario.email,
+            "tipo_usuario": usuario.tipo_usuario
         }
+    }
+
+@app.post("/logout")
+async def logout(
+    todas: bool = Query(False, description="Encerra todas as sessões do usuário"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncConnection = Depends(get_db)
+):
+    """Encerra a sessão atual (ou todas) no servidor; o token deixa de valer na hora"""
+    if todas:
+        sids = await db.run(registro_sessoes.revogar_usuario, current_user["id"])
+    else:
+        sids = [current_user["sid"]] if await db.run(registro_sessoes.revogar, current_user["sid"]) else []
+    await db.commit()
+    registro_sessoes.remover({current_user["sid"], *sids})  # A atual sai mesmo se outro worker já a revogou
+    cache_tokens.invalidar(credentials.credentials)
+    
+    return {"message": "Logout realizado com sucesso", "sessoes_encerradas": len(sids)}
 
 @app.get("/me")
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(current_user: dict = Depends(get_current_user), db: AsyncConnection = Depends(get_db)):
     """Informações do usuário atual"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, username, email, tipo_usuario, ativo, data_criacao, ultimo_login
-            FROM usuarios WHERE id=?
-        """, (current_user["id"],))
-        
-        user_data = cursor.fetchone()
-        if not user_data:
-            raise HTTPException(status_code=404, detail="Usuário não encontrado")
-        
-        return {
-            "id": user_data[0],
-            "username": user_data[1],
-            "email": user_data[2],
-            "tipo_usuario": user_data[3],
-            "ativo": user_data[4],
-            "data_criacao": user_data[5],
-            "ultimo_login": user_data[6]
-        }
+    user_data = await db.fetchone("""
+        SELECT id, username, email, tipo_usuario, ativo, data_criacao, ultimo_login
+        FROM usuarios WHERE id=?
+    """, (current_user["id"],))
+    
+    if not user_data:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    return {
+        "id": user_data[0],
+        "username": user_data[1],
+        "email": user_data[2],
+        "tipo_usuario": user_data[3],
+        "ativo": user_data[4],
+        "data_criacao": user_data[5],
+        "ultimo_login": user_data[6]
+    }
 
 @app.get("/perfil", response_model=PerfilUsuario)
-async def get_perfil_completo(current_user: dict = Depends(get_current_user)):
+async def get_perfil_completo(current_user: dict = Depends(get_current_user), db: AsyncConnection = Depends(get_db)):
     """Perfil completo do usuário com estatísticas"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Buscar dados do usuário
-        cursor.execute("""
-            SELECT id, username, email, tipo_usuario, data_criacao, ultimo_login
-            FROM usuarios WHERE id=?
-        """, (current_user["id"],))
-        
-        user_data = cursor.fetchone()
-        if not user_data:
-            raise HTTPException(status_code=404, detail="Usuário não encontrado")
-        
-        # Calcular tempo de login atual
-        tempo_login = "Primeira sessão"
-        if user_data[5]:
-            try:
-                agora = datetime.now()
-                ultimo_login = datetime.fromisoformat(user_data[5].replace('Z', '+00:00'))
-                delta = agora - ultimo_login
-                horas = int(delta.total_seconds() // 3600)
-                minutos = int((delta.total_seconds() % 3600) // 60)
-                tempo_login = f"{horas}h {minutos}min"
-            except:
-                tempo_login = "N/A"
-        
-        # Contar alunos cadastrados
-        total_alunos = 0
-        if user_data[3] == 'admin':
-            cursor.execute("SELECT COUNT(*) FROM alunos")
-            result = cursor.fetchone()
-            total_alunos = result[0] if result else 0
-        
-        return PerfilUsuario(
-            id=user_data[0],
-            username=user_data[1],
-            email=user_data[2],
-            tipo_usuario=user_data[3],
-            data_criacao=user_data[4] or "N/A",
-            ultimo_login=user_data[5] or "Nunca",
-            tempo_login_atual=tempo_login,
-            total_alunos_cadastrados=total_alunos,
-            total_matriculas_realizadas=0,
-            sessoes_ativas=1
-        )
+    # Buscar dados do usuário
+    user_data = await db.fetchone("""
+        SELECT id, username, email, tipo_usuario, data_criacao, ultimo_login
+        FROM usuarios WHERE id=?
+    """, (current_user["id"],))
+    
+    if not user_data:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    # Tempo desde o login que abriu a sessão atual
+    tempo_login = "N/A"
+    inicio_sessao = registro_sessoes.criada_em(current_user["sid"])
+    if inicio_sessao:
+        segundos = time.time() - inicio_sessao
+        horas = int(segundos // 3600)
+        minutos = int((segundos % 3600) // 60)
+        tempo_login = f"{horas}h {minutos}min"
+    
+    # Contar alunos cadastrados
+    total_alunos = 0
+    if user_data[3] == 'admin':
+        result = await db.fetchone("SELECT COUNT(*) FROM alunos")
+        total_alunos = result[0] if result else 0
+    
+    return PerfilUsuario(
+        id=user_data[0],
+        username=user_data[1],
+        email=user_data[2],
+        tipo_usuario=user_data[3],
+        data_criacao=user_data[4] or "N/A",
+        ultimo_login=user_data[5] or "Nunca",
+        tempo_login_atual=tempo_login,
+        total_alunos_cadastrados=total_alunos,
+        total_matriculas_realizadas=0,
+        sessoes_ativas=await db.run(registro_sessoes.contar, current_user["id"])
+    )
 
 # ENDPOINTS ALUNOS (Protegidos)
-@app.get("/alunos", response_model=List[Aluno])
-async def listar_alunos(current_user: dict = Depends(get_current_user)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome, data_nascimento, email, status, turma_id FROM alunos ORDER BY nome")
-        alunos = cursor.fetchall()
-        
-        result = []
-        for aluno in alunos:
-            result.append({
-                "id": aluno[0],
-                "nome": aluno[1],
-                "data_nascimento": aluno[2],
-                "email": aluno[3],
-                "status": aluno[4],
-                "turma_id": aluno[5]
-            })
-        return result
+@app.get("/alunos")
+async def listar_alunos(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    condicional: None = Depends(lista_condicional("alunos")),
+    db: AsyncConnection = Depends(get_db),
+    listagem: dict = Depends(parametros_listagem)
+):
+    sql, params, campos = PAGINACAO_ALUNOS.consulta("FROM alunos", **listagem)
+    alunos = await db.fetchall(sql, params)
+    return responder_lista(PAGINACAO_ALUNOS.resposta(alunos, campos, listagem["limit"], listagem["after"]), response)
 
 @app.post("/alunos", response_model=Aluno)
-async def criar_aluno(aluno: AlunoCreate, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO alunos (nome, data_nascimento, email, status, turma_id) VALUES (?, ?, ?, ?, ?)",
-            (aluno.nome, aluno.data_nascimento, aluno.email, aluno.status, aluno.turma_id)
-        )
-        conn.commit()
-        aluno_id = cursor.lastrowid
-        
-        return {
-            "id": aluno_id,
-            "nome": aluno.nome,
-            "data_nascimento": aluno.data_nascimento,
-            "email": aluno.email,
-            "status": aluno.status,
-            "turma_id": aluno.turma_id
-        }
+async def criar_aluno(aluno: AlunoCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute(
+        "INSERT INTO alunos (nome, data_nascimento, email, status, turma_id) VALUES (?, ?, ?, ?, ?)",
+        (aluno.nome, aluno.data_nascimento, aluno.email, aluno.status, aluno.turma_id)
+    )
+    await db.commit()
+    invalidar_tabelas("alunos")
+    aluno_id = cursor.lastrowid
+    
+    return {
+        "id": aluno_id,
+        "nome": aluno.nome,
+        "data_nascimento": aluno.data_nascimento,
+        "email": aluno.email,
+        "status": aluno.status,
+        "turma_id": aluno.turma_id
+    }
 
 @app.put("/alunos/{aluno_id}", response_model=Aluno)
-async def atualizar_aluno(aluno_id: int, aluno: AlunoCreate, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE alunos SET nome=?, data_nascimento=?, email=?, status=?, turma_id=? WHERE id=?",
-            (aluno.nome, aluno.data_nascimento, aluno.email, aluno.status, aluno.turma_id, aluno_id)
-        )
-        
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Aluno não encontrado")
-            
-        conn.commit()
+async def atualizar_aluno(aluno_id: int, aluno: AlunoCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute(
+        "UPDATE alunos SET nome=?, data_nascimento=?, email=?, status=?, turma_id=? WHERE id=?",
+        (aluno.nome, aluno.data_nascimento, aluno.email, aluno.status, aluno.turma_id, aluno_id)
+    )
+    
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Aluno não encontrado")
         
-        return {
-            "id": aluno_id,
-            "nome": aluno.nome,
-            "data_nascimento": aluno.data_nascimento,
-            "email": aluno.email,
-            "status": aluno.status,
-            "turma_id": aluno.turma_id
-        }
+    await db.commit()
+    invalidar_tabelas("alunos")
+    
+    return {
+        "id": aluno_id,
+        "nome": aluno.nome,
+        "data_nascimento": aluno.data_nascimento,
+        "email": aluno.email,
+        "status": aluno.status,
+        "turma_id": aluno.turma_id
+    }
 
 @app.delete("/alunos/{aluno_id}")
-async def deletar_aluno(aluno_id: int, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM alunos WHERE id=?", (aluno_id,))
+async def deletar_aluno(aluno_id: int, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute("DELETE FROM alunos WHERE id=?", (aluno_id,))
+    
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Aluno não encontrado")
         
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Aluno não encontrado")
-            
-        conn.commit()
-        return {"message": "Aluno deletado com sucesso"}
+    await db.commit()
+    invalidar_tabelas("alunos")
+    return {"message": "Aluno deletado com sucesso"}
 
 # ENDPOINTS TURMAS (Protegidos)
-@app.get("/turmas", response_model=List[Turma])
-async def listar_turmas(current_user: dict = Depends(get_current_user)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome, capacidade FROM turmas ORDER BY nome")
-        turmas = cursor.fetchall()
-        
-        result = []
-        for turma in turmas:
-            result.append({
-                "id": turma[0],
-                "nome": turma[1],
-                "capacidade": turma[2]
-            })
-        return result
+@app.get("/turmas")
+async def listar_turmas(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    condicional: None = Depends(lista_condicional("turmas")),
+    db: AsyncConnection = Depends(get_db),
+    listagem: dict = Depends(parametros_listagem)
+):
+    sql, params, campos = PAGINACAO_TURMAS.consulta("FROM turmas", **listagem)
+    turmas = await db.fetchall(sql, params)
+    return responder_lista(PAGINACAO_TURMAS.resposta(turmas, campos, listagem["limit"], listagem["after"]), response)
 
 @app.post("/turmas", response_model=Turma)
-async def criar_turma(turma: TurmaCreate, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO turmas (nome, capacidade) VALUES (?, ?)", (turma.nome, turma.capacidade))
-        conn.commit()
-        
-        turma_id = cursor.lastrowid
-        
-        return {
-            "id": turma_id,
-            "nome": turma.nome,
-            "capacidade": turma.capacidade
-        }
+async def criar_turma(turma: TurmaCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute("INSERT INTO turmas (nome, capacidade) VALUES (?, ?)", (turma.nome, turma.capacidade))
+    await db.commit()
+    invalidar_tabelas("turmas")
+    
+    turma_id = cursor.lastrowid
+    
+    return {
+        "id": turma_id,
+        "nome": turma.nome,
+        "capacidade": turma.capacidade
+    }
 
 @app.put("/turmas/{turma_id}", response_model=Turma)
-async def atualizar_turma(turma_id: int, turma: TurmaCreate, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE turmas SET nome=?, capacidade=? WHERE id=?", (turma.nome, turma.capacidade, turma_id))
-        
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Turma não encontrada")
-            
-        conn.commit()
+async def atualizar_turma(turma_id: int, turma: TurmaCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute("UPDATE turmas SET nome=?, capacidade=? WHERE id=?", (turma.nome, turma.capacidade, turma_id))
+    
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Turma não encontrada")
         
-        return {
-            "id": turma_id,
-            "nome": turma.nome,
-            "capacidade": turma.capacidade
-        }
+    await db.commit()
+    invalidar_tabelas("turmas")
+    
+    return {
+        "id": turma_id,
+        "nome": turma.nome,
+        "capacidade": turma.capacidade
+    }
 
 @app.delete("/turmas/{turma_id}")
-async def deletar_turma(turma_id: int, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM turmas WHERE id=?", (turma_id,))
-        
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Turma não encontrada")
-            
-        conn.commit()
+async def deletar_turma(turma_id: int, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute("DELETE FROM turmas WHERE id=?", (turma_id,))
+    
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Turma não encontrada")
         
-        return {"message": "Turma deletada com sucesso"}
+    await db.commit()
+    invalidar_tabelas("turmas")
+    
+    return {"message": "Turma deletada com sucesso"}
 
 # ENDPOINTS PROFESSORES (Protegidos)
-@app.get("/professores", response_model=List[Professor])
-async def listar_professores(current_user: dict = Depends(get_current_user)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome, email, especialidade, telefone, status FROM professores ORDER BY nome")
-        professores = cursor.fetchall()
-        
-        result = []
-        for prof in professores:
-            result.append({
-                "id": prof[0],
-                "nome": prof[1],
-                "email": prof[2],
-                "especialidade": prof[3],
-                "telefone": prof[4],
-                "status": prof[5]
-            })
-        return result
+@app.get("/professores")
+async def listar_professores(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    condicional: None = Depends(lista_condicional("professores")),
+    db: AsyncConnection = Depends(get_db),
+    listagem: dict = Depends(parametros_listagem)
+):
+    sql, params, campos = PAGINACAO_PROFESSORES.consulta("FROM professores", **listagem)
+    professores = await db.fetchall(sql, params)
+    return responder_lista(PAGINACAO_PROFESSORES.resposta(professores, campos, listagem["limit"], listagem["after"]), response)
 
 @app.post("/professores", response_model=Professor)
-async def criar_professor(professor: ProfessorCreate, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO professores (nome, email, especialidade, telefone, status) VALUES (?, ?, ?, ?, ?)",
-            (professor.nome, professor.email, professor.especialidade, professor.telefone, professor.status)
-        )
-        conn.commit()
-        professor_id = cursor.lastrowid
-        
-        return {
-            "id": professor_id,
-            "nome": professor.nome,
-            "email": professor.email,
-            "especialidade": professor.especialidade,
-            "telefone": professor.telefone,
-            "status": professor.status
-        }
+async def criar_professor(professor: ProfessorCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute(
+        "INSERT INTO professores (nome, email, especialidade, telefone, status) VALUES (?, ?, ?, ?, ?)",
+        (professor.nome, professor.email, professor.especialidade, professor.telefone, professor.status)
+    )
+    await db.commit()
+    invalidar_tabelas("professores")
+    professor_id = cursor.lastrowid
+    
+    return {
+        "id": professor_id,
+        "nome": professor.nome,
+        "email": professor.email,
+        "especialidade": professor.especialidade,
+        "telefone": professor.telefone,
+        "status": professor.status
+    }
 
 @app.put("/professores/{professor_id}", response_model=Professor)
-async def atualizar_professor(professor_id: int, professor: ProfessorCreate, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE professores SET nome=?, email=?, especialidade=?, telefone=?, status=? WHERE id=?",
-            (professor.nome, professor.email, professor.especialidade, professor.telefone, professor.status, professor_id)
-        )
-        
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Professor não encontrado")
-            
-        conn.commit()
+async def atualizar_professor(professor_id: int, professor: ProfessorCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute(
+        "UPDATE professores SET nome=?, email=?, especialidade=?, telefone=?, status=? WHERE id=?",
+        (professor.nome, professor.email, professor.especialidade, professor.telefone, professor.status, professor_id)
+    )
+    
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Professor não encontrado")
         
-        return {
-            "id": professor_id,
-            "nome": professor.nome,
-            "email": professor.email,
-            "especialidade": professor.especialidade,
-            "telefone": professor.telefone,
-            "status": professor.status
-        }
+    await db.commit()
+    invalidar_tabelas("professores")
+    
+    return {
+        "id": professor_id,
+        "nome": professor.nome,
+        "email": professor.email,
+        "especialidade": professor.especialidade,
+        "telefone": professor.telefone,
+        "status": professor.status
+    }
 
 @app.delete("/professores/{professor_id}")
-async def deletar_professor(professor_id: int, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM professores WHERE id=?", (professor_id,))
+async def deletar_professor(professor_id: int, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute("DELETE FROM professores WHERE id=?", (professor_id,))
+    
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Professor não encontrado")
         
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Professor não encontrado")
-            
-        conn.commit()
-        return {"message": "Professor deletado com sucesso"}
+    await db.commit()
+    invalidar_tabelas("professores")
+    return {"message": "Professor deletado com sucesso"}
 
 # ENDPOINTS VINCULAÇÕES (Protegidos)
 @app.get("/vinculacoes")
-async def listar_vinculacoes(admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT v.id, v.usuario_id, u.username, v.aluno_id, a.nome, v.tipo_vinculo
-            FROM vinculacoes v
-            JOIN usuarios u ON v.usuario_id = u.id
-            JOIN alunos a ON v.aluno_id = a.id
-            ORDER BY u.username, a.nome
-        """)
-        vinculacoes = cursor.fetchall()
-        
-        result = []
-        for v in vinculacoes:
-            result.append({
-                "id": v[0],
-                "usuario_id": v[1],
-                "usuario_nome": v[2],
-                "aluno_id": v[3],
-                "aluno_nome": v[4],
-                "tipo_vinculo": v[5]
-            })
-        return result
+async def listar_vinculacoes(
+    response: Response,
+    admin_user: dict = Depends(require_admin),
+    condicional: None = Depends(lista_condicional("vinculacoes", "alunos")),
+    db: AsyncConnection = Depends(get_db),
+    listagem: dict = Depends(parametros_listagem)
+):
+    sql, params, campos = PAGINACAO_VINCULACOES.consulta("""
+        FROM vinculacoes v
+        JOIN usuarios u ON v.usuario_id = u.id
+        JOIN alunos a ON v.aluno_id = a.id
+    """, **listagem)
+    vinculacoes = await db.fetchall(sql, params)
+    return responder_lista(PAGINACAO_VINCULACOES.resposta(vinculacoes, campos, listagem["limit"], listagem["after"]), response)
 
 @app.post("/vinculacoes")
-async def criar_vinculacao(vinculacao: VinculacaoCreate, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Verificar se usuário e aluno existem
-        cursor.execute("SELECT id FROM usuarios WHERE id=? AND tipo_usuario='usuario'", (vinculacao.usuario_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Usuário não encontrado")
-        
-        cursor.execute("SELECT id FROM alunos WHERE id=?", (vinculacao.aluno_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Aluno não encontrado")
-        
-        try:
-            cursor.execute(
-                "INSERT INTO vinculacoes (usuario_id, aluno_id, tipo_vinculo) VALUES (?, ?, ?)",
-                (vinculacao.usuario_id, vinculacao.aluno_id, vinculacao.tipo_vinculo)
-            )
-            conn.commit()
-            return {"message": "Vinculação criada com sucesso", "id": cursor.lastrowid}
-        except sqlite3.IntegrityError:
-            raise HTTPException(status_code=400, detail="Vinculação já existe")
+async def criar_vinculacao(vinculacao: VinculacaoCreate, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    # Verificar se usuário e aluno existem
+    if not await db.fetchone("SELECT id FROM usuarios WHERE id=? AND tipo_usuario='usuario'", (vinculacao.usuario_id,)):
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    if not await db.fetchone("SELECT id FROM alunos WHERE id=?", (vinculacao.aluno_id,)):
+        raise HTTPException(status_code=404, detail="Aluno não encontrado")
+    
+    try:
+        cursor = await db.execute(
+            "INSERT INTO vinculacoes (usuario_id, aluno_id, tipo_vinculo) VALUES (?, ?, ?)",
+            (vinculacao.usuario_id, vinculacao.aluno_id, vinculacao.tipo_vinculo)
+        )
+        await db.commit()
+        invalidar_tabelas("vinculacoes")
+        return {"message": "Vinculação criada com sucesso", "id": cursor.lastrowid}
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=400, detail="Vinculação já existe")
 
 @app.delete("/vinculacoes/{vinculacao_id}")
-async def deletar_vinculacao(vinculacao_id: int, admin_user: dict = Depends(require_admin)):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM vinculacoes WHERE id=?", (vinculacao_id,))
+async def deletar_vinculacao(vinculacao_id: int, admin_user: dict = Depends(require_admin), db: AsyncConnection = Depends(get_db)):
+    cursor = await db.execute("DELETE FROM vinculacoes WHERE id=?", (vinculacao_id,))
+    
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Vinculação não encontrada")
         
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Vinculação não encontrada")
-            
-        conn.commit()
-        return {"message": "Vinculação deletada com sucesso"}
+    await db.commit()
+    invalidar_tabelas("vinculacoes")
+    return {"message": "Vinculação deletada com sucesso"}
 
 # ENDPOINT PARA USUÁRIOS VEREM SEUS ALUNOS
 @app.get("/meus-alunos")
-async def listar_meus_alunos(current_user: dict = Depends(get_current_user)):
+async def listar_meus_alunos(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    condicional: None = Depends(lista_condicional("alunos", "turmas", "vinculacoes", por_usuario=True)),
+    db: AsyncConnection = Depends(get_db)
+):
     """Usuários comuns veem apenas os alunos vinculados a eles"""
     if current_user["tipo_usuario"] == "admin":
         # Admin vê todos os alunos
-        return await listar_alunos(current_user)
+        return await listar_alunos(response=response, current_user=current_user, condicional=None, db=db,
+                                   listagem={"fields": None, "limit": None, "after": None})
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT a.id, a.nome, a.data_nascimento, a.email, a.status, a.turma_id, t.nome as turma_nome
-            FROM alunos a
-            LEFT JOIN turmas t ON a.turma_id = t.id
-            JOIN vinculacoes v ON a.id = v.aluno_id
-            WHERE v.usuario_id = ?
-            ORDER BY a.nome
-        """, (current_user["id"],))
-        
-        alunos = cursor.fetchall()
-        
-        result = []
-        for aluno in alunos:
-            result.append({
-                "id": aluno[0],
-                "nome": aluno[1],
-                "data_nascimento": aluno[2],
-                "email": aluno[3],
-                "status": aluno[4],
-                "turma_id": aluno[5],
-                "turma_nome": aluno[6] if aluno[6] else "Sem turma"
-            })
-        return result
+    alunos = await db.fetchdicts("""
+        SELECT a.id, a.nome, a.data_nascimento, a.email, a.status, a.turma_id,
+               COALESCE(NULLIF(t.nome, ''), 'Sem turma') as turma_nome
+        FROM alunos a
+        LEFT JOIN turmas t ON a.turma_id = t.id
+        JOIN vinculacoes v ON a.id = v.aluno_id
+        WHERE v.usuario_id = ?
+        ORDER BY a.nome
+    """, (current_user["id"],))
+    return responder_lista(alunos, response)
 
 # ==================== ENDPOINTS DE SOLICITAÇÕES DE MATRÍCULA ====================
 
 @app.post("/solicitacoes-matricula")
 async def criar_solicitacao_matricula(
     solicitacao: SolicitacaoMatriculaCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncConnection = Depends(get_db)
 ):
     """Usuário comum cria solicitação de matrícula"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO solicitacoes_matricula 
-            (usuario_id, nome_aluno, data_nascimento, email_aluno, observacoes, turma_solicitada)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            current_user["id"],
-            solicitacao.nome_aluno,
-            solicitacao.data_nascimento,
-            solicitacao.email_aluno,
-            solicitacao.observacoes,
-            solicitacao.turma_solicitada
-        ))
-        
-        solicitacao_id = cursor.lastrowid
-        conn.commit()
-        
-        return {
-            "id": solicitacao_id,
-            "message": "Solicitação de matrícula enviada com sucesso! Aguarde a análise do administrador."
-        }
+    cursor = await db.execute("""
+        INSERT INTO solicitacoes_matricula 
+        (usuario_id, nome_aluno, data_nascimento, email_aluno, observacoes, turma_solicitada)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (
+        current_user["id"],
+        solicitacao.nome_aluno,
+        solicitacao.data_nascimento,
+        solicitacao.email_aluno,
+        solicitacao.observacoes,
+        solicitacao.turma_solicitada
+    ))
+    
+    solicitacao_id = cursor.lastrowid
+    await db.commit()
+    invalidar_tabelas("solicitacoes_matricula")
+    
+    return {
+        "id": solicitacao_id,
+        "message": "Solicitação de matrícula enviada com sucesso! Aguarde a análise do administrador."
+    }
 
 @app.get("/solicitacoes-matricula")
-async def listar_solicitacoes_matricula(current_user: dict = Depends(get_current_user)):
+async def listar_solicitacoes_matricula(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    condicional: None = Depends(lista_condicional("solicitacoes_matricula", por_usuario=True)),
+    db: AsyncConnection = Depends(get_db),
+    listagem: dict = Depends(parametros_listagem)
+):
     """Lista solicitações de matrícula (admin vê todas, usuário vê apenas suas)"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        if current_user["tipo_usuario"] == "admin":
-            # Admin vê todas as solicitações
-            cursor.execute("""
-                SELECT s.*, u.username, u.email as email_usuario
-                FROM solicitacoes_matricula s
-                JOIN usuarios u ON s.usuario_id = u.id
-                ORDER BY s.data_solicitacao DESC
-            """)
-        else:
-            # Usuário comum vê apenas suas solicitações
-            cursor.execute("""
-                SELECT s.*, u.username, u.email as email_usuario
-                FROM solicitacoes_matricula s
-                JOIN usuarios u ON s.usuario_id = u.id
-                WHERE s.usuario_id = ?
-                ORDER BY s.data_solicitacao DESC
-            """, (current_user["id"],))
-        
-        solicitacoes = cursor.fetchall()
-        
-        result = []
-        for s in solicitacoes:
-            result.append({
-                "id": s[0],
-                "usuario_id": s[1],
-                "nome_aluno": s[2],
-                "data_nascimento": s[3],
-                "email_aluno": s[4],
-                "observacoes": s[5],
-                "turma_solicitada": s[6],
-                "status": s[7],
-                "data_solicitacao": s[8],
-                "data_resposta": s[9],
-                "resposta_admin": s[10],
-                "aluno_id": s[11],
-                "username": s[12],
-                "email_usuario": s[13]
-            })
-        
-        return result
+    where, params = [], []
+    if current_user["tipo_usuario"] != "admin":
+        # Usuário comum vê apenas suas solicitações
+        where.append("s.usuario_id = ?")
+        params.append(current_user["id"])
+    
+    sql, params, campos = PAGINACAO_SOLICITACOES.consulta("""
+        FROM solicitacoes_matricula s
+        JOIN usuarios u ON s.usuario_id = u.id
+    """, where, params, **listagem)
+    solicitacoes = await db.fetchall(sql, params)
+    return responder_lista(PAGINACAO_SOLICITACOES.resposta(solicitacoes, campos, listagem["limit"], listagem["after"]), response)
 
 @app.put("/solicitacoes-matricula/{solicitacao_id}/aprovar")
 async def aprovar_solicitacao_matricula(
     solicitacao_id: int,
     resposta: dict,
-    current_user: dict = Depends(require_admin)
+    current_user: dict = Depends(require_admin),
+    db: AsyncConnection = Depends(get_db)
 ):
     """Admin aprova solicitação e cria o aluno"""
     turma_id = resposta.get("turma_id")
     resposta_admin = resposta.get("resposta_admin", "Solicitação aprovada")
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Buscar dados da solicitação
-        cursor.execute("SELECT * FROM solicitacoes_matricula WHERE id = ?", (solicitacao_id,))
-        solicitacao = cursor.fetchone()
-        
-        if not solicitacao:
-            raise HTTPException(status_code=404, detail="Solicitação não encontrada")
-        
-        if solicitacao[7] != 'pendente':  # status
-            raise HTTPException(status_code=400, detail="Solicitação já foi processada")
-        
-        # Criar o aluno
-        cursor.execute("""
-            INSERT INTO alunos (nome, data_nascimento, email, status, turma_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            solicitacao[2],  # nome_aluno
-            solicitacao[3],  # data_nascimento
-            solicitacao[4],  # email_aluno
-            'ativo',
-            turma_id
-        ))
-        
-        aluno_id = cursor.lastrowid
-        
-        # Criar vínculo entre usuário e aluno
-        cursor.execute("""
-            INSERT INTO vinculacoes (usuario_id, aluno_id, tipo_vinculo)
-            VALUES (?, ?, ?)
-        """, (solicitacao[1], aluno_id, 'responsavel'))  # usuario_id
-        
-        # Atualizar solicitação
-        cursor.execute("""
-            UPDATE solicitacoes_matricula 
-            SET status = 'aprovada', data_resposta = CURRENT_TIMESTAMP, 
-                resposta_admin = ?, aluno_id = ?
-            WHERE id = ?
-        """, (resposta_admin, aluno_id, solicitacao_id))
-        
-        conn.commit()
-        
-        return {
-            "message": "Solicitação aprovada e aluno criado com sucesso!",
-            "aluno_id": aluno_id
-        }
+    # Buscar dados da solicitação
+    solicitacao = await db.fetchone("SELECT * FROM solicitacoes_matricula WHERE id = ?", (solicitacao_id,))
+    
+    if not solicitacao:
+        raise HTTPException(status_code=404, detail="Solicitação não encontrada")
+    
+    if solicitacao[7] != 'pendente':  # status
+        raise HTTPException(status_code=400, detail="Solicitação já foi processada")
+    
+    # Criar o aluno
+    cursor = await db.execute("""
+        INSERT INTO alunos (nome, data_nascimento, email, status, turma_id)
+        VALUES (?, ?, ?, ?, ?)
+    """, (
+        solicitacao[2],  # nome_aluno
+        solicitacao[3],  # data_nascimento
+        solicitacao[4],  # email_aluno
+        'ativo',
+        turma_id
+    ))
+    
+    aluno_id = cursor.lastrowid
+    
+    # Criar vínculo entre usuário e aluno
+    await db.execute("""
+        INSERT INTO vinculacoes (usuario_id, aluno_id, tipo_vinculo)
+        VALUES (?, ?, ?)
+    """, (solicitacao[1], aluno_id, 'responsavel'))  # usuario_id
+    
+    # Atualizar solicitação
+    await db.execute("""
+        UPDATE solicitacoes_matricula 
+        SET status = 'aprovada', data_resposta = CURRENT_TIMESTAMP, 
+            resposta_admin = ?, aluno_id = ?
+        WHERE id = ?
+    """, (resposta_admin, aluno_id, solicitacao_id))
+    
+    await db.commit()
+    invalidar_tabelas("solicitacoes_matricula", "alunos", "vinculacoes")
+    
+    return {
+        "message": "Solicitação aprovada e aluno criado com sucesso!",
+        "aluno_id": aluno_id
+    }
 
 @app.put("/solicitacoes-matricula/{solicitacao_id}/rejeitar")
 async def rejeitar_solicitacao_matricula(
     solicitacao_id: int,
     resposta: dict,
-    current_user: dict = Depends(require_admin)
+    current_user: dict = Depends(require_admin),
+    db: AsyncConnection = Depends(get_db)
 ):
     """Admin rejeita solicitação"""
     resposta_admin = resposta.get("resposta_admin", "Solicitação rejeitada")
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT status FROM solicitacoes_matricula WHERE id = ?", (solicitacao_id,))
-        result = cursor.fetchone()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="Solicitação não encontrada")
-        
-        if result[0] != 'pendente':
-            raise HTTPException(status_code=400, detail="Solicitação já foi processada")
-        
-        cursor.execute("""
-            UPDATE solicitacoes_matricula 
-            SET status = 'rejeitada', data_resposta = CURRENT_TIMESTAMP, resposta_admin = ?
-            WHERE id = ?
-        """, (resposta_admin, solicitacao_id))
-        
-        conn.commit()
-        
-        return {"message": "Solicitação rejeitada"}
+    result = await db.fetchone("SELECT status FROM solicitacoes_matricula WHERE id = ?", (solicitacao_id,))
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Solicitação não encontrada")
+    
+    if result[0] != 'pendente':
+        raise HTTPException(status_code=400, detail="Solicitação já foi processada")
+    
+    await db.execute("""
+        UPDATE solicitacoes_matricula 
+        SET status = 'rejeitada', data_resposta = CURRENT_TIMESTAMP, resposta_admin = ?
+        WHERE id = ?
+    """, (resposta_admin, solicitacao_id))
+    
+    await db.commit()
+    invalidar_tabelas("solicitacoes_matricula")
+    
+    return {"message": "Solicitação rejeitada"}
+
+async def processar_solicitacoes(acao: str, lote: SolicitacoesLote, db: AsyncConnection):
+    try:
+        resultado = await db.run(processar_lote, acao, lote.ids, lote.turma_id, lote.resposta_admin)
+    except LoteRecusado as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    await db.commit()
+    if resultado["processadas"]:
+        invalidar_tabelas("solicitacoes_matricula", "alunos", "vinculacoes")
+    return resultado
+
+@app.post("/solicitacoes-matricula/lote/aprovar")
+async def aprovar_solicitacoes_em_lote(
+    lote: SolicitacoesLote,
+    current_user: dict = Depends(require_admin),
+    db: AsyncConnection = Depends(get_db)
+):
+    """Admin aprova várias solicitações em uma transação (resultado por item)"""
+    return await processar_solicitacoes("aprovar", lote, db)
+
+@app.post("/solicitacoes-matricula/lote/rejeitar")
+async def rejeitar_solicitacoes_em_lote(
+    lote: SolicitacoesLote,
+    current_user: dict = Depends(require_admin),
+    db: AsyncConnection = Depends(get_db)
+):
+    """Admin rejeita várias solicitações em uma transação (resultado por item)"""
+    return await processar_solicitacoes("rejeitar", lote, db)
+
+# ===== CACHES (ADMIN) =====
+
+@app.get("/admin/cache")
+async def estatisticas_cache(admin_user: dict = Depends(require_admin)):
+    """Taxa de acerto e memória do cache de respostas, do cache de tokens e das sessões"""
+    return {
+        "respostas": cache_respostas.stats(),
+        "tokens": cache_tokens.stats(),
+        "sessoes": registro_sessoes.stats()
+    }
+
+# ===== IMPORTAÇÃO EM LOTE (ADMIN) =====
+
+IMPORTACOES = {
+    "alunos": Importacao("alunos", AlunoCreate, ["nome", "data_nascimento", "email", "status", "turma_id"]),
+    "professores": Importacao("professores", ProfessorCreate, ["nome", "email", "especialidade", "telefone", "status"]),
+    "turmas": Importacao("turmas", TurmaCreate, ["nome", "capacidade"]),
+}
+
+@app.post("/import/{entidade}")
+async def importar_em_lote(
+    entidade: str,
+    request: Request,
+    formato: Optional[str] = Query(None, pattern="^(csv|json)$", description="csv ou json (padrão: pelo Content-Type)"),
+    lote: int = Query(1000, ge=1, le=10000, description="Linhas por transação"),
+    admin_user: dict = Depends(require_admin)
+):
+    """
+    Importa um CSV (com cabeçalho) ou um array JSON enviado no corpo da requisição.
+    Ex.: curl -X POST -H "Content-Type: text/csv" --data-binary @alunos.csv .../import/alunos
+    """
+    importacao = IMPORTACOES.get(entidade)
+    if not importacao:
+        raise HTTPException(status_code=404, detail=f"Importação disponível para: {', '.join(IMPORTACOES)}")
+    
+    formato = detectar_formato(request.headers.get("content-type"), formato)
+    if not formato:
+        raise HTTPException(status_code=415, detail="Envie text/csv ou application/json (ou use ?formato=)")
+    
+    leitor = registros_csv if formato == "csv" else registros_json
+    relatorio = await importar(leitor(request.stream()), importacao, get_pool(), db_executor, lote)
+    if relatorio["inseridos"]:
+        invalidar_tabelas(importacao.tabela)
+    return relatorio
+
+# ===== EXPORTAÇÃO (ADMIN) =====
+
+def parametros_exportacao(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson ou csv"),
+    gzip: bool = Query(False, description="Comprime a resposta com gzip"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)")
+) -> dict:
+    """Parâmetros comuns das exportações"""
+    return {"formato": formato, "gzip": gzip, "fields": fields}
+
+@app.get("/export/alunos")
+async def exportar_alunos(
+    admin_user: dict = Depends(require_admin),
+    exportacao: dict = Depends(parametros_exportacao)
+):
+    """Exporta todos os alunos em streaming (mesma consulta de /alunos)"""
+    sql, params, campos = PAGINACAO_ALUNOS.consulta("FROM alunos", fields=exportacao["fields"])
+    return exportar(get_pool(), db_executor, sql, params, campos,
+                    exportacao["formato"], exportacao["gzip"], "alunos")
+
+@app.get("/export/solicitacoes")
+async def exportar_solicitacoes(
+    admin_user: dict = Depends(require_admin),
+    exportacao: dict = Depends(parametros_exportacao)
+):
+    """Exporta todas as solicitações de matrícula em streaming (mesma consulta de /solicitacoes-matricula)"""
+    sql, params, campos = PAGINACAO_SOLICITACOES.consulta("""
+        FROM solicitacoes_matricula s
+        JOIN usuarios u ON s.usuario_id = u.id
+    """, fields=exportacao["fields"])
+    return exportar(get_pool(), db_executor, sql, params, campos,
+                    exportacao["formato"], exportacao["gzip"], "solicitacoes")
 
 @app.get("/")
 async def root():
@@ -968,11 +1214,12 @@ async def root():
 @app.get("/test-db")
 async def test_db():
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM alunos")
-            count = cursor.fetchone()[0]
-        return {"status": "OK", "alunos": count, "database": "SQLite"}
+        def contar_alunos():
+            with get_db_connection() as conn:
+                return conn.execute("SELECT COUNT(*) FROM alunos").fetchone()[0]
+        count = await db_executor.run(contar_alunos)
+        return {"status": "OK", "alunos": count, "database": "SQLite", "pool": get_pool().stats(),
+                "tokens": cache_tokens.stats(), "sessoes": registro_sessoes.stats()}
     except Exception as e:
         return {"status": "ERROR", "error": str(e)}
 
@@ -0,0 +1,97 @@
+# Benchmark: latência de /turmas enquanto uma listagem pesada de
+# /solicitacoes-matricula roda em paralelo, com e sem o DBExecutor
+# Uso: python benchmarks/bench_async.py [qtd_solicitacoes] [repeticoes]
+import sys
+import threading
+import time
+
+from comum import banco_temporario, carregar_app_sqlite, token_admin, resumo, imprimir_tabela
+
+from fastapi.testclient import TestClient
+
+
+class ExecutorBloqueante:
+    """Comportamento antigo: a query roda direto no event loop"""
+
+    max_workers = 1
+
+    async def run(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    def shutdown(self):
+        pass
+
+
+def popular_solicitacoes(conn, quantidade: int):
+    conn.executemany(
+        """INSERT INTO solicitacoes_matricula
+           (usuario_id, nome_aluno, data_nascimento, email_aluno, observacoes, turma_solicitada, data_solicitacao)
+           VALUES (?, ?, ?, ?, ?, ?, datetime('now', ?))""",
+        (
+            (2 + i % 3, f"Candidato {i:07d}", "2014-05-05", f"cand{i}@bench.com",
+             "Observação de teste " * 4, "1º Ano A", f"-{i % 86400} seconds")
+            for i in range(quantidade)
+        ),
+    )
+    conn.commit()
+
+
+def cenario(app_sqlite, executor, repeticoes: int) -> dict:
+    app_sqlite.db_executor = executor
+    with TestClient(app_sqlite.app) as client:
+        headers = token_admin(client)
+        parar = threading.Event()
+
+        def carga_pesada():
+            while not parar.is_set():
+                client.get("/solicitacoes-matricula", headers=headers)
+
+        trabalhadores = [threading.Thread(target=carga_pesada) for _ in range(2)]
+        for t in trabalhadores:
+            t.start()
+        time.sleep(0.2)
+
+        latencias = []
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            client.get("/turmas", headers=headers).raise_for_status()
+            latencias.append(time.perf_counter() - t0)
+        total = time.perf_counter() - inicio
+
+        parar.set()
+        for t in trabalhadores:
+            t.join()
+    return resumo(latencias, total)
+
+
+def executar(qtd: int, repeticoes: int):
+    db_path = banco_temporario()
+    app_sqlite = carregar_app_sqlite(db_path)
+    with app_sqlite.get_db_connection() as conn:
+        popular_solicitacoes(conn, qtd)
+
+    executor_original = app_sqlite.db_executor
+    resultados = {
+        "/turmas sem carga": None,
+        "/turmas bloqueante": cenario(app_sqlite, ExecutorBloqueante(), repeticoes),
+        f"/turmas DBExecutor({executor_original.max_workers})": cenario(app_sqlite, executor_original, repeticoes),
+    }
+    app_sqlite.db_executor = executor_original
+    with TestClient(app_sqlite.app) as client:
+        headers = token_admin(client)
+        latencias = []
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            client.get("/turmas", headers=headers)
+            latencias.append(time.perf_counter() - t0)
+        resultados["/turmas sem carga"] = resumo(latencias, time.perf_counter() - inicio)
+
+    imprimir_tabela(f"/turmas com {qtd} solicitações sendo listadas em paralelo", resultados)
+
+
+if __name__ == "__main__":
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rep = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    executar(qtd, rep)
@@ -0,0 +1,87 @@
+# Benchmark: busca de alunos com LIKE '%termo%' vs. FTS5 (alunos_fts)
+# Uso: python benchmarks/bench_busca.py [qtd_alunos] [repeticoes]
+import random
+import sqlite3
+import sys
+
+from comum import banco_temporario, medir, imprimir_tabela
+
+from busca import SQL_BUSCA_FTS, criar_fts_sqlite, expressao_fts
+
+NOMES = ["João", "José", "Maria", "Ana", "Antônio", "Lúcia", "Márcio", "Conceição", "Pedro", "Inês",
+         "Luís", "Fábio", "Sônia", "Cláudia", "Sérgio", "Helena", "Rafael", "Beatriz", "Otávio", "Flávia"]
+SOBRENOMES = ["Silva", "Souza", "Araújo", "Gonçalves", "Simões", "Magalhães", "Conceição", "Brandão",
+              "Lima", "Pereira", "Guimarães", "Assunção", "Ribeiro", "Patrício", "Falcão", "Costa"]
+
+# (rótulo, termo digitado pelo usuário)
+BUSCAS = [
+    ("nome com acento", "João"),
+    ("nome sem acento", "Joao"),
+    ("prefixo", "Gui"),
+    ("dois termos", "maria araujo"),
+    ("email", "aluno4242"),
+]
+
+SQL_LIKE = """
+    SELECT id, nome, email FROM alunos
+    WHERE nome LIKE ? OR email LIKE ?
+    ORDER BY nome, id
+"""
+SQL_FTS = f"""
+    SELECT a.id, a.nome, a.email FROM ({SQL_BUSCA_FTS}) busca
+    JOIN alunos a ON a.id = busca.id
+    ORDER BY busca.rank, a.nome, a.id
+"""
+
+
+def criar_banco(qtd_alunos: int) -> sqlite3.Connection:
+    """Tabela alunos (mesmo formato do app_sqlite) com nomes acentuados"""
+    conn = sqlite3.connect(banco_temporario())
+    conn.execute("""
+        CREATE TABLE alunos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            data_nascimento DATE NOT NULL,
+            email TEXT,
+            status TEXT DEFAULT 'ativo',
+            turma_id INTEGER
+        )
+    """)
+    # Triggers antes da carga: mede também o custo de manter o índice
+    criar_fts_sqlite(conn)
+    rnd = random.Random(42)
+    conn.executemany(
+        "INSERT INTO alunos (nome, data_nascimento, email) VALUES (?, '2012-01-01', ?)",
+        (
+            (f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}", f"aluno{i}@escola.com")
+            for i in range(qtd_alunos)
+        ),
+    )
+    conn.commit()
+    return conn
+
+
+def executar(qtd_alunos: int, repeticoes: int):
+    conn = criar_banco(qtd_alunos)
+
+    resultados = {}
+    encontrados = []
+    for rotulo, termo in BUSCAS:
+        like = (f"%{termo}%", f"%{termo}%")
+        fts = (expressao_fts(termo),)
+        resultados[f"LIKE {rotulo}"] = medir(lambda: conn.execute(SQL_LIKE, like).fetchall(), repeticoes)
+        resultados[f"FTS5 {rotulo}"] = medir(lambda: conn.execute(SQL_FTS, fts).fetchall(), repeticoes)
+        encontrados.append((rotulo, termo, len(conn.execute(SQL_LIKE, like).fetchall()),
+                            len(conn.execute(SQL_FTS, fts).fetchall())))
+
+    imprimir_tabela(f"Busca de alunos ({qtd_alunos} alunos)", resultados)
+    print(f"\n{'busca':<20}{'termo':<16}{'LIKE':>10}{'FTS5':>10}")
+    for rotulo, termo, total_like, total_fts in encontrados:
+        print(f"{rotulo:<20}{termo:<16}{total_like:>10}{total_fts:>10}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rep = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    executar(qtd, rep)
@@ -0,0 +1,67 @@
+# Benchmark: custo de CPU vs. bytes economizados ao comprimir o JSON de /alunos
+# Uso: python benchmarks/bench_compressao.py [tamanhos separados por vírgula] [repeticoes]
+import sqlite3
+import sys
+import time
+
+from comum import banco_temporario, carregar_app_sqlite, popular_alunos, token_admin, percentil
+
+from fastapi.testclient import TestClient
+
+import compressao
+from cache import invalidar_tabelas
+
+
+def corpo_alunos(client, cabecalho) -> bytes:
+    resposta = client.get("/alunos", headers={**cabecalho, "Accept-Encoding": "identity"})
+    resposta.raise_for_status()
+    return resposta.content
+
+
+def medir_compressao(corpo: bytes, codificacao: str, nivel: int, repeticoes: int) -> dict:
+    tempos = []
+    comprimido = b""
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        compressor = compressao.novo_compressor(codificacao, nivel_gzip=nivel, nivel_brotli=nivel)
+        comprimido = compressor.comprimir(corpo) + compressor.finalizar()
+        tempos.append(time.perf_counter() - t0)
+    p50 = percentil(tempos, 50)
+    return {
+        "bytes": len(comprimido),
+        "razao": len(corpo) / len(comprimido),
+        "p50_ms": p50 * 1000,
+        "mb_por_s": len(corpo) / p50 / 1024 / 1024 if p50 else 0.0,
+    }
+
+
+def executar(tamanhos, repeticoes: int):
+    app_sqlite = carregar_app_sqlite(banco_temporario())
+    variantes = [("gzip", 1), ("gzip", 6), ("gzip", 9)]
+    if compressao.brotli is not None:
+        variantes += [("br", 1), ("br", 4), ("br", 9)]
+    else:
+        print("ℹ️ brotli não instalado: medindo só gzip")
+
+    print(f"\n📊 Compressão de /alunos ({repeticoes} repetições, p50)")
+    print("-" * 78)
+    print(f"{'alunos':>8}{'codificação':>14}{'original KB':>14}{'final KB':>11}{'razão':>8}{'CPU ms':>10}{'MB/s':>10}")
+    with TestClient(app_sqlite.app) as client:
+        cabecalho = token_admin(client)
+        conn = sqlite3.connect(app_sqlite.DB_PATH)
+        for tamanho in tamanhos:
+            conn.execute("DELETE FROM alunos")
+            popular_alunos(conn, tamanho)
+            invalidar_tabelas("alunos")  # Escrita fora da API: descarta o cache de respostas
+            corpo = corpo_alunos(client, cabecalho)
+            for codificacao, nivel in variantes:
+                r = medir_compressao(corpo, codificacao, nivel, repeticoes)
+                print(f"{tamanho:>8}{f'{codificacao}-{nivel}':>14}{len(corpo) / 1024:>14.1f}"
+                      f"{r['bytes'] / 1024:>11.1f}{r['razao']:>8.1f}{r['p50_ms']:>10.2f}{r['mb_por_s']:>10.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    tamanhos = [int(t) for t in sys.argv[1].split(",")] if len(sys.argv) > 1 else [100, 1000, 10000, 50000]
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    executar(sorted(tamanhos), repeticoes)
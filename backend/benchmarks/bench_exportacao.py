@@ -0,0 +1,85 @@
+# Benchmark: exportação em streaming de /export/alunos
+# Mede tempo e tamanho do download completo (NDJSON, CSV, gzip) e confere que
+# um cliente que desconecta no meio do download devolve a conexão ao pool:
+# depois de N downloads abortados, "em_uso" tem que voltar a zero.
+# Uso: python benchmarks/bench_exportacao.py [alunos] [abortados]
+import asyncio
+import sqlite3
+import sys
+import time
+
+from comum import banco_temporario, carregar_app_sqlite, popular_alunos, token_admin
+
+from fastapi.testclient import TestClient
+
+
+def medir_download(client, cabecalho, formato: str, comprimir: bool) -> dict:
+    inicio = time.perf_counter()
+    with client.stream("GET", "/export/alunos", params={"formato": formato, "gzip": comprimir},
+                       headers={**cabecalho, "Accept-Encoding": "identity"}) as resposta:
+        resposta.raise_for_status()
+        tamanho = sum(len(pedaco) for pedaco in resposta.iter_raw())  # Bytes transferidos (sem descomprimir)
+    return {"segundos": time.perf_counter() - inicio, "bytes": tamanho}
+
+
+async def download_abortado(app, cabecalho: dict):
+    """Chamada ASGI que recebe o primeiro pedaço do corpo e desconecta"""
+    primeiro_pedaco = asyncio.Event()
+    pedidos = 0
+
+    async def receive():
+        nonlocal pedidos
+        pedidos += 1
+        if pedidos == 1:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await primeiro_pedaco.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(mensagem):
+        if mensagem["type"] == "http.response.body" and mensagem.get("body"):
+            primeiro_pedaco.set()
+            await asyncio.sleep(0)  # A desconexão chega com o gerador no meio de um fetchmany
+
+    headers = [(k.lower().encode(), v.encode()) for k, v in cabecalho.items()]
+    scope = {"type": "http", "method": "GET", "path": "/export/alunos", "raw_path": b"/export/alunos",
+             "query_string": b"formato=ndjson", "headers": headers, "client": ("127.0.0.1", 1),
+             "server": ("bench", 80), "scheme": "http", "http_version": "1.1", "root_path": ""}
+    await app(scope, receive, send)
+
+
+def executar(alunos: int, abortados: int):
+    db_path = banco_temporario()
+    modulo = carregar_app_sqlite(db_path)
+    with sqlite3.connect(db_path) as conn:
+        popular_alunos(conn, alunos)
+
+    with TestClient(modulo.app) as client:
+        cabecalho = token_admin(client)
+        print(f"\n📊 Exportação de {alunos} alunos")
+        print("-" * 72)
+        print(f"{'formato':<20}{'segundos':>12}{'KB':>12}")
+        for formato, comprimir in (("ndjson", False), ("csv", False), ("ndjson", True)):
+            r = medir_download(client, cabecalho, formato, comprimir)
+            rotulo = formato + (" + gzip" if comprimir else "")
+            print(f"{rotulo:<20}{r['segundos']:>12.3f}{r['bytes'] / 1024:>12.0f}")
+
+        async def abortar_varias() -> int:
+            presas = 0  # Conexões ainda em uso quando a requisição abortada já terminou
+            for _ in range(abortados):
+                await asyncio.wait_for(download_abortado(modulo.app, cabecalho), timeout=30)
+                presas = max(presas, modulo.get_pool().stats()["em_uso"])
+            return presas
+
+        presas = asyncio.run(abortar_varias())
+        stats = modulo.get_pool().stats()
+        ok = presas == 0 and stats["em_uso"] == 0
+        print(f"\n{'✅' if ok else '❌'} {abortados} downloads abortados no meio: "
+              f"máx. {presas} conexões presas após a requisição; pool {stats}")
+        medir_download(client, cabecalho, "ndjson", False)  # O pool continua atendendo
+    return ok
+
+
+if __name__ == "__main__":
+    alunos = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    abortados = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    sys.exit(0 if executar(alunos, abortados) else 1)
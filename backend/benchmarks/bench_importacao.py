@@ -0,0 +1,71 @@
+# Benchmark: importação em lote (POST /import/alunos) vs. POST /alunos linha a linha
+# Uso: python benchmarks/bench_importacao.py [qtd_linhas] [qtd_linha_a_linha]
+import csv
+import io
+import json
+import sys
+import time
+from datetime import date
+
+from comum import banco_temporario, carregar_app_sqlite, token_admin
+
+from fastapi.testclient import TestClient
+
+
+def gerar_alunos(quantidade: int, prefixo: str = "imp"):
+    nascimento = date(2012, 1, 1).isoformat()
+    for i in range(quantidade):
+        yield {
+            "nome": f"Aluno Importado {i:07d}",
+            "data_nascimento": nascimento,
+            "email": f"{prefixo}{i}@escola.com",
+            "status": "ativo",
+        }
+
+
+def gerar_csv(quantidade: int) -> bytes:
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=["nome", "data_nascimento", "email", "status"])
+    escritor.writeheader()
+    escritor.writerows(gerar_alunos(quantidade))
+    return buffer.getvalue().encode()
+
+
+def executar(qtd_linhas: int, qtd_linha_a_linha: int):
+    app_sqlite = carregar_app_sqlite(banco_temporario())
+    with TestClient(app_sqlite.app) as client:
+        headers = token_admin(client)
+
+        corpo = gerar_csv(qtd_linhas)
+        inicio = time.perf_counter()
+        resposta = client.post("/import/alunos", content=corpo, headers={**headers, "Content-Type": "text/csv"})
+        duracao_lote = time.perf_counter() - inicio
+        relatorio = resposta.json()
+
+        corpo_json = json.dumps(list(gerar_alunos(qtd_linhas, "json"))).encode()
+        inicio = time.perf_counter()
+        resposta = client.post("/import/alunos", content=corpo_json, headers={**headers, "Content-Type": "application/json"})
+        duracao_json = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for aluno in gerar_alunos(qtd_linha_a_linha, "post"):
+            client.post("/alunos", json=aluno, headers=headers)
+        duracao_post = time.perf_counter() - inicio
+
+    print(f"\n📊 Importação de alunos ({qtd_linhas} linhas)")
+    print("-" * 72)
+    print(f"{'cenário':<28}{'linhas':>10}{'segundos':>12}{'linhas/min':>14}")
+    for rotulo, linhas, duracao in (
+        ("POST /import/alunos (CSV)", qtd_linhas, duracao_lote),
+        ("POST /import/alunos (JSON)", qtd_linhas, duracao_json),
+        ("POST /alunos linha a linha", qtd_linha_a_linha, duracao_post),
+    ):
+        print(f"{rotulo:<28}{linhas:>10}{duracao:>12.2f}{round(linhas / duracao * 60):>14}")
+    print(f"\nRelatório CSV: inseridos={relatorio['inseridos']} rejeitados={relatorio['rejeitados']}")
+    print(f"Relatório JSON: inseridos={resposta.json()['inseridos']} rejeitados={resposta.json()['rejeitados']}")
+
+
+if __name__ == "__main__":
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    individual = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    executar(qtd, individual)
@@ -0,0 +1,89 @@
+# Benchmark: tempo de partida a frio de app.py e seed.py com o MySQL indisponível
+# Cada medição é um processo Python novo, em diretório temporário (app.db novo).
+# Cenários: SQLite explícito, MySQL recusando conexão, MySQL travado (aceita o
+# TCP e nunca responde) sem e com a sonda em cache, e o travado com o timeout
+# padrão do pymysql (10 s), que era o comportamento antes do engine preguiçoso.
+# Uso: python benchmarks/bench_inicializacao.py [repeticoes] [--timeout S]
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from comum import BACKEND_DIR
+
+COMANDOS = {
+    "import app": ([sys.executable, "-c", "import app"], None),
+    "seed.py (init_db)": ([sys.executable, os.path.join(BACKEND_DIR, "seed.py")], "6\n"),
+}
+
+
+def porta_fechada() -> int:
+    """Porta local sem ninguém escutando (conexão recusada na hora)"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def servidor_mudo() -> socket.socket:
+    """Aceita o TCP (backlog) mas nunca manda o handshake do MySQL"""
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    s.listen(64)
+    return s
+
+
+def medir(comando, entrada, env, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        pasta = tempfile.mkdtemp(prefix="escola_bench_")
+        inicio = time.perf_counter()
+        resultado = subprocess.run(comando, input=entrada, cwd=pasta, env=env, text=True,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        tempos.append(time.perf_counter() - inicio)
+        if resultado.returncode != 0:
+            raise RuntimeError(f"{' '.join(comando)} falhou:\n{resultado.stdout[-2000:]}")
+    return statistics.median(tempos)
+
+
+def executar(repeticoes: int, timeout: int):
+    mudo = servidor_mudo()
+    pasta_sonda = tempfile.mkdtemp(prefix="escola_sonda_")
+    base = {**os.environ, "PYTHONPATH": BACKEND_DIR, "TMPDIR": pasta_sonda, "ESCOLA_METRICAS": "0"}
+    url_recusa = f"mysql+pymysql://root:@127.0.0.1:{porta_fechada()}/escola_db"
+    url_muda = f"mysql+pymysql://root:@127.0.0.1:{mudo.getsockname()[1]}/escola_db"
+
+    cenarios = [
+        ("sqlite explícito", {"ESCOLA_DB_BACKEND": "sqlite"}),
+        ("auto, MySQL recusando", {"ESCOLA_MYSQL_URL": url_recusa, "ESCOLA_DB_SONDA_TTL": "0"}),
+        (f"auto, MySQL travado ({timeout} s)", {"ESCOLA_MYSQL_URL": url_muda, "ESCOLA_DB_SONDA_TTL": "0",
+                                               "ESCOLA_DB_CONNECT_TIMEOUT": str(timeout)}),
+        ("auto, MySQL travado, sonda em cache", {"ESCOLA_MYSQL_URL": url_muda, "ESCOLA_DB_SONDA_TTL": "600",
+                                                "ESCOLA_DB_CONNECT_TIMEOUT": str(timeout)}),
+        ("como antes: travado, timeout 10 s", {"ESCOLA_MYSQL_URL": url_muda, "ESCOLA_DB_SONDA_TTL": "0",
+                                              "ESCOLA_DB_CONNECT_TIMEOUT": "10"}),
+    ]
+
+    print(f"\n📊 Partida a frio com MySQL indisponível (mediana de {repeticoes} processos)")
+    print("-" * 78)
+    print(f"{'cenário':<40}" + "".join(f"{nome:>19}" for nome in COMANDOS))
+    try:
+        for nome, extra in cenarios:
+            env = {**base, **extra}
+            if extra.get("ESCOLA_DB_SONDA_TTL", "0") != "0":
+                medir(*COMANDOS["seed.py (init_db)"], env, 1)  # Grava a sonda antes de medir
+            tempos = [medir(comando, entrada, env, repeticoes) for comando, entrada in COMANDOS.values()]
+            print(f"{nome:<40}" + "".join(f"{t:>18.2f}s" for t in tempos))
+    finally:
+        mudo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("repeticoes", nargs="?", type=int, default=3)
+    parser.add_argument("--timeout", type=int, default=2, help="ESCOLA_DB_CONNECT_TIMEOUT dos cenários travados")
+    args = parser.parse_args()
+    executar(args.repeticoes, args.timeout)
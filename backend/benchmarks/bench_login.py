@@ -0,0 +1,74 @@
+# Benchmark: vazão de /login com KDF e latência de outra rota enquanto os
+# hashes são calculados, com o hash no event loop vs. no pool de threads
+# Uso: python benchmarks/bench_login.py [logins_simultaneos] [duracao_s]
+import asyncio
+import sys
+import time
+
+from comum import banco_temporario, carregar_app_sqlite, resumo, imprimir_tabela
+
+import httpx
+
+import senhas
+
+
+async def verificar_no_event_loop(senha, armazenado):
+    """Comportamento sem o pool: o KDF roda direto no event loop"""
+    return senhas._verificar_e_atualizar(senha, armazenado)
+
+
+async def cenario(app_sqlite, simultaneos: int, duracao: float) -> tuple:
+    transporte = httpx.ASGITransport(app=app_sqlite.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        fim = time.perf_counter() + duracao
+        logins = []
+
+        async def logar():
+            while time.perf_counter() < fim:
+                t0 = time.perf_counter()
+                resposta = await client.post("/login", json={"username": "admin", "password": "admin123"})
+                resposta.raise_for_status()
+                logins.append(time.perf_counter() - t0)
+
+        async def rota_leve():
+            # Mede da hora agendada até a resposta: inclui o tempo em que o
+            # event loop ficou ocupado e não conseguiu atender a requisição
+            latencias = []
+            await asyncio.sleep(0.05)
+            while time.perf_counter() < fim:
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.01)
+                (await client.get("/")).raise_for_status()
+                latencias.append(time.perf_counter() - t0 - 0.01)
+            return latencias
+
+        inicio = time.perf_counter()
+        *_, latencias = await asyncio.gather(*(logar() for _ in range(simultaneos)), rota_leve())
+        total = time.perf_counter() - inicio
+    return resumo(logins, total), resumo(latencias, total)
+
+
+def executar(simultaneos: int, duracao: float):
+    app_sqlite = carregar_app_sqlite(banco_temporario())
+    original = app_sqlite.verificar_senha
+
+    resultados = {}
+    for rotulo, verificador in (
+        ("hash no event loop", verificar_no_event_loop),
+        (f"pool de hash ({senhas.HASH_WORKERS})", original),
+    ):
+        app_sqlite.verificar_senha = verificador
+        logins, raiz = asyncio.run(cenario(app_sqlite, simultaneos, duracao))
+        resultados[f"/login {rotulo}"] = logins
+        resultados[f"GET / {rotulo}"] = raiz
+    app_sqlite.verificar_senha = original
+    senhas.executor_senhas.shutdown()
+
+    custo = f"n={senhas.SCRYPT_N}" if senhas.ALGORITMO == "scrypt" else f"{senhas.PBKDF2_ITERACOES} iterações"
+    imprimir_tabela(f"{simultaneos} logins simultâneos por {duracao:.0f}s ({senhas.ALGORITMO}, {custo})", resultados)
+
+
+if __name__ == "__main__":
+    simultaneos = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    duracao = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    executar(simultaneos, duracao)
@@ -0,0 +1,84 @@
+# Benchmark: custo do middleware de métricas por requisição e da
+# ConexaoMedida por statement (deve ficar em microssegundos)
+# Uso: python benchmarks/bench_metricas.py [requisicoes] [statements]
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+
+from metricas import ConexaoMedida, ContagemDB, _requisicao_atual, instalar_metricas
+
+
+def criar_app(com_metricas: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/alunos/{aluno_id}")
+    async def obter(aluno_id: int):
+        return {"id": aluno_id}
+
+    if com_metricas:
+        instalar_metricas(app, "bench")
+    return app
+
+
+async def chamar(app, caminho: str):
+    scope = {"type": "http", "method": "GET", "path": caminho, "raw_path": caminho.encode(),
+             "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+             "scheme": "http", "http_version": "1.1", "root_path": ""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_):
+        pass
+
+    await app(scope, receive, send)
+
+
+def medir_requisicoes(app, quantidade: int) -> float:
+    async def rodar():
+        for i in range(200):  # Aquecimento (cache de rotas, histogramas)
+            await chamar(app, f"/alunos/{i}")
+        inicio = time.perf_counter()
+        for i in range(quantidade):
+            await chamar(app, f"/alunos/{i % 1000}")
+        return time.perf_counter() - inicio
+    return asyncio.run(rodar()) / quantidade
+
+
+def medir_statements(conn, quantidade: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(quantidade):
+        conn.execute("SELECT 1").fetchone()
+    return (time.perf_counter() - inicio) / quantidade
+
+
+def executar(requisicoes: int, statements: int):
+    sem = medir_requisicoes(criar_app(False), requisicoes)
+    com = medir_requisicoes(criar_app(True), requisicoes)
+
+    bruta = sqlite3.connect(":memory:")
+    medida = ConexaoMedida(sqlite3.connect(":memory:"))
+    token = _requisicao_atual.set(ContagemDB())
+    try:
+        direto = medir_statements(bruta, statements)
+        via_proxy = medir_statements(medida, statements)
+    finally:
+        _requisicao_atual.reset(token)
+
+    print("\n📊 Overhead das métricas")
+    print("-" * 72)
+    print(f"{'cenário':<36}{'sem µs':>10}{'com µs':>10}{'custo µs':>10}")
+    print(f"{f'requisição ASGI ({requisicoes}x)':<36}{sem * 1e6:>10.1f}{com * 1e6:>10.1f}{(com - sem) * 1e6:>10.1f}")
+    print(f"{f'statement sqlite3 ({statements}x)':<36}{direto * 1e6:>10.1f}{via_proxy * 1e6:>10.1f}{(via_proxy - direto) * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    executar(requisicoes, statements)
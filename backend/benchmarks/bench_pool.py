@@ -0,0 +1,77 @@
+# Benchmark: pool de conexões SQLite vs. uma conexão nova por requisição
+# Uso: python benchmarks/bench_pool.py [qtd_alunos] [repeticoes]
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+from comum import banco_temporario, carregar_app_sqlite, popular_alunos, token_admin, medir, imprimir_tabela
+
+from fastapi.testclient import TestClient
+
+
+class ConexaoPorRequisicao:
+    """Comportamento antigo: sqlite3.connect() a cada uso, sem PRAGMAs"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def acquire(self, timeout=None):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        conn.close()
+
+    async def acquire_async(self, executor):
+        return await executor.run(self.acquire)
+
+    async def release_async(self, conn, executor):
+        await executor.run(self.release, conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+def executar(qtd_alunos: int, repeticoes: int):
+    db_path = banco_temporario()
+    app_sqlite = carregar_app_sqlite(db_path)
+    with app_sqlite.get_db_connection() as conn:
+        popular_alunos(conn, qtd_alunos)
+
+    resultados = {}
+    for rotulo, pool in (
+        ("sem pool", ConexaoPorRequisicao(db_path)),
+        ("com pool (WAL)", app_sqlite.get_pool()),
+    ):
+        app_sqlite._pool = pool
+        client = TestClient(app_sqlite.app)
+        headers = token_admin(client)
+        login = {"username": "admin", "password": "admin123"}
+
+        resultados[f"/alunos {rotulo}"] = medir(lambda: client.get("/alunos", headers=headers), repeticoes)
+        resultados[f"/login {rotulo}"] = medir(lambda: client.post("/login", json=login), repeticoes * 5)
+
+    imprimir_tabela(f"Pool de conexões ({qtd_alunos} alunos, banco {db_path})", resultados)
+    print(f"\nMétricas do pool: {app_sqlite.get_pool().stats()}")
+
+
+if __name__ == "__main__":
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rep = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    executar(qtd, rep)
@@ -0,0 +1,71 @@
+# Benchmark: tempo para transformar linhas do banco no corpo JSON da resposta
+# (por 10 mil linhas), no caminho padrão do FastAPI vs. o modo rápido
+# Uso: python benchmarks/bench_serializacao.py [linhas] [repeticoes]
+import asyncio
+import sqlite3
+import sys
+from typing import List
+
+from comum import banco_temporario, carregar_app_sqlite, popular_alunos, medir, imprimir_tabela
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import serializacao
+from serializacao import RespostaJSONRapida, linhas_para_dicts
+
+CAMPOS = ["id", "nome", "data_nascimento", "email", "status", "turma_id"]
+
+
+def dicts_por_indice(linhas):
+    """Como os endpoints montavam os dicts: um índice por coluna"""
+    return [{c: linha[i] for i, c in enumerate(CAMPOS)} for linha in linhas]
+
+
+def executar(quantidade: int, repeticoes: int):
+    app_sqlite = carregar_app_sqlite(banco_temporario())
+    conn = sqlite3.connect(app_sqlite.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    popular_alunos(conn, quantidade)
+    linhas = conn.execute(f"SELECT {', '.join(CAMPOS)} FROM alunos ORDER BY nome").fetchall()
+    conn.close()
+
+    campo_lista = create_response_field(name="resposta", type_=List[app_sqlite.Aluno])
+    loop = asyncio.new_event_loop()
+
+    def padrao_sem_modelo():
+        # Listagens do app_sqlite: jsonable_encoder + json da stdlib
+        JSONResponse(jsonable_encoder(dicts_por_indice(linhas)))
+
+    def padrao_com_modelo():
+        # response_model=List[Aluno] (app_final): valida cada item antes de codificar
+        conteudo = loop.run_until_complete(
+            serialize_response(field=campo_lista, response_content=dicts_por_indice(linhas), is_coroutine=True)
+        )
+        JSONResponse(conteudo)
+
+    def rapido():
+        RespostaJSONRapida(linhas_para_dicts(linhas, CAMPOS))
+
+    cenarios = {
+        "padrão sem response_model": padrao_sem_modelo,
+        "padrão List[Aluno]": padrao_com_modelo,
+        "rápido (dict+zip, orjson)" if serializacao.orjson else "rápido (dict+zip, json)": rapido,
+    }
+    resultados = {rotulo: medir(funcao, repeticoes) for rotulo, funcao in cenarios.items()}
+    loop.close()
+
+    escala = 10000 / quantidade
+    imprimir_tabela(f"Serialização de {quantidade} alunos ({repeticoes} repetições)", resultados)
+    print("\nms por 10 mil linhas (p50):")
+    rapido_ms = list(resultados.values())[-1]["p50_ms"]
+    for rotulo, r in resultados.items():
+        print(f"  {rotulo:<28}{r['p50_ms'] * escala:>10.2f}   ({r['p50_ms'] / rapido_ms:.1f}x o modo rápido)")
+
+
+if __name__ == "__main__":
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    executar(quantidade, repeticoes)
@@ -0,0 +1,61 @@
+# Benchmark: aprovação de solicitações em lote vs. uma chamada por solicitação
+# Uso: python benchmarks/bench_solicitacoes.py [qtd_solicitacoes ...]
+import sys
+import time
+
+from comum import banco_temporario, carregar_app_sqlite, token_admin
+
+from fastapi.testclient import TestClient
+
+
+def criar_solicitacoes(app_sqlite, quantidade: int, prefixo: str) -> list:
+    """Insere solicitações pendentes do usuário pai_ana e devolve os ids"""
+    with app_sqlite.get_db_connection() as conn:
+        usuario_id = conn.execute("SELECT id FROM usuarios WHERE username = 'pai_ana'").fetchone()[0]
+        inicio = conn.execute("SELECT COALESCE(MAX(id), 0) FROM solicitacoes_matricula").fetchone()[0]
+        conn.executemany(
+            "INSERT INTO solicitacoes_matricula (usuario_id, nome_aluno, data_nascimento, email_aluno) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (usuario_id, f"Aluno Solicitado {i:06d}", "2012-01-01", f"{prefixo}{i}@bench.com")
+                for i in range(quantidade)
+            ),
+        )
+    return list(range(inicio + 1, inicio + quantidade + 1))
+
+
+def executar(quantidades):
+    app_sqlite = carregar_app_sqlite(banco_temporario())
+    with TestClient(app_sqlite.app) as client:
+        headers = token_admin(client)
+        turma = client.post("/turmas", json={"nome": "Turma Bench", "capacidade": 10 ** 6}, headers=headers).json()
+
+        linhas = []
+        for quantidade in quantidades:
+            ids = criar_solicitacoes(app_sqlite, quantidade, f"seq{quantidade}_")
+            inicio = time.perf_counter()
+            for solicitacao_id in ids:
+                client.put(f"/solicitacoes-matricula/{solicitacao_id}/aprovar",
+                           json={"turma_id": turma["id"]}, headers=headers).raise_for_status()
+            sequencial = time.perf_counter() - inicio
+
+            ids = criar_solicitacoes(app_sqlite, quantidade, f"lote{quantidade}_")
+            inicio = time.perf_counter()
+            resposta = client.post("/solicitacoes-matricula/lote/aprovar",
+                                   json={"ids": ids, "turma_id": turma["id"]}, headers=headers)
+            em_lote = time.perf_counter() - inicio
+            resposta.raise_for_status()
+            assert resposta.json()["processadas"] == quantidade
+
+            linhas.append((quantidade, sequencial, em_lote))
+
+    print("\n📊 Aprovação de solicitações de matrícula")
+    print("-" * 72)
+    print(f"{'solicitações':<16}{'N chamadas (s)':>18}{'lote (s)':>14}{'ganho':>10}")
+    for quantidade, sequencial, em_lote in linhas:
+        print(f"{quantidade:<16}{sequencial:>18.3f}{em_lote:>14.3f}{sequencial / em_lote:>9.1f}x")
+
+
+if __name__ == "__main__":
+    quantidades = [int(q) for q in sys.argv[1:]] or [10, 100, 500, 1000]
+    executar(quantidades)
@@ -0,0 +1,295 @@
+# Teste de carga HTTP com cenários do período de matrículas (app_sqlite)
+# Usuários virtuais (asyncio + httpx) repetem os fluxos reais do frontend:
+# - responsáveis: login, painel (/me, /meus-alunos, /turmas, /solicitacoes-matricula)
+#   e, de tempos em tempos, uma nova solicitação de matrícula;
+# - admins: login, painel (/alunos, /turmas, /professores, /solicitacoes-matricula)
+#   e aprovação das solicitações pendentes.
+# Relata vazão, p50/p95/p99 e taxa de erro por rota; --saida grava um JSON
+# estável (chaves ordenadas) para comparar versões com --comparar.
+# Uso:
+#   python benchmarks/carga.py --iniciar [--duracao 30] [--pais 20] [--admins 2]
+#   python benchmarks/carga.py --url http://127.0.0.1:8002 --saida carga.json
+#   python benchmarks/carga.py --comparar antes.json depois.json
+# --iniciar sobe um uvicorn local com banco temporário. Com --url, a preparação
+# cria turmas e responsáveis "carga_*" no servidor informado: use um banco descartável.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+
+from comum import BACKEND_DIR, banco_temporario, percentil
+
+import httpx
+
+SENHA = "carga123"
+
+
+class Coletor:
+    """Latências e status por rota (rota = método + caminho com {id})"""
+
+    def __init__(self):
+        self.rotas = {}
+        self.inicio = None
+        self.fim = None
+
+    def registrar(self, rota: str, status: str, segundos: float):
+        dados = self.rotas.setdefault(rota, {"latencias": [], "status": {}})
+        dados["latencias"].append(segundos)
+        dados["status"][status] = dados["status"].get(status, 0) + 1
+
+    def relatorio(self) -> dict:
+        duracao = (self.fim or time.perf_counter()) - self.inicio
+        rotas = {}
+        for rota, dados in sorted(self.rotas.items()):
+            latencias = dados["latencias"]
+            erros = sum(q for s, q in dados["status"].items() if not s.startswith(("2", "3")))
+            rotas[rota] = {
+                "requisicoes": len(latencias),
+                "req_por_s": round(len(latencias) / duracao, 2),
+                "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+                "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+                "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+                "erros": erros,
+                "taxa_erro": round(erros / len(latencias), 4) if latencias else 0.0,
+                "status": dict(sorted(dados["status"].items())),
+            }
+        total = sum(r["requisicoes"] for r in rotas.values())
+        erros = sum(r["erros"] for r in rotas.values())
+        todas = [l for dados in self.rotas.values() for l in dados["latencias"]]
+        return {
+            "duracao_s": round(duracao, 2),
+            "total": {
+                "requisicoes": total,
+                "req_por_s": round(total / duracao, 2),
+                "p50_ms": round(percentil(todas, 50) * 1000, 2),
+                "p95_ms": round(percentil(todas, 95) * 1000, 2),
+                "p99_ms": round(percentil(todas, 99) * 1000, 2),
+                "erros": erros,
+                "taxa_erro": round(erros / total, 4) if total else 0.0,
+            },
+            "rotas": rotas,
+        }
+
+
+class Cliente:
+    """httpx.AsyncClient que registra cada requisição no coletor"""
+
+    def __init__(self, http: httpx.AsyncClient, coletor: Coletor):
+        self.http = http
+        self.coletor = coletor
+        self.cabecalho = {}
+
+    async def requisitar(self, metodo: str, caminho: str, rota: str = None, **kwargs):
+        rota = f"{metodo} {rota or caminho.split('?')[0]}"
+        t0 = time.perf_counter()
+        try:
+            resposta = await self.http.request(metodo, caminho, headers=self.cabecalho, **kwargs)
+        except httpx.HTTPError as e:
+            self.coletor.registrar(rota, f"erro:{type(e).__name__}", time.perf_counter() - t0)
+            return None
+        self.coletor.registrar(rota, str(resposta.status_code), time.perf_counter() - t0)
+        return resposta
+
+    async def login(self, username: str, password: str) -> bool:
+        resposta = await self.requisitar("POST", "/login", json={"username": username, "password": password})
+        if resposta is None or resposta.status_code != 200:
+            return False
+        self.cabecalho = {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+        return True
+
+
+def _json(resposta):
+    return resposta.json() if resposta is not None and resposta.status_code == 200 else None
+
+
+async def responsavel(http, coletor, username: str, rnd: random.Random, fim: float, pausa: float):
+    """Responsável: entra, abre o painel e envia solicitações de vez em quando"""
+    cliente = Cliente(http, coletor)
+    if not await cliente.login(username, SENHA):
+        return
+    await cliente.requisitar("GET", "/me")
+    numero = 0
+    while time.perf_counter() < fim:
+        await asyncio.gather(
+            cliente.requisitar("GET", "/meus-alunos"),
+            cliente.requisitar("GET", "/turmas"),
+            cliente.requisitar("GET", "/solicitacoes-matricula"),
+        )
+        if rnd.random() < 0.3:
+            numero += 1
+            await cliente.requisitar("POST", "/solicitacoes-matricula", json={
+                "nome_aluno": f"Filho {username} {numero}",
+                "data_nascimento": date(2012 + rnd.randint(0, 6), rnd.randint(1, 12), rnd.randint(1, 28)).isoformat(),
+                "email_aluno": f"{username}.{numero}.{rnd.randint(0, 10 ** 9)}@carga.com",
+                "turma_solicitada": rnd.choice(["Manhã", "Tarde"]),
+            })
+        await asyncio.sleep(rnd.expovariate(1 / pausa) if pausa else 0)
+
+
+async def admin(http, coletor, rnd: random.Random, fim: float, pausa: float, turmas: list):
+    """Admin: entra, carrega o painel e aprova as solicitações pendentes"""
+    cliente = Cliente(http, coletor)
+    if not await cliente.login("admin", "admin123"):
+        return
+    await cliente.requisitar("GET", "/me")
+    while time.perf_counter() < fim:
+        *_, solicitacoes = await asyncio.gather(
+            cliente.requisitar("GET", "/alunos"),
+            cliente.requisitar("GET", "/turmas"),
+            cliente.requisitar("GET", "/professores"),
+            cliente.requisitar("GET", "/solicitacoes-matricula?limit=50"),
+        )
+        pendentes = [s for s in (_json(solicitacoes) or {}).get("items", []) if s["status"] == "pendente"]
+        for solicitacao in pendentes[:rnd.randint(1, 5)]:
+            if time.perf_counter() >= fim:
+                break
+            await cliente.requisitar(
+                "PUT", f"/solicitacoes-matricula/{solicitacao['id']}/aprovar",
+                rota="/solicitacoes-matricula/{id}/aprovar",
+                json={"turma_id": rnd.choice(turmas), "resposta_admin": "Aprovada no teste de carga"},
+            )
+        await asyncio.sleep(rnd.expovariate(1 / pausa) if pausa else 0)
+
+
+async def preparar(http, pais: int, turmas: int, rodada: str) -> tuple:
+    """Cria turmas com vagas e as contas dos responsáveis (fora da medição)"""
+    cliente = Cliente(http, Coletor())
+    if not await cliente.login("admin", "admin123"):
+        raise SystemExit("❌ Não foi possível entrar como admin/admin123")
+    ids = []
+    for i in range(turmas):
+        resposta = await cliente.requisitar("POST", "/turmas", json={"nome": f"Carga {rodada} {i}", "capacidade": 100000})
+        resposta.raise_for_status()
+        ids.append(resposta.json()["id"])
+
+    nomes = [f"carga_{rodada}_{i}" for i in range(pais)]
+    cadastro = Cliente(http, Coletor())
+    for lote in range(0, pais, 10):
+        respostas = await asyncio.gather(*(
+            cadastro.requisitar("POST", "/register", json={"username": nome, "email": f"{nome}@carga.com", "password": SENHA})
+            for nome in nomes[lote:lote + 10]
+        ))
+        for resposta in respostas:
+            resposta.raise_for_status()
+    return ids, nomes
+
+
+async def executar(args) -> dict:
+    rnd = random.Random(args.semente)
+    rodada = datetime.now().strftime("%H%M%S")
+    limites = httpx.Limits(max_connections=args.conexoes, max_keepalive_connections=args.conexoes)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=args.timeout) as http:
+        turmas, nomes = await preparar(http, args.pais, args.turmas, rodada)
+        coletor = Coletor()
+        coletor.inicio = time.perf_counter()
+        fim = coletor.inicio + args.duracao
+        usuarios = [responsavel(http, coletor, nome, random.Random(rnd.random()), fim, args.pausa) for nome in nomes]
+        usuarios += [admin(http, coletor, random.Random(rnd.random()), fim, args.pausa, turmas) for _ in range(args.admins)]
+        await asyncio.gather(*usuarios)
+        coletor.fim = time.perf_counter()
+    return coletor.relatorio()
+
+
+def iniciar_servidor(porta: int):
+    """uvicorn app_sqlite:app em subprocesso com banco temporário"""
+    env = {**os.environ, "ESCOLA_DB_PATH": banco_temporario()}
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app_sqlite:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    limite = time.time() + 30
+    while time.time() < limite:
+        if processo.poll() is not None:
+            raise SystemExit("❌ O servidor local encerrou durante o startup")
+        try:
+            if httpx.get(url + "/", timeout=1).status_code == 200:
+                return processo, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise SystemExit("❌ O servidor local não respondeu em 30s")
+
+
+def imprimir(relatorio: dict):
+    print(f"\n📊 Carga por {relatorio['duracao_s']}s")
+    print("-" * 96)
+    print(f"{'rota':<46}{'req':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'erros':>7}")
+    for rota, r in {**relatorio["rotas"], "TOTAL": relatorio["total"]}.items():
+        print(f"{rota:<46}{r['requisicoes']:>7}{r['req_por_s']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+              f"{r['p99_ms']:>9}{r['taxa_erro'] * 100:>6.1f}%")
+
+
+def comparar(antes_path: str, depois_path: str):
+    """Diferença de req/s, p95 e taxa de erro por rota entre dois relatórios"""
+    with open(antes_path, encoding="utf-8") as f:
+        antes = json.load(f)["resultado"]
+    with open(depois_path, encoding="utf-8") as f:
+        depois = json.load(f)["resultado"]
+    print(f"\n📊 {antes_path} → {depois_path}")
+    print("-" * 96)
+    print(f"{'rota':<46}{'req/s':>16}{'p95 ms':>18}{'erros':>16}")
+    rotas = sorted(set(antes["rotas"]) | set(depois["rotas"]))
+    linhas = [(rota, antes["rotas"].get(rota), depois["rotas"].get(rota)) for rota in rotas]
+    linhas.append(("TOTAL", antes["total"], depois["total"]))
+    for rota, a, d in linhas:
+        if not a or not d:
+            print(f"{rota:<46}{'(só em ' + ('depois' if d else 'antes') + ')':>16}")
+            continue
+        print(f"{rota:<46}{a['req_por_s']:>7}→{d['req_por_s']:<8}{a['p95_ms']:>8}→{d['p95_ms']:<9}"
+              f"{a['taxa_erro'] * 100:>6.1f}%→{d['taxa_erro'] * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do app_sqlite")
+    parser.add_argument("--url", default="http://127.0.0.1:8002")
+    parser.add_argument("--iniciar", action="store_true", help="sobe um uvicorn local com banco temporário")
+    parser.add_argument("--porta", type=int, default=8765, help="porta do servidor de --iniciar")
+    parser.add_argument("--duracao", type=float, default=30)
+    parser.add_argument("--pais", type=int, default=20, help="responsáveis simultâneos")
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--turmas", type=int, default=4, help="turmas criadas na preparação")
+    parser.add_argument("--pausa", type=float, default=0.5, help="pausa média entre ações (s)")
+    parser.add_argument("--conexoes", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="arquivo JSON com o relatório")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    processo = None
+    if args.iniciar:
+        processo, args.url = iniciar_servidor(args.porta)
+    try:
+        relatorio = asyncio.run(executar(args))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+    imprimir(relatorio)
+    if args.saida:
+        configuracao = {k: v for k, v in vars(args).items() if k not in ("saida", "comparar")}
+        dados = {
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "configuracao": configuracao,
+            "resultado": relatorio,
+        }
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(dados, f, indent=2, sort_keys=True, ensure_ascii=False)
+        print(f"\n💾 Relatório salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
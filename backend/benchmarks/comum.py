@@ -0,0 +1,89 @@
+# Utilitários compartilhados pelos benchmarks do backend
+# Cada benchmark roda contra uma cópia temporária do banco, nunca contra escola.db
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+
+def banco_temporario() -> str:
+    """Caminho para um arquivo SQLite novo em diretório temporário"""
+    pasta = tempfile.mkdtemp(prefix="escola_bench_")
+    return os.path.join(pasta, "escola.db")
+
+
+def carregar_app_sqlite(db_path: str):
+    """Importa app_sqlite apontando para o banco informado e cria as tabelas"""
+    os.environ["ESCOLA_DB_PATH"] = db_path
+    import app_sqlite
+    app_sqlite.DB_PATH = db_path
+    app_sqlite._pool = None
+    app_sqlite.init_database()
+    return app_sqlite
+
+
+def popular_alunos(conn, quantidade: int, turma_id: int = None):
+    """Insere alunos sintéticos em lote"""
+    nascimento = date(2012, 1, 1).isoformat()
+    conn.executemany(
+        "INSERT INTO alunos (nome, data_nascimento, email, status, turma_id) VALUES (?, ?, ?, ?, ?)",
+        (
+            (f"Aluno Bench {i:07d}", nascimento, f"aluno{i}@bench.com", "ativo", turma_id)
+            for i in range(quantidade)
+        ),
+    )
+    conn.commit()
+
+
+def token_admin(client) -> dict:
+    """Faz login com o admin padrão e devolve o header de autorização"""
+    resposta = client.post("/login", json={"username": "admin", "password": "admin123"})
+    resposta.raise_for_status()
+    return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil por interpolação simples (valores em segundos)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+
+def medir(funcao, repeticoes: int) -> dict:
+    """Executa a função N vezes e devolve throughput e latências em ms"""
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        latencias.append(time.perf_counter() - t0)
+    total = time.perf_counter() - inicio
+    return resumo(latencias, total)
+
+
+def resumo(latencias, total: float) -> dict:
+    """Resumo padrão: req/s, p50, p95, p99 em milissegundos"""
+    return {
+        "requisicoes": len(latencias),
+        "req_por_s": round(len(latencias) / total, 1) if total else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+    }
+
+
+def imprimir_tabela(titulo: str, linhas: dict):
+    """Imprime {rotulo: resumo} alinhado"""
+    print(f"\n📊 {titulo}")
+    print("-" * 72)
+    print(f"{'cenário':<28}{'req/s':>10}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+    for rotulo, r in linhas.items():
+        print(f"{rotulo:<28}{r['req_por_s']:>10}{r['p50_ms']:>11}{r['p95_ms']:>11}{r['p99_ms']:>11}")
@@ -0,0 +1,158 @@
+# Teste de concorrência: várias threads matriculando na mesma turma
+# Cada worker tem sua própria sessão e disputa as mesmas vagas com
+# matricular_alunos(); ao final confere que a capacidade não foi excedida,
+# que turmas.ocupacao bate com COUNT(*) e que nenhum aluno foi aceito duas vezes.
+# Uso: python benchmarks/concorrencia_matriculas.py [workers] [alunos] [capacidade] [--url URL_DE_TESTE]
+# Com --url as tabelas do banco informado são recriadas: use um banco descartável.
+import random
+import sys
+import threading
+import time
+from datetime import date
+
+from comum import banco_temporario
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Aluno, Turma
+from ocupacao import instalar_ocupacao
+from matriculas import travar_turma, matricular_alunos
+
+
+def criar_engine(url: str = None):
+    if url:
+        return create_engine(url)
+    engine = create_engine(
+        f"sqlite:///{banco_temporario()}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+    # BEGIN IMMEDIATE: a transação pega o lock de escrita logo no início e as
+    # demais esperam (timeout) em vez de falhar ao tentar promover o lock
+    @event.listens_for(engine, "connect")
+    def _sem_begin_automatico(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def preparar(engine, qtd_alunos: int, capacidade: int) -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    conn = engine.raw_connection()
+    try:
+        instalar_ocupacao(conn, engine.dialect.name)
+    finally:
+        conn.close()
+
+    Sessao = sessionmaker(bind=engine)
+    with Sessao() as db:
+        turma = Turma(nome="Turma Concorrida", capacidade=capacidade)
+        db.add(turma)
+        db.flush()
+        nascimento = date(2012, 1, 1)
+        db.add_all(
+            Aluno(nome=f"Aluno Concorrente {i:05d}", data_nascimento=nascimento, status="inativo")
+            for i in range(qtd_alunos)
+        )
+        db.commit()
+        return turma.id
+
+
+def worker(Sessao, turma_id: int, ids: list, aceitos: list, erros: list, semente: int):
+    aleatorio = random.Random(semente)
+    aleatorio.shuffle(ids)
+    while ids:
+        tamanho = aleatorio.randint(1, 8)
+        lote, ids = ids[:tamanho], ids[tamanho:]
+        for tentativa in range(20):
+            db = Sessao()
+            try:
+                travar_turma(db, turma_id)
+                resultado = matricular_alunos(db, turma_id, lote)
+                db.commit()
+                aceitos.extend(resultado["aceitos"])
+                break
+            except OperationalError as e:  # lock disputado: tenta de novo
+                db.rollback()
+                if tentativa == 19:
+                    erros.append(str(e))
+                time.sleep(0.001 * (tentativa + 1))
+            except Exception as e:
+                db.rollback()
+                erros.append(repr(e))
+                break
+            finally:
+                db.close()
+
+
+def executar(workers: int, qtd_alunos: int, capacidade: int, url: str = None) -> bool:
+    engine = criar_engine(url)
+    turma_id = preparar(engine, qtd_alunos, capacidade)
+    Sessao = sessionmaker(bind=engine)
+
+    todos = list(range(1, qtd_alunos + 1))
+    aceitos, erros = [], []
+    # Cada worker tenta uma fatia sobreposta dos alunos: há disputa pelas
+    # vagas e também pelo mesmo aluno
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(Sessao, turma_id, todos[i::2] if i % 2 else todos[:], aceitos, erros, i),
+        )
+        for i in range(workers)
+    ]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    with engine.connect() as conn:
+        ocupacao = conn.execute(text("SELECT ocupacao FROM turmas WHERE id = :id"), {"id": turma_id}).scalar()
+        matriculados = conn.execute(
+            text("SELECT COUNT(*) FROM alunos WHERE turma_id = :id"), {"id": turma_id}
+        ).scalar()
+    engine.dispose()
+
+    print(f"🏁 {workers} workers, {qtd_alunos} alunos, capacidade {capacidade} ({duracao:.2f}s)")
+    print(f"   aceitos={len(aceitos)} ocupacao={ocupacao} matriculados={matriculados} erros={len(erros)}")
+
+    falhas = []
+    if ocupacao > capacidade:
+        falhas.append(f"capacidade excedida: {ocupacao} > {capacidade}")
+    if ocupacao != matriculados:
+        falhas.append(f"turmas.ocupacao ({ocupacao}) diferente de COUNT(*) ({matriculados})")
+    if len(aceitos) != matriculados:
+        falhas.append(f"{len(aceitos)} aceitos, mas {matriculados} matriculados")
+    if len(set(aceitos)) != len(aceitos):
+        falhas.append("aluno aceito mais de uma vez")
+    if qtd_alunos >= capacidade and matriculados != capacidade:
+        falhas.append(f"sobraram vagas: {matriculados} de {capacidade}")
+    falhas.extend(f"erro no worker: {erro}" for erro in erros[:5])
+
+    for falha in falhas:
+        print(f"❌ {falha}")
+    if not falhas:
+        print("✅ Capacidade respeitada")
+    return not falhas
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    url = sys.argv[sys.argv.index("--url") + 1] if "--url" in sys.argv else None
+    if url in args:
+        args.remove(url)
+    workers = int(args[0]) if len(args) > 0 else 16
+    qtd_alunos = int(args[1]) if len(args) > 1 else 300
+    capacidade = int(args[2]) if len(args) > 2 else 30
+
+    ok = all(executar(workers, qtd_alunos, capacidade, url) for _ in range(5))
+    sys.exit(0 if ok else 1)
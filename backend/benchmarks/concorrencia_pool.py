@@ -0,0 +1,55 @@
+# Regressão: mais requisições simultâneas do que conexões no pool
+# Dispara N GET /turmas ao mesmo tempo (query string distinta, para não servir
+# do cache de respostas) com um timeout de pool curto. Nenhuma pode falhar com
+# PoolEsgotado: as requisições esperam vaga no event loop, e as threads do
+# DBExecutor ficam livres para quem já tem conexão terminar e devolvê-la.
+# Uso: python benchmarks/concorrencia_pool.py [requisicoes] [timeout_pool_s]
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+from comum import banco_temporario, carregar_app_sqlite, percentil, token_admin
+
+from fastapi.testclient import TestClient
+import httpx
+
+
+async def disparar(app, cabecalho: dict, requisicoes: int) -> tuple:
+    transporte = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # Erro vira 500
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=120) as client:
+        async def uma(i: int):
+            inicio = time.perf_counter()
+            resposta = await client.get("/turmas", params={"rodada": i}, headers=cabecalho)
+            return resposta.status_code, time.perf_counter() - inicio
+
+        resultados = await asyncio.gather(*(uma(i) for i in range(requisicoes)))
+    return Counter(status for status, _ in resultados), [latencia for _, latencia in resultados]
+
+
+def executar(requisicoes: int, timeout: float) -> bool:
+    os.environ["ESCOLA_DB_POOL_TIMEOUT"] = str(timeout)  # Lido na importação do app
+    modulo = carregar_app_sqlite(banco_temporario())
+    with TestClient(modulo.app) as client:
+        cabecalho = token_admin(client)
+        inicio = time.perf_counter()
+        status, latencias = client.portal.call(disparar, modulo.app, cabecalho, requisicoes)
+        duracao = time.perf_counter() - inicio
+        stats = modulo.get_pool().stats()
+
+    ok = status == {200: requisicoes} and stats["timeouts"] == 0 and stats["em_uso"] == 0
+    print(f"\n📊 {requisicoes} GET /turmas simultâneos, pool de {modulo.DB_POOL_SIZE} conexões "
+          f"({modulo.DB_WORKERS} threads), timeout {timeout:.0f}s")
+    print("-" * 72)
+    print(f"status: {dict(status)} em {duracao:.2f}s; p50 {percentil(latencias, 50) * 1000:.0f} ms, "
+          f"max {max(latencias) * 1000:.0f} ms")
+    print(f"pool: em_uso={stats['em_uso']} esperas={stats['esperas']} timeouts={stats['timeouts']}")
+    print(f"{'✅' if ok else '❌'} nenhuma requisição ficou sem conexão")
+    return ok
+
+
+if __name__ == "__main__":
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    timeout = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    sys.exit(0 if executar(requisicoes, timeout) else 1)
@@ -0,0 +1,253 @@
+# Simulação de queda do MySQL com o disjuntor de database.py
+# Parte 1 (sempre): o Disjuntor contra um recurso simulado que cai e volta;
+#   confere a sequência fechado → aberto → meio_aberto → fechado, que só
+#   `limite` chamadas pagam a latência da falha e que as demais falham na hora.
+# Parte 2 (app.py): um intermediário TCP local faz o papel do MySQL e alterna
+#   entre "normal" (repassa para --mysql), "recusada" (porta fechada, como o
+#   mysqld parado), "fora" (aceita e derruba a conexão) e "travado" (aceita e
+#   nunca responde). Cada fase de queda começa com o disjuntor fechado; mede
+#   status e latência de GET /turmas, confere que POST /turmas é recusado (503)
+#   durante o failover somente leitura e lista as transições do disjuntor.
+#   Sem --mysql não há banco real por trás, então a recuperação só é conferida
+#   na parte 1.
+# Uso: python benchmarks/simular_queda.py [requisicoes] [--mysql mysql+pymysql://...] [--sem-failover]
+# Com --mysql as tabelas do banco informado são criadas: use um banco descartável.
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+from comum import banco_temporario, percentil
+
+from disjuntor import ABERTO, FECHADO, MEIO_ABERTO, CircuitoAberto, Disjuntor
+
+
+# ===== Parte 1: disjuntor isolado =====
+
+def simular_disjuntor(limite: int = 3, latencia_falha: float = 0.2, intervalo: float = 0.2) -> bool:
+    recurso = {"no_ar": True}
+    disjuntor = Disjuntor("simulado", lambda: recurso["no_ar"], limite_falhas=limite,
+                          intervalo_sonda=intervalo, sucessos_para_fechar=2)
+
+    def chamar() -> str:
+        try:
+            disjuntor.verificar()
+        except CircuitoAberto:
+            return "recusada"
+        if not recurso["no_ar"]:
+            time.sleep(latencia_falha)  # Timeout de conexão simulado
+            disjuntor.registrar_falha("recurso fora do ar")
+            return "falha"
+        disjuntor.registrar_sucesso()
+        return "ok"
+
+    tentativas = disjuntor.tentativas
+    resultados = Counter(chamar() for _ in range(5))
+    recurso["no_ar"] = False
+    inicio = time.perf_counter()
+    queda = Counter(chamar() for _ in range(20))
+    tempo_queda = time.perf_counter() - inicio
+    recurso["no_ar"] = True
+    limite_espera = time.monotonic() + intervalo * 10
+    while disjuntor.estado == ABERTO and time.monotonic() < limite_espera:
+        time.sleep(intervalo / 4)
+    liberadas = sum(disjuntor.permite() for _ in range(5))  # Meio aberto: só um lote de teste passa
+    for _ in range(liberadas):
+        disjuntor.registrar_sucesso()
+    volta = Counter(chamar() for _ in range(5))
+    disjuntor.parar()
+
+    caminho = [para for _, _, para, _ in disjuntor.transicoes]
+    verificacoes = [
+        ("5 chamadas ok antes da queda", resultados == {"ok": 5}),
+        (f"só {limite} chamadas pagam o timeout", queda["falha"] == limite),
+        ("as demais são recusadas na hora", queda["recusada"] == 20 - limite),
+        ("queda custa ~limite × latência", tempo_queda < (limite + 1) * latencia_falha),
+        (f"meio aberto libera só {tentativas} chamadas em teste", liberadas == tentativas),
+        ("transições aberto → meio_aberto → fechado", caminho == [ABERTO, MEIO_ABERTO, FECHADO]),
+        ("chamadas ok depois da volta", volta == {"ok": 5} and disjuntor.estado == FECHADO),
+    ]
+    print("\n📊 Parte 1: disjuntor isolado")
+    print("-" * 72)
+    for descricao, ok in verificacoes:
+        print(f"{'✅' if ok else '❌'} {descricao}")
+    print(f"   queda: {dict(queda)} em {tempo_queda:.2f}s; sondas: {disjuntor.sondas}")
+    return all(ok for _, ok in verificacoes)
+
+
+# ===== Parte 2: app.py com um intermediário no lugar do MySQL =====
+
+class Intermediario:
+    """Proxy TCP local que simula o MySQL normal, recusando conexão, fora do ar ou travado"""
+
+    def __init__(self, destino: tuple = None):
+        self.destino = destino
+        self.modo = "normal"
+        self._abertos = []
+        self._lock = threading.Lock()
+        self.porta = 0
+        self.servidor = None
+        self._escutar()
+
+    def _escutar(self):
+        self.servidor = socket.socket()
+        self.servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.servidor.bind(("127.0.0.1", self.porta))
+        self.servidor.listen(64)
+        self.porta = self.servidor.getsockname()[1]
+        threading.Thread(target=self._aceitar, args=(self.servidor,), daemon=True).start()
+
+    def mudar(self, modo: str):
+        if modo == "recusada" and self.servidor is not None:
+            self.servidor.close()  # Porta fechada: connect recusado (2003)
+            self.servidor = None
+        elif modo != "recusada" and self.servidor is None:
+            self._escutar()
+        self.modo = modo
+        if modo != "normal":
+            with self._lock:  # Derruba as conexões em andamento, como numa queda real
+                for s in self._abertos:
+                    try:
+                        s.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                self._abertos.clear()
+
+    def _aceitar(self, servidor):
+        while True:
+            try:
+                cliente, _ = servidor.accept()
+            except OSError:
+                return
+            if self.modo == "travado":
+                with self._lock:
+                    self._abertos.append(cliente)  # Nunca responde
+            elif self.modo == "fora" or self.destino is None:
+                cliente.close()
+            else:
+                try:
+                    servidor = socket.create_connection(self.destino, timeout=5)
+                except OSError:
+                    cliente.close()
+                    continue
+                with self._lock:
+                    self._abertos += [cliente, servidor]
+                for origem, alvo in ((cliente, servidor), (servidor, cliente)):
+                    threading.Thread(target=self._repassar, args=(origem, alvo), daemon=True).start()
+
+    @staticmethod
+    def _repassar(origem, alvo):
+        try:
+            while True:
+                dados = origem.recv(65536)
+                if not dados:
+                    break
+                alvo.sendall(dados)
+        except OSError:
+            pass
+        finally:
+            for s in (origem, alvo):
+                try:
+                    s.close()
+                except OSError:
+                    pass
+
+    def fechar(self):
+        self.mudar("recusada")
+
+
+def configurar_ambiente(intermediario: Intermediario, url_mysql: str, failover: bool):
+    """Variáveis lidas por database.py na importação"""
+    from sqlalchemy.engine import make_url
+
+    url = make_url(url_mysql or "mysql+pymysql://root:@localhost:3306/escola_db")
+    url = url.set(host="127.0.0.1", port=intermediario.porta)
+    os.environ.update({
+        "ESCOLA_DB_BACKEND": "mysql",  # Sem sonda na partida: o disjuntor é quem decide
+        "ESCOLA_MYSQL_URL": url.render_as_string(hide_password=False),
+        "ESCOLA_DB_FAILOVER_URL": f"sqlite:///{banco_temporario()}",  # Réplica descartável
+        "ESCOLA_DB_FAILOVER": "1" if failover else "0",
+        "ESCOLA_DB_CONNECT_TIMEOUT": "1",
+        "ESCOLA_DB_READ_TIMEOUT": "1",
+        "ESCOLA_DISJUNTOR_INTERVALO": "0.5",
+        "ESCOLA_DB_SONDA_TTL": "0",
+        "ESCOLA_METRICAS": "0",
+    })
+
+
+def rodar_fase(client, requisicoes: int) -> dict:
+    status, latencias = Counter(), []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        try:
+            status[client.get("/turmas").status_code] += 1
+        except Exception as e:
+            status[type(e).__name__] += 1
+        latencias.append(time.perf_counter() - inicio)
+    return {"status": dict(status), "p50_ms": round(percentil(latencias, 50) * 1000, 1),
+            "max_ms": round(max(latencias) * 1000, 1)}
+
+
+def simular_app(requisicoes: int, url_mysql: str, failover: bool):
+    destino = None
+    if url_mysql:
+        from sqlalchemy.engine import make_url
+        url = make_url(url_mysql)
+        destino = (url.host or "localhost", url.port or 3306)
+    intermediario = Intermediario(destino)
+    configurar_ambiente(intermediario, url_mysql, failover)
+
+    from fastapi.testclient import TestClient
+    import app
+    import database
+
+    database.obter_engine()  # ESCOLA_DB_BACKEND=mysql: sem sonda, cria o disjuntor
+    if url_mysql:
+        database.init_db()
+    client = TestClient(app.app, raise_server_exceptions=False)  # Sem lifespan: init_db só no MySQL real
+
+    fases = (["normal"] if url_mysql else []) + ["recusada", "fora", "travado", "volta"]
+    print(f"\n📊 Parte 2: app.py com o MySQL simulado ({'failover SQLite' if failover else 'sem failover, 503'})")
+    print("-" * 72)
+    print(f"{'fase':<10}{'estado final':<14}{'p50 ms':>9}{'max ms':>10}  status")
+    try:
+        for nome in fases:
+            if nome == "volta":
+                intermediario.mudar("normal")
+                limite = time.monotonic() + 10
+                while url_mysql and database.disjuntor.estado != FECHADO and time.monotonic() < limite:
+                    rodar_fase(client, 1)
+                    time.sleep(0.2)
+            else:
+                database.disjuntor.reiniciar(f"início da fase {nome}")
+                intermediario.mudar(nome)
+            r = rodar_fase(client, requisicoes)
+            print(f"{nome:<10}{database.disjuntor.estado:<14}{r['p50_ms']:>9}{r['max_ms']:>10}  {r['status']}")
+            if nome == "travado":
+                escrita = client.post("/turmas", json={"nome": "Turma da queda", "capacidade": 10})
+                print(f"{'escrita':<10}{database.disjuntor.estado:<14}{'':>19}  POST /turmas → {escrita.status_code}")
+    finally:
+        intermediario.fechar()
+        if database.disjuntor:
+            database.disjuntor.parar()
+
+    print("\nTransições:")
+    for quando, de, para, motivo in database.disjuntor.transicoes:
+        print(f"   {time.strftime('%H:%M:%S', time.localtime(quando))} {de} → {para} ({motivo[:80]})")
+    if not url_mysql:
+        print("⚠️ Sem --mysql: a volta do MySQL não foi conferida ponta a ponta (ver parte 1)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simula a queda do MySQL e confere o disjuntor")
+    parser.add_argument("requisicoes", nargs="?", type=int, default=20)
+    parser.add_argument("--mysql", help="URL de um MySQL descartável atrás do intermediário")
+    parser.add_argument("--sem-failover", action="store_true", help="aberto = 503 em vez de SQLite")
+    args = parser.parse_args()
+
+    ok = simular_disjuntor()
+    simular_app(args.requisicoes, args.mysql, not args.sem_failover)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,93 @@
+# Busca textual de alunos por nome/email
+# SQLite: tabela FTS5 "alunos_fts" (conteúdo externo apontando para alunos)
+# mantida por triggers; o tokenizer unicode61 com remove_diacritics faz
+# "Joao" encontrar "João". MySQL: índice FULLTEXT em modo BOOLEAN; a colação
+# utf8mb4_general_ci já ignora acentos.
+import re
+from typing import List, Optional
+
+TOKENIZER_FTS = "unicode61 remove_diacritics 2"
+TAMANHO_MINIMO_FULLTEXT = 3  # innodb_ft_min_token_size padrão
+
+SQL_FTS_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS alunos_fts USING fts5(
+        nome, email, content='alunos', content_rowid='id', tokenize='{TOKENIZER_FTS}'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS alunos_fts_ai AFTER INSERT ON alunos BEGIN
+        INSERT INTO alunos_fts(rowid, nome, email) VALUES (new.id, new.nome, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS alunos_fts_ad AFTER DELETE ON alunos BEGIN
+        INSERT INTO alunos_fts(alunos_fts, rowid, nome, email) VALUES ('delete', old.id, old.nome, old.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS alunos_fts_au AFTER UPDATE OF nome, email ON alunos BEGIN
+        INSERT INTO alunos_fts(alunos_fts, rowid, nome, email) VALUES ('delete', old.id, old.nome, old.email);
+        INSERT INTO alunos_fts(rowid, nome, email) VALUES (new.id, new.nome, new.email);
+    END""",
+]
+
+# Busca por relevância: bm25 menor = mais relevante
+SQL_BUSCA_FTS = "SELECT rowid AS id, bm25(alunos_fts) AS rank FROM alunos_fts WHERE alunos_fts MATCH ?"
+
+
+def criar_fts_sqlite(conn) -> bool:
+    """
+    Cria a tabela FTS5 e os triggers (idempotente) e indexa os alunos já
+    existentes na primeira vez. Retorna False se o SQLite não tiver FTS5.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alunos_fts'")
+        existia = cursor.fetchone() is not None
+        for sql in SQL_FTS_SQLITE:
+            cursor.execute(sql)
+        if not existia:
+            cursor.execute("INSERT INTO alunos_fts(alunos_fts) VALUES ('rebuild')")
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        if "fts5" in str(e).lower():
+            print(f"⚠️ FTS5 indisponível, busca usará LIKE: {e}")
+            return False
+        raise
+    finally:
+        cursor.close()
+
+
+def termos(texto: Optional[str]) -> List[str]:
+    """Palavras da busca, sem pontuação (o '@' do email separa termos)"""
+    return re.findall(r"\w+", texto or "")
+
+
+def expressao_fts(texto: Optional[str]) -> Optional[str]:
+    """'Joao Sil' -> '"Joao"* "Sil"*' (todas as palavras, por prefixo)"""
+    palavras = termos(texto)
+    if not palavras:
+        return None
+    return " ".join(f'"{p}"*' for p in palavras)
+
+
+def expressao_fulltext(texto: Optional[str]) -> Optional[str]:
+    """
+    'Joao Sil' -> '+Joao* +Sil*' para MATCH ... AGAINST em BOOLEAN MODE.
+    None se algum termo for curto demais para o índice FULLTEXT (use LIKE).
+    """
+    palavras = termos(texto)
+    if not palavras or any(len(p) < TAMANHO_MINIMO_FULLTEXT for p in palavras):
+        return None
+    return " ".join(f"+{p}*" for p in palavras)
+
+
+def possui_fulltext_mysql(cursor) -> bool:
+    """Verifica se alunos tem o índice FULLTEXT (nome, email)"""
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = 'alunos' AND index_name = 'ft_aluno_busca' LIMIT 1"
+    )
+    return cursor.fetchone() is not None
+
+
+def criar_fulltext_mysql(cursor) -> None:
+    """Adiciona o índice FULLTEXT em bancos criados antes dele existir"""
+    if not possui_fulltext_mysql(cursor):
+        cursor.execute("ALTER TABLE alunos ADD FULLTEXT INDEX ft_aluno_busca (nome, email)")
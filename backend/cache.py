@@ -0,0 +1,202 @@
+# Cache em memória para leituras caras (ex.: /estatisticas)
+# Cada cache declara as tabelas de que depende; qualquer escrita nessas
+# tabelas chama invalidar_tabelas() e o próximo acesso recalcula.
+# O TTL é só uma rede de segurança para escritas feitas fora da API.
+# invalidar_tabelas() também incrementa um contador de versão por tabela,
+# usado como ETag nas listagens (ver condicional.py) e pelo cache de respostas.
+# Esse contador só enxerga escritas deste processo; escritas de outros workers,
+# de scripts (gerar_dados.py, importações) ou SQL manual chegam pela versão
+# gravada no próprio banco (tabela versoes_tabelas, mantida por triggers),
+# lida por uma thread a cada ESCOLA_VERSOES_INTERVALO segundos. Sem essa fonte
+# (iniciar_versoes_banco não chamado) vale só o contador: um único processo.
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable
+
+_caches = []
+_caches_lock = threading.Lock()
+
+# Versão de cada tabela neste processo; a época distingue reinícios do servidor
+_versoes = {}
+_versoes_lock = threading.Lock()
+EPOCA = secrets.token_hex(4)
+
+# Versões lidas do banco (tabela -> versão), atualizadas em segundo plano
+VERSOES_INTERVALO = float(os.getenv("ESCOLA_VERSOES_INTERVALO", "1"))
+_versoes_banco = {}
+_leitor_versoes = None
+_parar_leitor = threading.Event()
+
+_ouvintes = []  # Outros caches avisados a cada invalidação (ex.: cache_respostas.py)
+
+
+class CacheTabelas:
+    """Guarda um único valor calculado a partir de um conjunto de tabelas"""
+
+    def __init__(self, nome: str, tabelas: Iterable[str], ttl: float = 300.0):
+        self.nome = nome
+        self.tabelas = frozenset(tabelas)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._valor = None
+        self._gerado_em = None  # time.time() do cálculo em cache
+        self._versao = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        with _caches_lock:
+            _caches.append(self)
+
+    def obter(self, calcular: Callable[[], object]):
+        """
+        Retorna (valor, frescor). Em falha executa calcular() fora do lock;
+        o resultado só é guardado se nenhuma escrita ocorreu durante o cálculo.
+        """
+        with self._lock:
+            if self._gerado_em is not None and time.time() - self._gerado_em < self.ttl:
+                self.acertos += 1
+                return self._valor, self._frescor(self._gerado_em, True)
+            self.falhas += 1
+            versao = self._versao
+
+        valor = calcular()
+        gerado_em = time.time()
+        with self._lock:
+            if versao == self._versao:
+                self._valor = valor
+                self._gerado_em = gerado_em
+        return valor, self._frescor(gerado_em, False)
+
+    def invalidar(self):
+        with self._lock:
+            self._versao += 1
+            self._valor = None
+            self._gerado_em = None
+            self.invalidacoes += 1
+
+    def _frescor(self, gerado_em: float, em_cache: bool) -> dict:
+        return {
+            "em_cache": em_cache,
+            "gerado_em": datetime.fromtimestamp(gerado_em).isoformat(timespec="seconds"),
+            "idade_segundos": round(time.time() - gerado_em, 3),
+            "ttl_segundos": self.ttl,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "nome": self.nome,
+                "tabelas": sorted(self.tabelas),
+                "em_cache": self._gerado_em is not None,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+def caches_registrados() -> list:
+    """Todos os CacheTabelas criados no processo (para métricas)"""
+    with _caches_lock:
+        return list(_caches)
+
+
+def versao_tabelas(*tabelas: str) -> tuple:
+    """Versões atuais das tabelas (leia antes de consultar as linhas); nunca acessa o banco"""
+    with _versoes_lock:
+        return tuple((_versoes_banco.get(tabela, 0), _versoes.get(tabela, 0)) for tabela in tabelas)
+
+
+# ===== Versões no banco =====
+
+def instalar_versoes_sqlite(cursor, tabelas: Iterable[str]):
+    """Tabela versoes_tabelas e triggers que incrementam a versão a cada escrita (idempotente)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS versoes_tabelas (
+        tabela TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    for tabela in tabelas:
+        cursor.execute("INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES (?, 0)", (tabela,))
+        for operacao in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS versao_{tabela}_{operacao.lower()} AFTER {operacao} ON {tabela}
+            BEGIN
+                UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = '{tabela}';
+            END
+            """)
+
+
+def iniciar_versoes_banco(ler: Callable[[], dict], intervalo: float = VERSOES_INTERVALO):
+    """
+    Lê ler() (-> {tabela: versão}) agora e depois a cada intervalo numa thread.
+    Mudou alguma versão: os caches dessas tabelas são invalidados como numa escrita local.
+    """
+    global _leitor_versoes
+    _atualizar_versoes_banco(ler)
+    _parar_leitor.clear()
+    if _leitor_versoes is None:
+        _leitor_versoes = threading.Thread(target=_ler_versoes, args=(ler, intervalo),
+                                           name="versoes-banco", daemon=True)
+        _leitor_versoes.start()
+
+
+def _ler_versoes(ler, intervalo: float):
+    global _leitor_versoes
+    falhou = False
+    while not _parar_leitor.wait(intervalo):
+        try:
+            _atualizar_versoes_banco(ler)
+            falhou = False
+        except Exception as e:
+            if not falhou:  # Avisa uma vez por sequência de falhas
+                print(f"⚠️ Não foi possível ler as versões das tabelas: {e}")
+            falhou = True
+    _leitor_versoes = None
+
+
+def parar_versoes_banco():
+    """Encerra a thread de leitura (desligamento); as versões lidas continuam valendo"""
+    leitor = _leitor_versoes
+    _parar_leitor.set()
+    if leitor is not None:
+        leitor.join(timeout=5)
+
+
+def _atualizar_versoes_banco(ler):
+    novas = ler()
+    with _versoes_lock:
+        alteradas = {t for t in set(novas) | set(_versoes_banco) if novas.get(t) != _versoes_banco.get(t)}
+        _versoes_banco.clear()
+        _versoes_banco.update(novas)
+    if alteradas:
+        _avisar_caches(alteradas)
+
+
+def invalidar_tabelas(*tabelas: str):
+    """Incrementa a versão das tabelas e invalida os caches que dependem delas (chamar após o commit)"""
+    alteradas = set(tabelas)
+    with _versoes_lock:
+        for tabela in alteradas:
+            _versoes[tabela] = _versoes.get(tabela, 0) + 1
+    _avisar_caches(alteradas)
+
+
+def _avisar_caches(alteradas: set):
+    with _caches_lock:
+        caches = list(_caches)
+        ouvintes = list(_ouvintes)
+    for cache in caches:
+        if cache.tabelas & alteradas:
+            cache.invalidar()
+    for ouvinte in ouvintes:
+        ouvinte(alteradas)
+
+
+def ao_invalidar(funcao: Callable[[set], None]):
+    """Registra funcao(tabelas) para ser chamada em cada invalidar_tabelas()"""
+    with _caches_lock:
+        _ouvintes.append(funcao)
@@ -0,0 +1,189 @@
+# Cache de respostas HTTP em memória (middleware ASGI)
+# Para as rotas configuradas, o corpo JSON já serializado fica guardado com as
+# versões das tabelas lidas (cache.py). Uma escrita nessas tabelas chama
+# invalidar_tabelas(), que remove as entradas na hora; a comparação de versões
+# na leitura cobre a corrida de uma resposta calculada durante a escrita.
+# Escritas de outro processo (outro worker, scripts, SQL manual) não chamam
+# invalidar_tabelas() aqui: elas aparecem na versão gravada no banco, lida por
+# cache.iniciar_versoes_banco() a cada ESCOLA_VERSOES_INTERVALO segundos. Sem
+# essa leitura o cache só é correto com um único processo escrevendo.
+# A chave varia pelo papel do usuário (admin/usuario) ou, em rotas como
+# /meus-alunos, pelo próprio usuário. Requisições sem credencial válida nunca
+# usam o cache: seguem para o endpoint, que responde 401/403.
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+from cache import ao_invalidar, versao_tabelas
+from condicional import etag_confere
+
+ESCOPO_PAPEL = "papel"
+ESCOPO_USUARIO = "usuario"
+
+
+class Regra:
+    """Configuração de cache de uma rota GET"""
+
+    def __init__(self, tabelas: Iterable[str], ttl: float = 60.0, escopo: str = ESCOPO_PAPEL):
+        self.tabelas = tuple(tabelas)
+        self.ttl = ttl
+        self.escopo = escopo
+
+
+class ArmazemRespostas:
+    """LRU limitado por quantidade e por bytes: chave -> resposta guardada"""
+
+    def __init__(self, max_itens: int = 512, max_bytes: int = 32 * 1024 * 1024):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()  # chave -> (rota, status, headers, corpo, versoes, expira_em, tamanho)
+        self._bytes = 0
+        self._rotas = {}  # rota -> {"acertos", "falhas"}
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.descartados = 0
+        self._tabelas_por_rota = {}
+        ao_invalidar(self.invalidar_tabelas)
+
+    def _contar(self, rota: str, campo: str):
+        self._rotas.setdefault(rota, {"acertos": 0, "falhas": 0})[campo] += 1
+
+    def _remover(self, chave):
+        item = self._itens.pop(chave)
+        self._bytes -= item[6]
+
+    def obter(self, chave, rota: str, regra: Regra):
+        """Resposta guardada ainda válida ou None"""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                if item[5] > time.time() and item[4] == versao_tabelas(*regra.tabelas):
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    self._contar(rota, "acertos")
+                    return item
+                self._remover(chave)
+            self.falhas += 1
+            self._contar(rota, "falhas")
+            return None
+
+    def guardar(self, chave, rota: str, regra: Regra, status: int, headers: list, corpo: bytes, versoes: tuple):
+        tamanho = len(corpo) + sum(len(k) + len(v) for k, v in headers) + len(repr(chave))
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            if versoes != versao_tabelas(*regra.tabelas):
+                return  # Escrita durante o cálculo: resposta possivelmente desatualizada
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (rota, status, headers, corpo, versoes, time.time() + regra.ttl, tamanho)
+            self._bytes += tamanho
+            self._tabelas_por_rota[rota] = regra.tabelas
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                self._remover(next(iter(self._itens)))
+                self.descartados += 1
+
+    def invalidar_tabelas(self, tabelas: set):
+        """Chamado por cache.invalidar_tabelas(): remove as rotas que leem essas tabelas"""
+        with self._lock:
+            rotas = {rota for rota, lidas in self._tabelas_por_rota.items() if tabelas.intersection(lidas)}
+            if not rotas:
+                return
+            for chave in [c for c, item in self._itens.items() if item[0] in rotas]:
+                self._remover(chave)
+                self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 3) if consultas else 0.0,
+                "invalidacoes": self.invalidacoes,
+                "descartados": self.descartados,
+                "rotas": {rota: dict(c) for rota, c in sorted(self._rotas.items())},
+            }
+
+
+class CacheRespostas:
+    """
+    Middleware ASGI: serve GETs das rotas em `regras` a partir do armazém.
+    identificar(authorization) devolve {"id", "tipo_usuario"} ou None.
+    """
+
+    def __init__(self, app, armazem: ArmazemRespostas, regras: Dict[str, Regra],
+                 identificar: Callable[[str], Optional[dict]]):
+        self.app = app
+        self.armazem = armazem
+        self.regras = regras
+        self.identificar = identificar
+
+    async def __call__(self, scope, receive, send):
+        regra = self.regras.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if regra is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        usuario = self.identificar(headers.get(b"authorization", b"").decode("latin-1"))
+        if usuario is None:
+            await self.app(scope, receive, send)
+            return
+
+        rota = scope["path"]
+        escopo = f"u{usuario['id']}" if regra.escopo == ESCOPO_USUARIO else usuario["tipo_usuario"]
+        chave = (rota, scope.get("query_string", b""), escopo)
+
+        item = self.armazem.obter(chave, rota, regra)
+        if item is not None:
+            await self._enviar_guardada(item, headers.get(b"if-none-match"), send)
+            return
+
+        versoes = versao_tabelas(*regra.tabelas)  # Antes de o endpoint ler as linhas
+        inicio = {}
+        partes = []
+        capturados = 0
+
+        async def capturar(mensagem):
+            nonlocal partes, capturados
+            if mensagem["type"] == "http.response.start":
+                inicio.update(mensagem)
+                mensagem = {**mensagem, "headers": [*mensagem.get("headers", []), (b"x-cache", b"MISS")]}
+            elif mensagem["type"] == "http.response.body" and partes is not None:
+                corpo = mensagem.get("body", b"")
+                capturados += len(corpo)
+                if capturados > self.armazem.max_bytes:
+                    partes = None  # Grande demais para o cache: só repassa
+                else:
+                    partes.append(corpo)
+                if partes is not None and not mensagem.get("more_body", False) and inicio.get("status") == 200:
+                    self.armazem.guardar(chave, rota, regra, 200, list(inicio.get("headers", [])),
+                                         b"".join(partes), versoes)
+            await send(mensagem)
+
+        await self.app(scope, receive, capturar)
+
+    @staticmethod
+    async def _enviar_guardada(item, if_none_match: Optional[bytes], send):
+        _, status, headers, corpo, *_ = item
+        etag = next((v.decode("latin-1") for k, v in headers if k == b"etag"), None)
+        if etag and etag_confere(if_none_match.decode("latin-1") if if_none_match else None, etag):
+            cabecalhos = [(k, v) for k, v in headers if k in (b"etag", b"cache-control")]
+            await send({"type": "http.response.start", "status": 304, "headers": [*cabecalhos, (b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": status, "headers": [*headers, (b"x-cache", b"HIT")]})
+        await send({"type": "http.response.body", "body": corpo})
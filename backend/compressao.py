@@ -0,0 +1,171 @@
+# Compressão das respostas HTTP (middleware ASGI): brotli quando instalado e
+# aceito pelo cliente, senão gzip. As listas de alunos e solicitações repetem
+# muito texto (nomes de turma, status, datas) e encolhem ~10x.
+# - Respostas menores que o mínimo seguem sem compressão (não compensa a CPU).
+# - Respostas em streaming (exportações) são comprimidas pedaço a pedaço, com
+#   flush a cada pedaço, sem acumular o corpo inteiro em memória.
+# - Respostas que já têm Content-Encoding (ex.: /export?gzip=true) e tipos
+#   que não são texto passam direto.
+# Com a compressão a ETag vira fraca (W/"..."): o corpo enviado muda com a
+# codificação, mas o conteúdo continua o mesmo para o If-None-Match.
+import os
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem ele só gzip
+    brotli = None
+
+MINIMO_PADRAO = int(os.getenv("ESCOLA_COMPRESSAO_MINIMO", "1024"))
+NIVEL_GZIP = int(os.getenv("ESCOLA_COMPRESSAO_NIVEL", "6"))
+NIVEL_BROTLI = int(os.getenv("ESCOLA_BROTLI_NIVEL", "4"))
+
+TIPOS_COMPRESSIVEIS = ("application/json", "application/x-ndjson", "text/")
+
+
+class _Gzip:
+    nome = "gzip"
+
+    def __init__(self, nivel: int):
+        self._z = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._z.compress(dados) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finalizar(self) -> bytes:
+        return self._z.flush()
+
+
+class _Brotli:
+    nome = "br"
+
+    def __init__(self, nivel: int):
+        self._b = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._b.process(dados) + self._b.flush()
+
+    def finalizar(self) -> bytes:
+        return self._b.finish()
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """'br', 'gzip' ou None conforme o Accept-Encoding (respeita q=0)"""
+    aceitas = {}
+    for item in accept_encoding.lower().split(","):
+        nome, _, parametros = item.strip().partition(";")
+        q = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                q = float(parametros.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if nome:
+            aceitas[nome] = q
+    if brotli is not None and aceitas.get("br", 0) > 0:
+        return "br"
+    if aceitas.get("gzip", aceitas.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def novo_compressor(codificacao: str, nivel_gzip: int = NIVEL_GZIP, nivel_brotli: int = NIVEL_BROTLI):
+    return _Brotli(nivel_brotli) if codificacao == "br" else _Gzip(nivel_gzip)
+
+
+class Compressao:
+    """Middleware ASGI de compressão com limite mínimo de tamanho"""
+
+    def __init__(self, app, minimo: int = MINIMO_PADRAO, nivel_gzip: int = NIVEL_GZIP,
+                 nivel_brotli: int = NIVEL_BROTLI):
+        self.app = app
+        self.minimo = minimo
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        codificacao = escolher_codificacao(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None       # http.response.start retido até decidir
+        compressor = None   # None = ainda decidindo; False = repassar sem comprimir
+
+        async def enviar(mensagem):
+            nonlocal inicio, compressor
+            if mensagem["type"] == "http.response.start":
+                inicio = mensagem
+                return
+            if mensagem["type"] != "http.response.body":
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            mais = mensagem.get("more_body", False)
+
+            if compressor is None:
+                if not self._compressivel(inicio) or (not mais and len(corpo) < self.minimo):
+                    compressor = False
+                    await send(inicio)
+                else:
+                    compressor = novo_compressor(codificacao, self.nivel_gzip, self.nivel_brotli)
+                    comprimido = compressor.comprimir(corpo)
+                    if not mais:
+                        comprimido += compressor.finalizar()
+                    await send(self._inicio_comprimido(inicio, codificacao, None if mais else len(comprimido)))
+                    await send({"type": "http.response.body", "body": comprimido, "more_body": mais})
+                    return
+
+            if compressor is False:
+                await send(mensagem)
+                return
+
+            comprimido = compressor.comprimir(corpo) if corpo else b""
+            if not mais:
+                comprimido += compressor.finalizar()
+            if comprimido or not mais:
+                await send({"type": "http.response.body", "body": comprimido, "more_body": mais})
+
+        await self.app(scope, receive, enviar)
+
+    @staticmethod
+    def _compressivel(inicio) -> bool:
+        if inicio["status"] < 200 or inicio["status"] in (204, 304):
+            return False
+        tipo = b""
+        for chave, valor in inicio.get("headers", []):
+            chave = chave.lower()
+            if chave == b"content-encoding":
+                return False
+            if chave == b"content-type":
+                tipo = valor
+        return tipo.decode("latin-1").startswith(TIPOS_COMPRESSIVEIS)
+
+    @staticmethod
+    def _inicio_comprimido(inicio, codificacao: str, tamanho: Optional[int]):
+        headers = []
+        vary = None
+        for chave, valor in inicio.get("headers", []):
+            nome = chave.lower()
+            if nome == b"content-length":
+                continue
+            if nome == b"etag" and not valor.startswith(b"W/"):
+                valor = b"W/" + valor
+            if nome == b"vary":
+                vary = valor
+                continue
+            headers.append((chave, valor))
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif b"accept-encoding" not in vary.lower():
+            vary += b", Accept-Encoding"
+        headers += [(b"content-encoding", codificacao.encode()), (b"vary", vary)]
+        if tamanho is not None:
+            headers.append((b"content-length", str(tamanho).encode()))
+        return {**inicio, "headers": headers}
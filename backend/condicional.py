@@ -0,0 +1,37 @@
+# GET condicional nas listagens (ETag forte + If-None-Match)
+# A ETag é derivada das versões das tabelas lidas pela listagem (cache.py:
+# contador do processo + versão gravada no banco, que também muda com
+# escritas de outros processos e scripts),
+# da URL completa (campos, página) e, quando o resultado depende do usuário,
+# do id dele. Se o cliente já tem a versão atual, a resposta é 304 sem
+# consultar o banco. Com Cache-Control: no-cache o navegador guarda a lista e
+# revalida a cada uso, recebendo só os cabeçalhos enquanto nada mudar.
+import hashlib
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+from cache import EPOCA, versao_tabelas
+
+
+def calcular_etag(request: Request, tabelas, escopo: Optional[object] = None) -> str:
+    versoes = versao_tabelas(*tabelas)
+    base = f"{EPOCA}|{request.url.path}?{request.url.query}|{escopo}|{versoes}"
+    return '"' + hashlib.sha256(base.encode()).hexdigest()[:32] + '"'
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match contém a ETag (ou "*")"""
+    if not if_none_match:
+        return False
+    candidatas = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatas or etag in candidatas or f"W/{etag}" in candidatas
+
+
+def responder_condicional(request: Request, response: Response, tabelas, escopo: Optional[object] = None):
+    """Define ETag/Cache-Control ou interrompe a requisição com 304"""
+    etag = calcular_etag(request, tabelas, escopo)
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_confere(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=cabecalhos)
+    response.headers.update(cabecalhos)
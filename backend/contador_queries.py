@@ -0,0 +1,75 @@
+# Contador de queries SQL por requisição (opcional)
+# Um listener do SQLAlchemy soma cada statement executado na requisição atual.
+# Serve para pegar regressões N+1: com limite definido, a requisição que
+# passar de N statements é denunciada no console ou, no modo estrito,
+# levanta LimiteQueriesExcedido (falha o teste que fez a chamada).
+import contextvars
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+class LimiteQueriesExcedido(AssertionError):
+    """Requisição executou mais statements do que o limite configurado"""
+
+
+class Contagem:
+    def __init__(self):
+        self.total = 0
+        self.statements = []
+
+
+_contagem_atual = contextvars.ContextVar("contagem_queries", default=None)
+
+
+def instalar_contador(engine):
+    """Registra o listener no engine (idempotente)"""
+    if not event.contains(engine, "before_cursor_execute", _contar):
+        event.listen(engine, "before_cursor_execute", _contar)
+
+
+def _contar(conn, cursor, statement, parameters, context, executemany):
+    contagem = _contagem_atual.get()
+    if contagem is not None:
+        contagem.total += 1
+        contagem.statements.append(statement)
+
+
+@contextmanager
+def contar_queries():
+    """
+    Conta os statements executados dentro do bloco (mesmo contexto/thread):
+        with contar_queries() as c:
+            db.query(Aluno).options(joinedload(Aluno.turma)).all()
+        assert c.total == 1
+    """
+    contagem = Contagem()
+    token = _contagem_atual.set(contagem)
+    try:
+        yield contagem
+    finally:
+        _contagem_atual.reset(token)
+
+
+class LimiteQueries:
+    """Middleware ASGI que conta os statements de cada requisição HTTP"""
+
+    def __init__(self, app, limite: int, estrito: bool = False):
+        self.app = app
+        self.limite = limite
+        self.estrito = estrito
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with contar_queries() as contagem:
+            await self.app(scope, receive, send)
+
+        if contagem.total > self.limite:
+            requisicao = f"{scope.get('method')} {scope.get('path')}"
+            mensagem = f"{requisicao} executou {contagem.total} queries (limite {self.limite})"
+            if self.estrito:
+                raise LimiteQueriesExcedido(mensagem + ":\n" + "\n".join(contagem.statements))
+            print(f"⚠️ {mensagem}")
@@ -3,6 +3,9 @@ import pymysql
 import sys
 from datetime import date
 
+from busca import criar_fulltext_mysql
+from ocupacao import instalar_ocupacao
+
 def criar_tabelas_mysql():
     """Criar tabelas diretamente no MySQL"""
     try:
@@ -26,6 +29,7 @@ def criar_tabelas_mysql():
             id INT AUTO_INCREMENT PRIMARY KEY,
             nome VARCHAR(100) NOT NULL UNIQUE,
             capacidade INT NOT NULL,
+            ocupacao INT NOT NULL DEFAULT 0,
             INDEX idx_turma_nome (nome)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
         """
@@ -42,6 +46,7 @@ def criar_tabelas_mysql():
             INDEX idx_aluno_nome (nome),
             INDEX idx_aluno_email (email),
             INDEX idx_aluno_status (status),
+            FULLTEXT INDEX ft_aluno_busca (nome, email),
             FOREIGN KEY (turma_id) REFERENCES turmas(id) ON DELETE SET NULL
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
         """
@@ -53,6 +58,12 @@ def criar_tabelas_mysql():
         print("👥 Criando tabela alunos...")
         cursor.execute(sql_alunos)
         
+        # Tabelas criadas antes da busca textual não têm o índice FULLTEXT
+        criar_fulltext_mysql(cursor)
+        
+        # Coluna turmas.ocupacao e triggers que a mantêm
+        instalar_ocupacao(connection, "mysql")
+        
         connection.commit()
         print("✅ Tabelas criadas com sucesso!")
         
@@ -28,7 +28,7 @@ def criar_tabela_usuarios():
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 username VARCHAR(50) UNIQUE NOT NULL,
                 email VARCHAR(100) UNIQUE NOT NULL,
-                senha_hash VARCHAR(64) NOT NULL,
+                senha_hash VARCHAR(255) NOT NULL,
                 tipo_usuario ENUM('admin', 'usuario') DEFAULT 'usuario',
                 ativo BOOLEAN DEFAULT TRUE,
                 data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -1,55 +1,344 @@
 # Configuração do banco de dados MySQL para o Sistema de Gestão Escolar
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 from sqlalchemy.exc import SQLAlchemyError
+import hashlib
+import json
 import os
+import tempfile
+import threading
+import time
 from models import Base
+from busca import criar_fts_sqlite, criar_fulltext_mysql
+from ocupacao import instalar_ocupacao
+from cache import invalidar_tabelas
+from disjuntor import CircuitoAberto, Disjuntor
 
 # Configuração do banco de dados MySQL
 # Para XAMPP: usuario=root, senha=vazia, host=localhost, porta=3306
-DATABASE_URL = "mysql+pymysql://root:@localhost:3306/escola_db"
+DATABASE_URL = os.getenv("ESCOLA_MYSQL_URL", "mysql+pymysql://root:@localhost:3306/escola_db")
 
 # Fallback para SQLite se MySQL não estiver disponível
-SQLITE_URL = "sqlite:///./app.db"
+SQLITE_URL = os.getenv("ESCOLA_SQLITE_URL", "sqlite:///./app.db")
 
-# Criar engine do SQLAlchemy com tentativa de conexão MySQL
-try:
-    # Tentar conectar ao MySQL primeiro
-    engine = create_engine(
+# Backend: "auto" (sonda o MySQL e cai para SQLite), "mysql" ou "sqlite" (sem sonda)
+DB_BACKEND = os.getenv("ESCOLA_DB_BACKEND", "auto").lower()
+CONNECT_TIMEOUT = int(os.getenv("ESCOLA_DB_CONNECT_TIMEOUT", "3"))  # Segundos por tentativa de conexão MySQL
+READ_TIMEOUT = int(os.getenv("ESCOLA_DB_READ_TIMEOUT", "30"))  # Servidor que aceita o TCP e para de responder
+SONDA_TTL = float(os.getenv("ESCOLA_DB_SONDA_TTL", "60"))  # Resultado da sonda reaproveitado entre processos (0 desliga)
+
+# Disjuntor do MySQL em execução: N falhas de conexão seguidas abrem o circuito;
+# aberto, as sessões falham na hora com CircuitoAberto (503) ou, se o failover foi
+# ligado, vão para uma réplica SQLite; uma thread sonda o MySQL até ele voltar.
+# O failover é opcional e exige os dois: ESCOLA_DB_FAILOVER=1 e
+# ESCOLA_DB_FAILOVER_URL apontando para a réplica (nunca o ./app.db local, que
+# pode ser de outra época ou de desenvolvimento e seria servido como produção).
+# O failover é SOMENTE LEITURA: o SQLite não é reconciliado com o MySQL na volta,
+# então qualquer escrita ali se perderia (split-brain). Escritas durante a queda
+# recebem CircuitoAberto (503) e as leituras mostram o conteúdo da cópia SQLite,
+# que pode estar desatualizada em relação ao MySQL.
+DISJUNTOR_FALHAS = int(os.getenv("ESCOLA_DISJUNTOR_FALHAS", "3"))
+DISJUNTOR_INTERVALO = float(os.getenv("ESCOLA_DISJUNTOR_INTERVALO", "5"))  # Segundos entre sondas
+DISJUNTOR_SUCESSOS = int(os.getenv("ESCOLA_DISJUNTOR_SUCESSOS", "2"))  # Sucessos em teste para fechar
+DISJUNTOR_TENTATIVAS = int(os.getenv("ESCOLA_DISJUNTOR_TENTATIVAS", str(DISJUNTOR_SUCESSOS)))  # Chamadas em teste (meio aberto)
+FAILOVER_URL = os.getenv("ESCOLA_DB_FAILOVER_URL", "")  # Réplica SQLite, ex.: sqlite:////srv/escola/replica.db
+FAILOVER_SQLITE = os.getenv("ESCOLA_DB_FAILOVER", "0") == "1" and bool(FAILOVER_URL)
+if os.getenv("ESCOLA_DB_FAILOVER", "0") == "1" and not FAILOVER_URL:
+    print("⚠️ ESCOLA_DB_FAILOVER=1 sem ESCOLA_DB_FAILOVER_URL: failover desligado (MySQL fora = 503)")
+
+# O engine só é criado no primeiro uso (obter_engine / database.engine / SessionLocal()),
+# então importar este módulo não abre conexão nenhuma
+_engine = None
+_lock_engine = threading.Lock()
+_ao_criar = []
+_engine_reserva = None
+disjuntor = None  # Só existe quando o engine principal é MySQL
+
+
+def _arquivo_sonda(url: str) -> str:
+    chave = hashlib.sha1(url.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"escola_sonda_{chave}.json")
+
+
+def _sonda_em_cache(url: str):
+    """Resultado recente da sonda (True/False) ou None"""
+    if SONDA_TTL <= 0:
+        return None
+    try:
+        with open(_arquivo_sonda(url), encoding="utf-8") as arquivo:
+            sonda = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    if time.time() - sonda.get("em", 0) > SONDA_TTL:
+        return None
+    return bool(sonda.get("disponivel"))
+
+
+def _guardar_sonda(url: str, disponivel: bool):
+    if SONDA_TTL <= 0:
+        return
+    try:
+        with open(_arquivo_sonda(url), "w", encoding="utf-8") as arquivo:
+            json.dump({"disponivel": disponivel, "em": time.time()}, arquivo)
+    except OSError:
+        pass
+
+
+def _criar_engine_mysql():
+    return create_engine(
         DATABASE_URL,
         echo=False,  # Definir como True para ver queries SQL no console
         pool_pre_ping=True,  # Verificar conexão antes de usar
-        pool_recycle=3600  # Renovar conexões a cada hora
+        pool_recycle=3600,  # Renovar conexões a cada hora
+        connect_args={"connect_timeout": CONNECT_TIMEOUT, "read_timeout": READ_TIMEOUT}
     )
-    
-    # Testar conexão
-    engine.connect()
-    print("✅ Conectado ao MySQL com sucesso!")
-    
-except Exception as e:
-    print(f"⚠️ Erro ao conectar MySQL: {e}")
-    print("🔄 Usando SQLite como fallback...")
-    
-    # Usar SQLite como fallback
-    engine = create_engine(
-        SQLITE_URL,
+
+
+def _criar_engine_sqlite(url: str = None):
+    return create_engine(
+        url or SQLITE_URL,
         connect_args={"check_same_thread": False},  # Necessário para SQLite
         echo=False
     )
-    DATABASE_URL = SQLITE_URL
+
+
+def _sondar_mysql(avisar: bool = True) -> bool:
+    """Uma conexão de teste, fechada em seguida; o read_timeout cobre servidor que aceita o TCP e não responde"""
+    sonda = create_engine(DATABASE_URL, poolclass=NullPool,
+                          connect_args={"connect_timeout": CONNECT_TIMEOUT, "read_timeout": CONNECT_TIMEOUT})
+    try:
+        with sonda.connect():
+            return True
+    except Exception as e:
+        if avisar:
+            print(f"⚠️ Erro ao conectar MySQL: {e}")
+        return False
+    finally:
+        sonda.dispose()
+
+
+def _escolher_engine():
+    if DB_BACKEND == "sqlite":
+        return _criar_engine_sqlite()
+    if DB_BACKEND == "mysql":
+        return _criar_engine_mysql()
+    if DB_BACKEND != "auto":
+        raise ValueError(f"ESCOLA_DB_BACKEND inválido: {DB_BACKEND!r} (use auto, mysql ou sqlite)")
+
+    disponivel = _sonda_em_cache(DATABASE_URL)
+    if disponivel is False:
+        print("🔄 MySQL indisponível na última sonda, usando SQLite...")
+        return _criar_engine_sqlite()
+
+    if disponivel is None:
+        disponivel = _sondar_mysql()
+        _guardar_sonda(DATABASE_URL, disponivel)
+        if not disponivel:
+            print("🔄 Usando SQLite como fallback...")
+            return _criar_engine_sqlite()
+    print("✅ Conectado ao MySQL com sucesso!")
+    return _criar_engine_mysql()
+
+
+def obter_engine():
+    """Engine em uso, criado (com a sonda do MySQL, se for o caso) na primeira chamada"""
+    global _engine
+    if _engine is None:
+        with _lock_engine:
+            if _engine is None:
+                engine = _escolher_engine()
+                if engine.dialect.name == "mysql":
+                    _instalar_disjuntor(engine)
+                for funcao in _ao_criar:
+                    funcao(engine)
+                _engine = engine
+    return _engine
+
+
+def _instalar_disjuntor(engine):
+    global disjuntor
+    disjuntor = Disjuntor("mysql", lambda: _sondar_mysql(avisar=False), limite_falhas=DISJUNTOR_FALHAS,
+                          intervalo_sonda=DISJUNTOR_INTERVALO, sucessos_para_fechar=DISJUNTOR_SUCESSOS,
+                          tentativas=DISJUNTOR_TENTATIVAS)
+    event.listen(engine, "handle_error", _erro_mysql)
+    event.listen(engine, "after_cursor_execute", _sucesso_mysql)
+
+
+# Erros do cliente MySQL que indicam servidor inalcançável: 2002/2003 (não conectou,
+# inclusive por timeout), 2005 (host desconhecido), 2006/2013 (conexão caiu), 2055
+_ERROS_CONEXAO_MYSQL = {2002, 2003, 2005, 2006, 2013, 2055}
+
+
+def _erro_mysql(contexto):
+    # Só falha de conexão conta; deadlock, constraint etc. não
+    if contexto.is_pre_ping:
+        return
+    erro = contexto.original_exception
+    codigo = erro.args[0] if getattr(erro, "args", None) else None
+    if contexto.is_disconnect or codigo in _ERROS_CONEXAO_MYSQL:
+        disjuntor.registrar_falha(str(erro)[:200])
+
+
+def _sucesso_mysql(conn, cursor, statement, parameters, context, executemany):
+    disjuntor.registrar_sucesso()
+
+
+def obter_engine_reserva():
+    """Engine SQLite do failover, criado e inicializado na primeira abertura do disjuntor"""
+    global _engine_reserva
+    if _engine_reserva is None:
+        with _lock_engine:
+            if _engine_reserva is None:
+                print(f"🔄 MySQL fora do ar, atendendo pela réplica {FAILOVER_URL} (somente leitura) até ele voltar...")
+                engine = _criar_engine_sqlite(FAILOVER_URL)
+                for funcao in _ao_criar:
+                    funcao(engine)
+                create_tables(engine)
+                create_occupancy_triggers(engine)
+                create_search_index(engine)
+                # Somente leitura a partir daqui (ver o comentário do disjuntor, no topo)
+                event.listen(engine, "connect", _somente_leitura)
+                engine.dispose()
+                _engine_reserva = engine
+    return _engine_reserva
+
+
+def engine_da_sessao():
+    """Engine para uma sessão nova: o principal, ou o SQLite / CircuitoAberto com o disjuntor aberto"""
+    engine = obter_engine()
+    if disjuntor is None or disjuntor.permite():
+        return engine
+    if FAILOVER_SQLITE:
+        return obter_engine_reserva()
+    raise CircuitoAberto(disjuntor.nome, disjuntor.segundos_ate_sonda())
+
+
+def _somente_leitura(dbapi_conn, _):
+    dbapi_conn.execute("PRAGMA query_only = ON")
+
+
+def _recusar_escrita(session):
+    """Escrita em sessão do failover: recusada (503) em vez de ficar só no SQLite"""
+    if session.get_bind() is _engine_reserva and _engine_reserva is not None:
+        raise CircuitoAberto(disjuntor.nome, disjuntor.segundos_ate_sonda())
+
+
+def engine_criado() -> bool:
+    return _engine is not None
+
+
+def ao_criar_engine(funcao):
+    """Chama funcao(engine) quando o engine for criado (na hora, se já existir)"""
+    with _lock_engine:
+        _ao_criar.append(funcao)
+        engine = _engine
+    if engine is not None:
+        funcao(engine)
+
+
+def __getattr__(nome):
+    # database.engine / from database import engine continuam funcionando, sob demanda
+    if nome == "engine":
+        return obter_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+class _Sessao(Session):
+    """Sessão que obtém o engine só quando é criada (passando pelo disjuntor)"""
+
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind if bind is not None else engine_da_sessao(), **kwargs)
+
 
 # Criar SessionLocal
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=_Sessao, autocommit=False, autoflush=False)
+
+@event.listens_for(SessionLocal, "before_flush")
+def recusar_flush_no_failover(session, flush_context, instances):
+    _recusar_escrita(session)  # Com o disjuntor aberto, nada chega a ser gravado
+
+# Invalidação de caches: tabelas alteradas no flush são invalidadas após o commit
+@event.listens_for(SessionLocal, "after_flush")
+def registrar_tabelas_alteradas(session, flush_context):
+    tabelas = session.info.setdefault("tabelas_alteradas", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tabelas.add(obj.__table__.name)
+    if "alunos" in tabelas:
+        tabelas.add("turmas")  # turmas.ocupacao é mantida por trigger
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def registrar_dml(orm_execute_state):
+    """UPDATE/DELETE/INSERT executados via session.execute() não passam pelo flush"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        _recusar_escrita(orm_execute_state.session)
+        tabela = orm_execute_state.statement.table.name
+        tabelas = orm_execute_state.session.info.setdefault("tabelas_alteradas", set())
+        tabelas.add(tabela)
+        if tabela == "alunos":
+            tabelas.add("turmas")
+
+@event.listens_for(SessionLocal, "after_commit")
+def invalidar_caches(session):
+    tabelas = session.info.pop("tabelas_alteradas", None)
+    if tabelas:
+        invalidar_tabelas(*tabelas)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def descartar_tabelas_alteradas(session):
+    session.info.pop("tabelas_alteradas", None)
+
+# Busca textual de alunos disponível: "fts5" (SQLite), "fulltext" (MySQL) ou None (LIKE)
+BUSCA_TEXTUAL = None
+_busca_por_engine = {}  # Engine -> modo (o SQLite do failover tem o seu)
+
+
+def busca_textual(bind=None):
+    """Modo de busca textual do engine da sessão (padrão: o do engine principal)"""
+    return _busca_por_engine.get(bind, BUSCA_TEXTUAL)
 
-def create_tables():
+def create_tables(engine=None):
     """Criar todas as tabelas no banco de dados"""
     try:
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=engine or obter_engine())
         print("✅ Tabelas criadas com sucesso!")
     except SQLAlchemyError as e:
         print(f"❌ Erro ao criar tabelas: {e}")
         raise
 
+def create_occupancy_triggers(engine=None):
+    """Criar turmas.ocupacao e os triggers que a mantêm (com backfill na primeira vez)"""
+    engine = engine or obter_engine()
+    conn = engine.raw_connection()
+    try:
+        if instalar_ocupacao(conn, engine.dialect.name):
+            print("✅ Ocupação das turmas calculada")
+    finally:
+        conn.close()
+
+def create_search_index(engine=None):
+    """Criar o índice de busca textual de alunos conforme o banco em uso"""
+    global BUSCA_TEXTUAL
+    engine = engine or obter_engine()
+    conn = engine.raw_connection()
+    try:
+        if engine.dialect.name == "sqlite":
+            modo = "fts5" if criar_fts_sqlite(conn) else None
+        else:
+            cursor = conn.cursor()
+            criar_fulltext_mysql(cursor)
+            cursor.close()
+            conn.commit()
+            modo = "fulltext"
+    except Exception as e:
+        print(f"⚠️ Busca textual indisponível, usando LIKE: {e}")
+        modo = None
+    finally:
+        conn.close()
+    _busca_por_engine[engine] = modo
+    if engine is _engine:
+        BUSCA_TEXTUAL = modo
+
 def init_db():
     """Inicializar o banco de dados"""
     try:
@@ -63,6 +352,8 @@ def init_db():
         
         # Criar tabelas
         create_tables()
+        create_occupancy_triggers()
+        create_search_index()
         
         print("🚀 Banco de dados inicializado com sucesso!")
         
@@ -107,6 +398,7 @@ def reset_database():
         print("⚠️ Resetando banco de dados...")
         
         # Apagar todas as tabelas
+        engine = obter_engine()
         Base.metadata.drop_all(bind=engine)
         print("🗑️ Tabelas removidas")
         
@@ -140,11 +432,12 @@ def get_database_info():
         
         # Verificar se as tabelas existem
         from sqlalchemy import inspect
+        engine = obter_engine()
         inspector = inspect(engine)
         tables = inspector.get_table_names()
         
         info = {
-            "database_url": DATABASE_URL,
+            "database_url": engine.url.render_as_string(hide_password=True),
             "database_file": "app.db",
             "file_exists": os.path.exists("app.db"),
             "tables": tables,
@@ -0,0 +1,102 @@
+# Acesso ao banco sem bloquear o event loop
+# Os drivers usados (sqlite3 e pymysql) são síncronos; aqui cada operação é
+# despachada para um pool de threads dedicado ao banco e o endpoint apenas aguarda.
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DBExecutor:
+    """Pool de threads exclusivo para chamadas ao banco de dados"""
+
+    def __init__(self, max_workers: int = 8, nome: str = "db"):
+        self.max_workers = max_workers
+        self.nome = nome
+        self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.nome)
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Executa fn(*args, **kwargs) em uma thread do pool e aguarda o resultado"""
+        loop = asyncio.get_running_loop()
+        # Propaga contextvars (ex.: requisição atual no modo debug do pool)
+        ctx = contextvars.copy_context()
+        chamada = functools.partial(ctx.run, fn, *args, **kwargs)
+        return await loop.run_in_executor(self._get_executor(), chamada)
+
+    def shutdown(self):
+        """Encerra as threads (aguardando as operações em andamento)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class AsyncConnection:
+    """Conexão DB-API com métodos aguardáveis executados no DBExecutor"""
+
+    def __init__(self, conn, executor: DBExecutor):
+        self.conn = conn
+        self.executor = executor
+
+    def _execute(self, sql, params):
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def _fetchone(self, sql, params):
+        cursor = self._execute(sql, params)
+        try:
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def _fetchall(self, sql, params):
+        cursor = self._execute(sql, params)
+        try:
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _fetchdicts(self, sql, params):
+        cursor = self._execute(sql, params)
+        try:
+            nomes = [coluna[0] for coluna in cursor.description]
+            return [dict(zip(nomes, linha)) for linha in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _executemany(self, sql, seq_params):
+        cursor = self.conn.cursor()
+        cursor.executemany(sql, seq_params)
+        return cursor
+
+    async def execute(self, sql: str, params=()):
+        """Executa o comando e devolve o cursor (lastrowid/rowcount)"""
+        return await self.executor.run(self._execute, sql, params)
+
+    async def executemany(self, sql: str, seq_params):
+        return await self.executor.run(self._executemany, sql, seq_params)
+
+    async def fetchone(self, sql: str, params=()):
+        return await self.executor.run(self._fetchone, sql, params)
+
+    async def fetchall(self, sql: str, params=()):
+        return await self.executor.run(self._fetchall, sql, params)
+
+    async def fetchdicts(self, sql: str, params=()):
+        """Linhas já como dicts {coluna: valor}, montados na thread do banco"""
+        return await self.executor.run(self._fetchdicts, sql, params)
+
+    async def commit(self):
+        await self.executor.run(self.conn.commit)
+
+    async def rollback(self):
+        await self.executor.run(self.conn.rollback)
+
+    async def run(self, fn, *args, **kwargs):
+        """Executa fn(conn, *args, **kwargs) inteira no pool (várias queries de uma vez)"""
+        return await self.executor.run(fn, self.conn, *args, **kwargs)
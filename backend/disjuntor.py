@@ -0,0 +1,182 @@
+# Disjuntor (circuit breaker) para um recurso externo, ex.: o MySQL
+# fechado     -> chamadas passam; N falhas seguidas abrem o disjuntor
+# aberto      -> chamadas recusadas na hora (CircuitoAberto), sem esperar timeout;
+#                uma thread sonda o recurso a cada intervalo
+# meio_aberto -> a sonda respondeu: até `tentativas` chamadas passam em teste
+#                (lote renovado a cada intervalo), as demais são recusadas;
+#                M sucessos fecham o disjuntor, qualquer falha abre de novo
+# As transições vão para o console, para os ouvintes (ao_mudar) e para stats().
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+_CODIGOS = {FECHADO: 0, MEIO_ABERTO: 1, ABERTO: 2}
+_ICONES = {FECHADO: "🟢", MEIO_ABERTO: "🟡", ABERTO: "🔴"}
+
+
+class CircuitoAberto(Exception):
+    """Chamada recusada sem tentar o recurso: o disjuntor está aberto"""
+
+    def __init__(self, nome: str, tentar_em: float):
+        super().__init__(f"{nome} indisponível (disjuntor aberto)")
+        self.nome = nome
+        self.tentar_em = tentar_em  # Segundos até a próxima sonda
+
+
+class Disjuntor:
+    def __init__(self, nome: str, sonda: Callable[[], bool], limite_falhas: int = 3,
+                 intervalo_sonda: float = 5.0, sucessos_para_fechar: int = 2, tentativas: int = None):
+        self.nome = nome
+        self.sonda = sonda  # Sem argumentos; True se o recurso voltou (exceção conta como False)
+        self.limite_falhas = max(1, limite_falhas)
+        self.intervalo_sonda = intervalo_sonda
+        self.sucessos_para_fechar = max(1, sucessos_para_fechar)
+        self.tentativas = max(1, tentativas or self.sucessos_para_fechar)  # Chamadas em teste por lote
+
+        self.estado = FECHADO
+        self._falhas_seguidas = 0
+        self._sucessos_teste = 0
+        self._liberadas = 0
+        self._aberto_em = 0.0
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self._ouvintes = []
+        self.transicoes = deque(maxlen=50)  # (time.time(), de, para, motivo)
+        self.falhas = 0
+        self.recusadas = 0
+        self.aberturas = 0
+        self.sondas = 0
+
+    # ===== Chamadas =====
+
+    def permite(self) -> bool:
+        """True se a chamada pode tentar o recurso"""
+        if self.estado == FECHADO:
+            return True  # Caminho comum, sem lock
+        with self._lock:
+            if self.estado == FECHADO:
+                return True
+            if self.estado == MEIO_ABERTO and self._liberadas < self.tentativas:
+                self._liberadas += 1
+                return True
+            self.recusadas += 1
+            return False
+
+    def segundos_ate_sonda(self) -> float:
+        decorrido = time.monotonic() - self._aberto_em
+        return self.intervalo_sonda - decorrido % self.intervalo_sonda
+
+    def verificar(self):
+        """Levanta CircuitoAberto se a chamada não pode tentar o recurso"""
+        if not self.permite():
+            raise CircuitoAberto(self.nome, self.segundos_ate_sonda())
+
+    def registrar_sucesso(self):
+        if self.estado == FECHADO and self._falhas_seguidas == 0:
+            return  # Caminho comum, sem lock
+        with self._lock:
+            if self.estado == FECHADO:
+                self._falhas_seguidas = 0
+                return
+            if self.estado != MEIO_ABERTO:
+                return
+            self._sucessos_teste += 1
+            if self._sucessos_teste < self.sucessos_para_fechar:
+                return
+            transicao = self._mudar(FECHADO, f"{self._sucessos_teste} sucessos em teste")
+        self._avisar(transicao)
+
+    def registrar_falha(self, motivo: str = ""):
+        with self._lock:
+            self.falhas += 1
+            if self.estado == MEIO_ABERTO:
+                transicao = self._mudar(ABERTO, f"falha em teste: {motivo}")
+            elif self.estado == FECHADO:
+                self._falhas_seguidas += 1
+                if self._falhas_seguidas < self.limite_falhas:
+                    return
+                transicao = self._mudar(ABERTO, f"{self._falhas_seguidas} falhas seguidas: {motivo}")
+            else:
+                return
+        self._avisar(transicao)
+
+    # ===== Transições =====
+
+    def ao_mudar(self, funcao: Callable[[str, str, str], None]):
+        """Chama funcao(de, para, motivo) a cada transição"""
+        self._ouvintes.append(funcao)
+
+    def _mudar(self, novo: str, motivo: str) -> tuple:
+        """Troca de estado (com o lock) e devolve a transição para _avisar"""
+        anterior, self.estado = self.estado, novo
+        self._falhas_seguidas = self._sucessos_teste = self._liberadas = 0
+        self.transicoes.append((time.time(), anterior, novo, motivo))
+        if novo == ABERTO:
+            self.aberturas += 1
+            self._aberto_em = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sondar, name=f"disjuntor-{self.nome}", daemon=True)
+                self._thread.start()
+        return anterior, novo, motivo
+
+    def _avisar(self, transicao: tuple):
+        anterior, novo, motivo = transicao
+        print(f"{_ICONES[novo]} Disjuntor {self.nome}: {anterior} → {novo} ({motivo})")
+        for funcao in list(self._ouvintes):
+            try:
+                funcao(anterior, novo, motivo)
+            except Exception as e:
+                print(f"⚠️ Ouvinte do disjuntor {self.nome} falhou: {e}")
+
+    def _sondar(self):
+        """Thread de fundo: sonda o recurso enquanto o disjuntor estiver aberto, até fechar"""
+        while not self._parar.wait(self.intervalo_sonda):
+            with self._lock:
+                if self.estado == FECHADO:
+                    self._thread = None  # Sob o lock: a próxima abertura cria outra thread
+                    return
+                if self.estado == MEIO_ABERTO:
+                    self._liberadas = 0  # Novo lote de teste (chamadas liberadas que não deram resultado)
+                    continue
+            self.sondas += 1
+            try:
+                voltou = bool(self.sonda())
+            except Exception:
+                voltou = False
+            if voltou:
+                with self._lock:
+                    if self.estado != ABERTO:
+                        continue
+                    transicao = self._mudar(MEIO_ABERTO, "sonda respondeu")
+                self._avisar(transicao)
+
+    def reiniciar(self, motivo: str = "reinício manual"):
+        """Volta para fechado na hora (operação manual e simulações)"""
+        with self._lock:
+            if self.estado == FECHADO:
+                return
+            transicao = self._mudar(FECHADO, motivo)
+        self._avisar(transicao)
+
+    def parar(self):
+        """Encerra a thread de sonda (testes e desligamento)"""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.intervalo_sonda + 1)
+
+    def stats(self) -> dict:
+        return {
+            "estado": self.estado,
+            "estado_codigo": _CODIGOS[self.estado],
+            "falhas_seguidas": self._falhas_seguidas,
+            "falhas": self.falhas,
+            "recusadas": self.recusadas,
+            "aberturas": self.aberturas,
+            "sondas": self.sondas,
+        }
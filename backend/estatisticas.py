@@ -0,0 +1,59 @@
+# Estatísticas gerais em uma única consulta
+# Uma linha por turma (LEFT JOIN + GROUP BY) e uma linha extra para alunos
+# sem turma; os totais saem da soma das linhas. Usado por app.py e app_simples.py.
+import os
+
+from cache import CacheTabelas
+
+SQL_ESTATISTICAS = """
+    SELECT t.id, t.nome, t.capacidade,
+           COUNT(a.id) AS alunos,
+           SUM(CASE WHEN a.status = 'ativo' THEN 1 ELSE 0 END) AS ativos,
+           SUM(CASE WHEN a.status = 'inativo' THEN 1 ELSE 0 END) AS inativos
+    FROM turmas t
+    LEFT JOIN alunos a ON a.turma_id = t.id
+    GROUP BY t.id, t.nome, t.capacidade
+    UNION ALL
+    SELECT NULL, NULL, NULL,
+           COUNT(a.id),
+           SUM(CASE WHEN a.status = 'ativo' THEN 1 ELSE 0 END),
+           SUM(CASE WHEN a.status = 'inativo' THEN 1 ELSE 0 END)
+    FROM alunos a
+    LEFT JOIN turmas t ON t.id = a.turma_id
+    WHERE t.id IS NULL
+"""
+
+# Invalidado a cada escrita em alunos/turmas
+cache_estatisticas = CacheTabelas(
+    "estatisticas", ["alunos", "turmas"], ttl=float(os.getenv("ESCOLA_STATS_TTL", "300"))
+)
+
+
+def montar_estatisticas(linhas, ordenar_por: str = "turma_id") -> dict:
+    """Converte as linhas de SQL_ESTATISTICAS no formato de /estatisticas"""
+    total_alunos = alunos_ativos = alunos_inativos = alunos_sem_turma = 0
+    turmas_stats = []
+    for turma_id, nome, capacidade, alunos, ativos, inativos in linhas:
+        total_alunos += alunos
+        alunos_ativos += int(ativos or 0)
+        alunos_inativos += int(inativos or 0)
+        if turma_id is None:
+            alunos_sem_turma = alunos
+            continue
+        turmas_stats.append({
+            "turma_id": turma_id,
+            "turma_nome": nome,
+            "capacidade": capacidade,
+            "ocupacao": alunos,
+            "percentual_ocupacao": round((alunos / capacidade) * 100, 1) if capacidade > 0 else 0
+        })
+    turmas_stats.sort(key=lambda ts: ts[ordenar_por])
+
+    return {
+        "total_alunos": total_alunos,
+        "alunos_ativos": alunos_ativos,
+        "alunos_inativos": alunos_inativos,
+        "total_turmas": len(turmas_stats),
+        "alunos_sem_turma": alunos_sem_turma,
+        "turmas_estatisticas": turmas_stats
+    }
@@ -0,0 +1,105 @@
+# Exportação completa de tabelas em streaming (NDJSON ou CSV, opcionalmente gzip)
+# As linhas são lidas do cursor em lotes (fetchmany) e enviadas conforme são
+# serializadas; a memória usada não depende do tamanho da tabela.
+import csv
+import io
+import json
+import zlib
+from contextlib import aclosing
+
+import anyio
+from fastapi.responses import StreamingResponse
+
+TAMANHO_LOTE = 1000
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def _lotes(pool, executor, sql: str, params, tamanho: int):
+    """Gera lotes de linhas mantendo uma conexão própria durante todo o streaming"""
+    # Blindado: se o cliente desconectar durante o acquire, a conexão ainda chega aqui e é devolvida
+    with anyio.CancelScope(shield=True):
+        conn = await pool.acquire_async(executor)
+    cursor = None
+    try:
+        cursor = await executor.run(conn.execute, sql, params)
+        while True:
+            linhas = await executor.run(cursor.fetchmany, tamanho)
+            if not linhas:
+                break
+            yield linhas
+    finally:
+        # Desconexão do cliente cancela o streaming (cancel scope do anyio, que
+        # cancela de novo a cada await); sem a blindagem o release nunca rodaria
+        with anyio.CancelScope(shield=True):
+            if cursor is not None:
+                await executor.run(cursor.close)
+            await pool.release_async(conn, executor)
+
+
+def _ndjson(campos, linhas) -> str:
+    return "".join(
+        json.dumps(dict(zip(campos, linha)), ensure_ascii=False, default=str) + "\n"
+        for linha in linhas
+    )
+
+
+def _csv(campos, linhas) -> str:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    # Colunas extras (chaves de ordenação da paginação) ficam de fora
+    escritor.writerows(tuple(linha)[:len(campos)] for linha in linhas)
+    return buffer.getvalue()
+
+
+async def _conteudo(pool, executor, sql, params, campos, formato, comprimir, tamanho):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None  # wbits=31 -> formato gzip
+
+    def saida(texto: str) -> bytes:
+        dados = texto.encode("utf-8")
+        return compressor.compress(dados) if compressor else dados
+
+    if formato == "csv":
+        cabecalho = io.StringIO()
+        csv.writer(cabecalho).writerow(campos)
+        yield saida(cabecalho.getvalue())
+
+    serializar = _csv if formato == "csv" else _ndjson
+    # aclosing: a conexão é devolvida quando o streaming termina ou é cancelado, não no GC
+    async with aclosing(_lotes(pool, executor, sql, params, tamanho)) as lotes:
+        async for linhas in lotes:
+            pedaco = saida(serializar(campos, linhas))
+            if pedaco:
+                yield pedaco
+
+    if compressor:
+        yield compressor.flush()
+
+
+class _RespostaExportacao(StreamingResponse):
+    """StreamingResponse que fecha o gerador ao terminar, inclusive quando o cliente desconecta"""
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # O Starlette só abandona o iterador na desconexão; fechar aqui devolve a conexão
+            # ao pool antes de a requisição terminar, sem depender do GC
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+def exportar(pool, executor, sql: str, params, campos, formato: str = "ndjson",
+             comprimir: bool = False, nome: str = "export", tamanho: int = TAMANHO_LOTE) -> StreamingResponse:
+    """Resposta em streaming com o resultado de sql; campos são as primeiras colunas de cada linha"""
+    headers = {"Content-Disposition": f'attachment; filename="{nome}.{formato}"'}
+    if comprimir:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return _RespostaExportacao(
+        _conteudo(pool, executor, sql, params, campos, formato, comprimir, tamanho),
+        media_type=FORMATOS[formato],
+        headers=headers,
+    )
@@ -0,0 +1,420 @@
+# Gerador de dados sintéticos em massa para testes de desempenho
+# Determinístico: a mesma semente e a mesma quantidade geram exatamente os
+# mesmos dados, com qualquer número de workers ou tamanho de lote (cada bloco
+# de BLOCO_RNG linhas usa um random.Random derivado de semente + tabela + bloco).
+#
+# Distribuições:
+# - turmas por série (1º Ano ao 3º EM), capacidade 25-40, preenchidas a 85-100%;
+# - ~5% dos alunos sem turma (inativos); idade coerente com a série, válida
+#   para AlunoCreate (5-25 anos) em relação a DATA_REFERENCIA e aos anos seguintes;
+# - famílias com 1-4 filhos e 1-2 responsáveis (usuarios + vinculacoes);
+# - solicitações de matrícula pendentes, aprovadas e rejeitadas por família.
+#
+# Destinos:
+#   sqlite      schema do app_sqlite.py (todas as tabelas) no arquivo --db
+#   sqlalchemy  schema de models.py (turmas e alunos) no engine de database.py
+#               ou em --url; com MySQL os lotes são gravados em paralelo
+#
+# Uso: python gerar_dados.py [alunos] [--destino sqlite|sqlalchemy] [--db escola.db]
+#                            [--url URL] [--semente 42] [--workers N] [--lote 20000]
+# Os ids continuam a partir dos já existentes; as contas geradas usam SENHA_PADRAO.
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import unicodedata
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from math import gcd
+from multiprocessing import Pool
+from random import Random
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DATA_REFERENCIA = date(2025, 2, 3)  # Início do ano letivo usado para as idades
+SENHA_PADRAO = "123456"
+LOTE_PADRAO = 20000
+BLOCO_RNG = 1000  # Lotes são múltiplos deste tamanho
+
+# (nome da série, idade esperada na data de referência)
+SERIES = [
+    ("1º Ano", 6), ("2º Ano", 7), ("3º Ano", 8), ("4º Ano", 9), ("5º Ano", 10), ("6º Ano", 11),
+    ("7º Ano", 12), ("8º Ano", 13), ("9º Ano", 14), ("1ª Série EM", 15), ("2ª Série EM", 16),
+    ("3ª Série EM", 17),
+]
+PRIMEIROS_NOMES = [
+    "Ana", "Bruno", "Camila", "Diego", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela", "João",
+    "Júlia", "Lucas", "Larissa", "Matheus", "Mariana", "Nicolas", "Otávio", "Pedro", "Rafaela", "Samuel",
+    "Sofia", "Thiago", "Valentina", "Vinícius", "Yasmin", "Arthur", "Beatriz", "Caio", "Davi", "Elisa",
+    "Enzo", "Giovanna", "Gustavo", "Helena", "Laura", "Lorenzo", "Manuela", "Miguel", "Alice", "Bernardo",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+    "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas",
+    "Cardoso", "Ramos", "Gonçalves", "Santana", "Teixeira", "Araújo", "Pinto", "Correia", "Moura", "Cavalcanti",
+]
+ESPECIALIDADES = [
+    "Matemática", "Português", "História", "Geografia", "Ciências", "Inglês", "Educação Física",
+    "Artes", "Física", "Química", "Biologia", "Filosofia", "Sociologia",
+]
+
+
+def _ascii(texto: str) -> str:
+    """Remove acentos e espaços para usernames/emails"""
+    sem_acento = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return sem_acento.lower().replace(" ", "")
+
+
+def _blocos(plano: dict, tabela: str, inicio: int, fim: int):
+    """(início, fim, Random) de cada bloco de BLOCO_RNG linhas em [inicio, fim)"""
+    for bloco in range(inicio, fim, BLOCO_RNG):
+        yield bloco, min(bloco + BLOCO_RNG, fim), Random(f"{plano['semente']}:{tabela}:{bloco}")
+
+
+def _nascimento(rnd: Random, idade: int) -> str:
+    """Data em que a pessoa tem exatamente `idade` anos na data de referência"""
+    ultimo = DATA_REFERENCIA.replace(year=DATA_REFERENCIA.year - idade)
+    return (ultimo - timedelta(days=rnd.randint(0, 364))).isoformat()
+
+
+def _momento(rnd: Random, dias: int) -> str:
+    momento = datetime.combine(DATA_REFERENCIA, datetime.min.time()) - timedelta(seconds=rnd.randint(0, dias * 86400))
+    return momento.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ===== PLANO (processo principal) =====
+
+def planejar(alunos: int, semente: int, bases: dict) -> dict:
+    """Estruturas globais pequenas: turmas e famílias; os lotes derivam delas"""
+    rnd = Random(f"{semente}:plano")
+    com_turma = round(alunos * 0.95)
+
+    turmas, acumulado, series_turma = [], array("q"), array("b")
+    total = 0
+    while total < com_turma:
+        turma_id = bases["turmas"] + len(turmas) + 1
+        # Nome derivado do id (único): 1º Ano A, 2º Ano A, ..., 1º Ano B, ...
+        serie = (turma_id - 1) % len(SERIES)
+        letras, k = "", (turma_id - 1) // len(SERIES)
+        while True:
+            letras = chr(ord("A") + k % 26) + letras
+            k = k // 26 - 1
+            if k < 0:
+                break
+        capacidade = rnd.randint(25, 40)
+        ocupacao = min(max(1, round(capacidade * rnd.uniform(0.85, 1.0))), com_turma - total)
+        total += ocupacao
+        turmas.append((turma_id, f"{SERIES[serie][0]} {letras}", capacidade, ocupacao))
+        acumulado.append(total)
+        series_turma.append(serie)
+
+    # Famílias: filhos e responsáveis por família e onde começam (prefixos)
+    filhos, responsaveis = array("b"), array("b")
+    inicio_filhos, inicio_resp = array("q"), array("q")
+    atribuidos = usuarios = 0
+    while atribuidos < alunos:
+        r = rnd.random()
+        quantidade = 1 if r < 0.45 else 2 if r < 0.80 else 3 if r < 0.95 else 4
+        quantidade = min(quantidade, alunos - atribuidos)
+        resp = 1 if rnd.random() < 0.35 else 2
+        inicio_filhos.append(atribuidos)
+        inicio_resp.append(usuarios)
+        filhos.append(quantidade)
+        responsaveis.append(resp)
+        atribuidos += quantidade
+        usuarios += resp
+
+    # Irmãos não ficam em ids (e turmas) vizinhos: filho k -> aluno (k * salto) mod N
+    salto = next(p for p in (7919, 104729, 1299709, 15485863) if gcd(p, alunos) == 1)
+
+    return {
+        "semente": semente, "alunos": alunos, "com_turma": com_turma, "bases": bases,
+        "turmas": turmas, "acumulado": acumulado, "series_turma": series_turma,
+        "filhos": filhos, "responsaveis": responsaveis,
+        "inicio_filhos": inicio_filhos, "inicio_resp": inicio_resp,
+        "usuarios": usuarios, "salto": salto,
+        "professores": max(5, alunos // 25),
+    }
+
+
+# ===== LOTES (workers) =====
+
+_plano = None
+
+
+def _iniciar_worker(plano):
+    global _plano
+    _plano = plano
+
+
+def _aluno(plano: dict, k: int, rnd: Random) -> tuple:
+    aluno_id = plano["bases"]["alunos"] + k + 1
+    primeiro, meio, ultimo = rnd.choice(PRIMEIROS_NOMES), rnd.choice(SOBRENOMES), rnd.choice(SOBRENOMES)
+    email = f"{_ascii(primeiro)}.{_ascii(ultimo)}.{aluno_id}@email.com" if rnd.random() < 0.9 else None
+    if k < plano["com_turma"]:
+        posicao = bisect_right(plano["acumulado"], k)
+        turma_id = plano["turmas"][posicao][0]
+        idade = SERIES[plano["series_turma"][posicao]][1] + (1 if rnd.random() < 0.1 else 0)
+        status = "ativo" if rnd.random() < 0.97 else "inativo"
+    else:
+        turma_id, idade, status = None, rnd.randint(6, 17), "inativo"
+    return (aluno_id, f"{primeiro} {meio} {ultimo}", _nascimento(rnd, idade), email, status, turma_id)
+
+
+def gerar_alunos(inicio: int, fim: int, plano: dict = None) -> list:
+    plano = plano or _plano
+    return [_aluno(plano, k, rnd) for bloco, fim_bloco, rnd in _blocos(plano, "alunos", inicio, fim)
+            for k in range(bloco, fim_bloco)]
+
+
+def gerar_familias(inicio: int, fim: int, plano: dict = None) -> dict:
+    """usuarios, vinculacoes e solicitacoes das famílias [inicio, fim)"""
+    plano = plano or _plano
+    bases, n, salto = plano["bases"], plano["alunos"], plano["salto"]
+    usuarios, vinculacoes, solicitacoes = [], [], []
+    for f, rnd in ((f, rnd) for bloco, fim_bloco, rnd in _blocos(plano, "familias", inicio, fim)
+                   for f in range(bloco, fim_bloco)):
+        sobrenome = rnd.choice(SOBRENOMES)
+        filhos = [bases["alunos"] + (k * salto) % n + 1
+                  for k in range(plano["inicio_filhos"][f], plano["inicio_filhos"][f] + plano["filhos"][f])]
+        vinculos = ["mae", "pai"] if plano["responsaveis"][f] == 2 else [rnd.choice(["responsavel", "mae", "pai", "tutor"])]
+        responsaveis = []
+        for j, vinculo in enumerate(vinculos):
+            usuario_id = bases["usuarios"] + plano["inicio_resp"][f] + j + 1
+            username = f"{_ascii(rnd.choice(PRIMEIROS_NOMES))}.{_ascii(sobrenome)}{usuario_id}"
+            usuarios.append((usuario_id, username, f"{username}@email.com", plano["senha_hash"], "usuario",
+                             _momento(rnd, 365)))
+            responsaveis.append(usuario_id)
+            vinculacoes.extend((usuario_id, aluno_id, vinculo) for aluno_id in filhos)
+
+        r = rnd.random()
+        if r < 0.12:
+            # Solicitação atendida: o aluno já existe
+            data = _momento(rnd, 90)
+            solicitacoes.append((responsaveis[0], f"{rnd.choice(PRIMEIROS_NOMES)} {sobrenome}", _nascimento(rnd, 6),
+                                 None, None, SERIES[0][0], "aprovada", data, data, "Solicitação aprovada", filhos[0]))
+        elif r < 0.20 or r >= 0.97:
+            status = "pendente" if r < 0.20 else "rejeitada"
+            data = _momento(rnd, 30 if status == "pendente" else 90)
+            solicitacoes.append((responsaveis[0], f"{rnd.choice(PRIMEIROS_NOMES)} {sobrenome}",
+                                 _nascimento(rnd, rnd.randint(5, 7)), None, rnd.choice([None, "Irmão já estuda na escola"]),
+                                 rnd.choice([s for s, _ in SERIES[:3]]), status, data,
+                                 None if status == "pendente" else data,
+                                 None if status == "pendente" else "Sem vagas na série", None))
+    return {"usuarios": usuarios, "vinculacoes": vinculacoes, "solicitacoes_matricula": solicitacoes}
+
+
+def gerar_professores(inicio: int, fim: int, plano: dict = None) -> list:
+    plano = plano or _plano
+    linhas = []
+    for k, rnd in ((k, rnd) for bloco, fim_bloco, rnd in _blocos(plano, "professores", inicio, fim)
+                   for k in range(bloco, fim_bloco)):
+        professor_id = plano["bases"]["professores"] + k + 1
+        primeiro, ultimo = rnd.choice(PRIMEIROS_NOMES), rnd.choice(SOBRENOMES)
+        linhas.append((professor_id, f"Prof. {primeiro} {ultimo}",
+                       f"{_ascii(primeiro)}.{_ascii(ultimo)}.{professor_id}@escola.com",
+                       rnd.choice(ESPECIALIDADES), f"(11) 9{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}",
+                       "ativo" if rnd.random() < 0.95 else "inativo"))
+    return linhas
+
+
+_GERADORES = {"alunos": gerar_alunos, "familias": gerar_familias, "professores": gerar_professores}
+
+
+def _executar_tarefa(tarefa):
+    tipo, inicio, fim = tarefa
+    return tipo, _GERADORES[tipo](inicio, fim)
+
+
+def tarefas(plano: dict, lote: int, tipos) -> list:
+    tamanhos = {"alunos": plano["alunos"], "familias": len(plano["filhos"]), "professores": plano["professores"]}
+    lote = max(BLOCO_RNG, lote - lote % BLOCO_RNG)
+    return [(tipo, inicio, min(inicio + lote, tamanhos[tipo]))
+            for tipo in tipos for inicio in range(0, tamanhos[tipo], lote)]
+
+
+def lotes(plano: dict, lote: int, workers: int, tipos):
+    """Gera os lotes em paralelo (processos); ordem de chegada livre"""
+    lista = tarefas(plano, lote, tipos)
+    if workers <= 1:
+        _iniciar_worker(plano)
+        for tarefa in lista:
+            yield _executar_tarefa(tarefa)
+        return
+    with Pool(workers, initializer=_iniciar_worker, initargs=(plano,)) as pool:
+        yield from pool.imap_unordered(_executar_tarefa, lista)
+
+
+# ===== DESTINO: SQLite do app_sqlite.py =====
+
+SQL_INSERT_SQLITE = {
+    "turmas": "INSERT INTO turmas (id, nome, capacidade) VALUES (?, ?, ?)",
+    "alunos": "INSERT INTO alunos (id, nome, data_nascimento, email, status, turma_id) VALUES (?, ?, ?, ?, ?, ?)",
+    "professores": "INSERT INTO professores (id, nome, email, especialidade, telefone, status) VALUES (?, ?, ?, ?, ?, ?)",
+    "usuarios": "INSERT INTO usuarios (id, username, email, senha_hash, tipo_usuario, data_criacao) VALUES (?, ?, ?, ?, ?, ?)",
+    "vinculacoes": "INSERT INTO vinculacoes (usuario_id, aluno_id, tipo_vinculo) VALUES (?, ?, ?)",
+    "solicitacoes_matricula": """INSERT INTO solicitacoes_matricula
+        (usuario_id, nome_aluno, data_nascimento, email_aluno, observacoes, turma_solicitada,
+         status, data_solicitacao, data_resposta, resposta_admin, aluno_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+}
+
+
+def _bases(cursor, tabelas) -> dict:
+    bases = {}
+    for tabela in tabelas:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabela}")
+        bases[tabela] = cursor.fetchone()[0]
+    return bases
+
+
+def carregar_sqlite(caminho: str, alunos: int, semente: int, workers: int, lote: int) -> dict:
+    os.environ["ESCOLA_DB_PATH"] = caminho
+    import app_sqlite  # Cria o schema (e o admin) no arquivo informado
+    from senhas import gerar_hash
+    from cache import instalar_versoes_sqlite
+    app_sqlite.DB_PATH = caminho
+    app_sqlite.init_database()
+
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MB durante a carga
+    # Triggers de versão (cache.py) disparam por linha: saem na carga e a versão sobe uma vez no fim
+    triggers = [nome for nome, in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name GLOB 'versao_*'")]
+    for trigger in triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    plano = planejar(alunos, semente, _bases(conn.cursor(), ("turmas", "alunos", "usuarios", "professores")))
+    plano["senha_hash"] = gerar_hash(SENHA_PADRAO)
+
+    contagem = {}
+    with conn:
+        conn.executemany(SQL_INSERT_SQLITE["turmas"], (t[:3] for t in plano["turmas"]))
+    contagem["turmas"] = len(plano["turmas"])
+
+    for tipo, dados in lotes(plano, lote, workers, ("alunos", "familias", "professores")):
+        tabelas = dados if isinstance(dados, dict) else {tipo: dados}
+        with conn:
+            for tabela, linhas in tabelas.items():
+                conn.executemany(SQL_INSERT_SQLITE[tabela], linhas)
+                contagem[tabela] = contagem.get(tabela, 0) + len(linhas)
+    with conn:
+        conn.execute("UPDATE versoes_tabelas SET versao = versao + 1")
+        instalar_versoes_sqlite(conn.cursor(), app_sqlite.TABELAS_VERSIONADAS)
+    conn.execute("ANALYZE")
+    conn.close()
+    app_sqlite.executor_senhas.shutdown()
+    return contagem
+
+
+# ===== DESTINO: schema SQLAlchemy (models.py) =====
+
+TRIGGERS_CARGA = ["turmas_ocupacao_ai", "turmas_ocupacao_ad", "turmas_ocupacao_au",
+                  "alunos_fts_ai", "alunos_fts_ad", "alunos_fts_au"]
+
+
+def carregar_sqlalchemy(url: str, alunos: int, semente: int, workers: int, lote: int) -> dict:
+    from sqlalchemy import create_engine, text
+    from models import Base, Aluno, Turma
+    from ocupacao import instalar_ocupacao, verificar_ocupacao
+    from busca import SQL_FTS_SQLITE
+
+    if url:
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        conn = engine.raw_connection()
+        try:
+            instalar_ocupacao(conn, engine.dialect.name)
+        finally:
+            conn.close()
+    else:
+        from database import engine, init_db
+        init_db()
+    sqlite = engine.dialect.name == "sqlite"
+
+    with engine.begin() as conn:
+        bases = {t: conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {t}")).scalar() for t in ("turmas", "alunos")}
+        # Sem triggers durante a carga: a ocupação já vem calculada no plano
+        for trigger in TRIGGERS_CARGA:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    plano = planejar(alunos, semente, {**bases, "usuarios": 0, "professores": 0})
+
+    colunas_aluno = ("id", "nome", "data_nascimento", "email", "status", "turma_id")
+
+    def gravar(tabela, linhas):
+        with engine.begin() as conn:
+            conn.execute(tabela.insert(), linhas)
+        return len(linhas)
+
+    with engine.begin() as conn:
+        conn.execute(Turma.__table__.insert(), [
+            {"id": t[0], "nome": t[1], "capacidade": t[2], "ocupacao": t[3]} for t in plano["turmas"]
+        ])
+    contagem = {"turmas": len(plano["turmas"]), "alunos": 0}
+
+    # SQLite tem um único escritor; no MySQL os lotes são gravados em paralelo
+    escritores = 1 if sqlite else max(2, workers)
+    with ThreadPoolExecutor(max_workers=escritores) as executor:
+        pendentes = []
+        for _, linhas in lotes(plano, lote, workers, ("alunos",)):
+            registros = [dict(zip(colunas_aluno, linha)) for linha in linhas]
+            for linha in registros:
+                linha["data_nascimento"] = date.fromisoformat(linha["data_nascimento"])
+            pendentes.append(executor.submit(gravar, Aluno.__table__, registros))
+            if len(pendentes) > escritores * 2:
+                contagem["alunos"] += pendentes.pop(0).result()
+        for futuro in pendentes:
+            contagem["alunos"] += futuro.result()
+
+    conn = engine.raw_connection()
+    try:
+        instalar_ocupacao(conn, engine.dialect.name)  # Recria os triggers
+        divergencias = verificar_ocupacao(conn, corrigir=True)
+        if divergencias:
+            print(f"⚠️ Ocupação recalculada em {len(divergencias)} turmas")
+        if sqlite:
+            cursor = conn.cursor()
+            for sql in SQL_FTS_SQLITE:
+                cursor.execute(sql)
+            cursor.execute("INSERT INTO alunos_fts(alunos_fts) VALUES ('rebuild')")
+            cursor.close()
+            conn.commit()
+    finally:
+        conn.close()
+    return contagem
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos para testes de desempenho")
+    parser.add_argument("alunos", type=int, nargs="?", default=10000)
+    parser.add_argument("--destino", choices=["sqlite", "sqlalchemy"], default="sqlite")
+    parser.add_argument("--db", default="escola.db", help="arquivo SQLite do app_sqlite.py")
+    parser.add_argument("--url", help="URL SQLAlchemy (padrão: engine de database.py)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO)
+    args = parser.parse_args()
+
+    if not 1 <= args.alunos <= 5_000_000:
+        parser.error("alunos deve estar entre 1 e 5.000.000")
+
+    inicio = time.perf_counter()
+    print(f"🔧 Gerando {args.alunos} alunos (semente {args.semente}, {args.workers} workers) em {args.destino}...")
+    if args.destino == "sqlite":
+        contagem = carregar_sqlite(args.db, args.alunos, args.semente, args.workers, args.lote)
+    else:
+        contagem = carregar_sqlalchemy(args.url, args.alunos, args.semente, args.workers, args.lote)
+    duracao = time.perf_counter() - inicio
+
+    for tabela, quantidade in contagem.items():
+        print(f"   {tabela:<24}{quantidade:>10}")
+    total = sum(contagem.values())
+    print(f"✅ {total} linhas em {duracao:.1f}s ({total / duracao:,.0f} linhas/s); senha das contas: {SENHA_PADRAO}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# Importação em lote (CSV ou JSON) para alunos, professores e turmas
+# O corpo da requisição é lido em streaming, validado com os modelos
+# Pydantic já usados nos endpoints e gravado com executemany em
+# transações por lote. Linhas inválidas não interrompem a importação:
+# voltam no relatório com o número da linha e o motivo.
+import codecs
+import csv
+import json
+import time
+from typing import AsyncIterator, List, Optional
+
+from pydantic import ValidationError
+
+TAMANHO_LOTE = 1000
+MAX_ERROS_RELATORIO = 1000
+MAX_REGISTRO_JSON = 64 * 1024  # Caracteres de um registro JSON ainda incompleto
+SEPARADORES_JSON = " \t\r\n,[]"
+
+
+class Importacao:
+    """Destino de uma importação: tabela, modelo de validação e colunas"""
+
+    def __init__(self, tabela: str, modelo, colunas: List[str]):
+        self.tabela = tabela
+        self.modelo = modelo
+        self.colunas = colunas
+        marcadores = ", ".join("?" for _ in colunas)
+        self.sql = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({marcadores})"
+
+    def validar(self, dados) -> tuple:
+        """Retorna os valores na ordem das colunas ou levanta ValueError/ValidationError"""
+        if not isinstance(dados, dict):
+            raise ValueError("registro deve ser um objeto")
+        item = self.modelo.model_validate(dados)
+        return tuple(getattr(item, coluna) for coluna in self.colunas)
+
+
+# ===== LEITURA EM STREAMING =====
+
+async def _texto(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        texto = decodificador.decode(chunk)
+        if texto:
+            yield texto
+    final = decodificador.decode(b"", final=True)
+    if final:
+        yield final
+
+
+async def registros_csv(chunks: AsyncIterator[bytes]):
+    """Gera (linha, dict) a partir de um CSV com cabeçalho; campos vazios ficam de fora (valor padrão do modelo)"""
+    cabecalho = None
+    pendente = ""
+    registro = ""
+    numero = 0
+    inicio_registro = 1
+
+    async def linhas_fisicas():
+        nonlocal pendente
+        async for texto in _texto(chunks):
+            pendente += texto
+            *completas, pendente = pendente.split("\n")
+            for linha in completas:
+                yield linha
+        if pendente:
+            yield pendente
+
+    async for linha in linhas_fisicas():
+        numero += 1
+        if not registro:
+            inicio_registro = numero
+        registro += linha + "\n"
+        # Campo entre aspas com quebra de linha: espera o fechamento
+        if registro.count('"') % 2:
+            continue
+        valores = next(csv.reader([registro]), [])
+        registro = ""
+        if not any(v.strip() for v in valores):
+            continue
+        if cabecalho is None:
+            cabecalho = [v.strip() for v in valores]
+            continue
+        yield inicio_registro, {c: v for c, v in zip(cabecalho, valores) if v != ""}
+
+    if registro:
+        yield inicio_registro, ValueError("aspas não fechadas no fim do arquivo")
+
+
+def _fim_registro(buffer: str, inicio: int) -> Optional[int]:
+    """
+    Fim de um registro JSON malformado em buffer[inicio:], onde o próximo pode começar:
+    fechamento do objeto, "," ou quebra de linha fora dele, ou um "{" no início de
+    linha dentro dele (NDJSON com "}" faltando). None: o registro ainda não terminou.
+    """
+    profundidade = 0
+    em_texto = escape = inicio_linha = False
+    for i in range(inicio, len(buffer)):
+        c = buffer[i]
+        if em_texto:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                em_texto = False
+            elif c == "\n":
+                return i + 1  # Texto JSON não tem quebra de linha: aspas não fechadas
+            continue
+        if c == "\n":
+            if profundidade == 0:
+                return i + 1
+            inicio_linha = True
+            continue
+        if c in " \t\r":
+            continue
+        if c == '"':
+            em_texto = True
+        elif c in "{[":
+            if i > inicio and (profundidade == 0 or (c == "{" and profundidade == 1 and inicio_linha)):
+                return i
+            profundidade += 1
+        elif c in "}]":
+            profundidade -= 1
+            if profundidade <= 0:
+                return i + 1
+        elif c == "," and profundidade == 0:
+            return i + 1
+        inicio_linha = False
+    return None
+
+
+async def registros_json(chunks: AsyncIterator[bytes]):
+    """
+    Gera (posição, objeto) de um array JSON sem carregar o corpo inteiro.
+    Também aceita um objeto por linha (NDJSON). Um registro malformado vira um
+    erro na sua posição e a leitura continua no registro seguinte.
+    """
+    decodificador = json.JSONDecoder()
+    buffer = ""
+    posicao = 0
+    descartando = False  # Registro longo demais descartado: pula até a próxima linha
+    espera = 0  # Registro incompleto: só tenta de novo quando o buffer dobrar (evita reler a cada pedaço)
+
+    def extrair(final: bool) -> list:
+        nonlocal buffer, posicao, descartando, espera
+        if len(buffer) < espera and not final:
+            return []
+        registros = []
+        inicio = 0
+        while True:
+            if descartando:
+                quebra = buffer.find("\n", inicio)
+                if quebra < 0:
+                    inicio = len(buffer)
+                    break
+                inicio, descartando = quebra + 1, False
+            while inicio < len(buffer) and buffer[inicio] in SEPARADORES_JSON:
+                inicio += 1
+            if inicio >= len(buffer):
+                break
+            try:
+                objeto, fim = decodificador.raw_decode(buffer, inicio)
+            except json.JSONDecodeError:
+                fim = _fim_registro(buffer, inicio)
+                motivo = f"JSON inválido perto de: {buffer[inicio:(fim or inicio + 50)].strip()[:50]!r}"
+                if fim is None and final:
+                    fim = len(buffer)
+                elif fim is None and len(buffer) - inicio > MAX_REGISTRO_JSON:
+                    fim, descartando = len(buffer), True
+                    motivo = f"registro JSON com mais de {MAX_REGISTRO_JSON} caracteres"
+                elif fim is None:
+                    break  # objeto incompleto: espera o próximo pedaço
+                objeto = ValueError(motivo)
+            posicao += 1
+            registros.append((posicao, objeto))
+            inicio = fim
+        buffer = buffer[inicio:]
+        espera = 2 * len(buffer)
+        return registros
+
+    async for texto in _texto(chunks):
+        buffer += texto
+        for registro in extrair(final=False):
+            yield registro
+    for registro in extrair(final=True):
+        yield registro
+
+
+# ===== GRAVAÇÃO =====
+
+def inserir_lote(conn, importacao: Importacao, lote: List[tuple]) -> List[dict]:
+    """
+    Insere [(linha, valores)] em uma transação com executemany (conexão do pool).
+    Se alguma linha violar restrição do banco, o lote é refeito linha a linha
+    para gravar as válidas; retorna os erros dessas linhas.
+    """
+    erros = []
+    try:
+        conn.executemany(importacao.sql, [valores for _, valores in lote])
+    except conn.IntegrityError:
+        conn.rollback()
+        for linha, valores in lote:
+            try:
+                conn.execute(importacao.sql, valores)
+            except conn.IntegrityError as e:
+                erros.append({"linha": linha, "erros": [str(e)]})
+    conn.commit()  # Outros erros: a transação é desfeita ao devolver a conexão ao pool
+    return erros
+
+
+def _mensagens(erro: Exception) -> List[str]:
+    if isinstance(erro, ValidationError):
+        return [
+            f"{'.'.join(str(p) for p in e['loc']) or 'registro'}: {e['msg']}"
+            for e in erro.errors()
+        ]
+    return [str(erro)]
+
+
+async def importar(registros, importacao: Importacao, pool, executor,
+                   tamanho_lote: int = TAMANHO_LOTE) -> dict:
+    """Valida e grava os registros em lotes; devolve o relatório da importação"""
+    inicio = time.perf_counter()
+    total = inseridos = rejeitados = 0
+    erros = []  # Até MAX_ERROS_RELATORIO; o restante só é contado
+    lote = []
+
+    def rejeitar(erro: dict):
+        nonlocal rejeitados
+        rejeitados += 1
+        if len(erros) < MAX_ERROS_RELATORIO:
+            erros.append(erro)
+
+    async def gravar():
+        nonlocal inseridos
+        conn = await pool.acquire_async(executor)  # Conexão só durante o lote, sem prender thread na espera
+        try:
+            erros_lote = await executor.run(inserir_lote, conn, importacao, lote)
+        finally:
+            await pool.release_async(conn, executor)
+        inseridos += len(lote) - len(erros_lote)
+        for erro in erros_lote:
+            rejeitar(erro)
+
+    async for linha, dados in registros:
+        total += 1
+        try:
+            if isinstance(dados, Exception):
+                raise dados
+            lote.append((linha, importacao.validar(dados)))
+        except (ValidationError, ValueError) as e:
+            rejeitar({"linha": linha, "erros": _mensagens(e)})
+        if len(lote) >= tamanho_lote:
+            await gravar()
+            lote = []
+    if lote:
+        await gravar()
+
+    duracao = time.perf_counter() - inicio
+    erros.sort(key=lambda e: e["linha"])
+    return {
+        "entidade": importacao.tabela,
+        "total": total,
+        "inseridos": inseridos,
+        "rejeitados": rejeitados,
+        "erros": erros,
+        "erros_omitidos": rejeitados - len(erros),
+        "tempo_segundos": round(duracao, 3),
+        "linhas_por_minuto": round(total / duracao * 60) if duracao else total,
+    }
+
+
+def detectar_formato(content_type: Optional[str], formato: Optional[str] = None) -> Optional[str]:
+    """formato explícito ou, na falta dele, pelo Content-Type"""
+    if formato:
+        return formato
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "json" in content_type:
+        return "json"
+    return None
@@ -0,0 +1,109 @@
+# Matrícula com reserva atômica de vaga (app.py com SQLAlchemy, app_simples.py com pymysql)
+# A checagem de capacidade acontece na própria escrita: o trigger de ocupação
+# só incrementa turmas.ocupacao se ainda houver vaga e, se não houver, aborta
+# o UPDATE do aluno com "turma_lotada". Não existe janela entre ler a vaga e
+# ocupá-la. (Um UPDATE alunos ... WHERE EXISTS (SELECT ... FROM turmas) não
+# serve no MySQL: o trigger não pode alterar uma tabela lida pela instrução.)
+# No MySQL a linha da turma é travada (FOR UPDATE) durante a transação; no
+# SQLite o primeiro UPDATE já serializa as transações de escrita.
+from typing import Callable, List
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models import Aluno, Turma
+from ocupacao import ERRO_TURMA_LOTADA
+
+MOTIVO_LOTADA = "Turma já atingiu a capacidade máxima"
+MOTIVO_NAO_ENCONTRADO = "Aluno não encontrado"
+MOTIVO_OUTRA_TURMA = "Aluno já está matriculado em outra turma"
+MOTIVO_MESMA_TURMA = "Aluno já está matriculado nesta turma"
+
+
+def travar_turma(db: Session, turma_id: int):
+    """Carrega a turma com FOR UPDATE (ignorado pelo SQLite)"""
+    return db.query(Turma).filter(Turma.id == turma_id).with_for_update().first()
+
+
+def turma_lotada(erro: Exception) -> bool:
+    """O erro é o trigger de ocupação recusando a escrita (SQLAlchemy ou driver direto)"""
+    return ERRO_TURMA_LOTADA in str(getattr(erro, "orig", erro))
+
+
+def _reservar(atualizar: Callable[[int], int], aluno_ids: List[int]) -> tuple:
+    """
+    Chama atualizar(aluno_id) -> linhas alteradas, na ordem, até a turma encher.
+    Retorna (aceitos, pendentes); os pendentes ainda não têm motivo.
+    """
+    aceitos, pendentes = [], []
+    lotada = False
+    for aluno_id in dict.fromkeys(aluno_ids):  # sem repetição, mantendo a ordem
+        if lotada:
+            pendentes.append(aluno_id)
+            continue
+        try:
+            alteradas = atualizar(aluno_id)
+        except Exception as e:
+            if not turma_lotada(e):
+                raise
+            lotada = True  # só a instrução foi desfeita; a transação continua
+            pendentes.append(aluno_id)
+            continue
+        (aceitos if alteradas == 1 else pendentes).append(aluno_id)
+    return aceitos, pendentes
+
+
+def _motivos(turma_id: int, pendentes: List[int], atuais: dict) -> List[dict]:
+    """Motivo de cada recusa, a partir de {aluno_id: turma_id atual}"""
+    rejeitados = []
+    for aluno_id in pendentes:
+        if aluno_id not in atuais:
+            motivo = MOTIVO_NAO_ENCONTRADO
+        elif atuais[aluno_id] == turma_id:
+            motivo = MOTIVO_MESMA_TURMA
+        elif atuais[aluno_id] is not None:
+            motivo = MOTIVO_OUTRA_TURMA
+        else:
+            motivo = MOTIVO_LOTADA
+        rejeitados.append({"aluno_id": aluno_id, "motivo": motivo})
+    return rejeitados
+
+
+def matricular_alunos(db: Session, turma_id: int, aluno_ids: List[int]) -> dict:
+    """
+    Matricula os alunos na ordem recebida enquanto houver vaga.
+    Não faz commit. Retorna {"aceitos": [...], "rejeitados": [{"aluno_id", "motivo"}], "ocupacao"}.
+    """
+    alunos = Aluno.__table__
+
+    def atualizar(aluno_id: int) -> int:
+        return db.execute(
+            update(alunos)
+            .where(alunos.c.id == aluno_id, alunos.c.turma_id.is_(None))
+            .values(turma_id=turma_id, status="ativo")
+        ).rowcount
+
+    aceitos, pendentes = _reservar(atualizar, aluno_ids)
+    atuais = {}
+    if pendentes:
+        atuais = dict(db.execute(select(alunos.c.id, alunos.c.turma_id).where(alunos.c.id.in_(pendentes))).all())
+    ocupacao = db.execute(select(Turma.ocupacao).where(Turma.id == turma_id)).scalar()
+    return {"aceitos": aceitos, "rejeitados": _motivos(turma_id, pendentes, atuais), "ocupacao": ocupacao}
+
+
+def matricular_cursor(cursor, turma_id: int, aluno_ids: List[int], marcador: str = "%s") -> dict:
+    """matricular_alunos() com um cursor DB-API (pymysql: "%s", sqlite3: "?")"""
+    sql = f"UPDATE alunos SET turma_id = {marcador}, status = 'ativo' WHERE id = {marcador} AND turma_id IS NULL"
+
+    def atualizar(aluno_id: int) -> int:
+        cursor.execute(sql, (turma_id, aluno_id))
+        return cursor.rowcount
+
+    aceitos, pendentes = _reservar(atualizar, aluno_ids)
+    atuais = {}
+    if pendentes:
+        marcadores = ", ".join([marcador] * len(pendentes))
+        cursor.execute(f"SELECT id, turma_id FROM alunos WHERE id IN ({marcadores})", pendentes)
+        atuais = dict(cursor.fetchall())
+    cursor.execute(f"SELECT ocupacao FROM turmas WHERE id = {marcador}", (turma_id,))
+    return {"aceitos": aceitos, "rejeitados": _motivos(turma_id, pendentes, atuais), "ocupacao": cursor.fetchone()[0]}
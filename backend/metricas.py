@@ -0,0 +1,359 @@
+# Métricas no formato texto do Prometheus (GET /metrics)
+# Um middleware ASGI mede cada requisição: contagem por rota e status,
+# histograma de latência, requisições em andamento e, via contextvar, quantos
+# statements SQL a requisição executou e quanto tempo passou no banco.
+# O banco é medido na camada do driver:
+# - SQLAlchemy (app.py): listeners before/after_cursor_execute no engine;
+# - DB-API (sqlite3/pymysql): ConexaoMedida envolve a conexão da requisição.
+# Pool, caches e sessões entram como "coletores" lidos só na hora do scrape.
+# O custo por requisição é alguns dicts e um lock; /metrics só responde a
+# clientes locais (ESCOLA_METRICAS_PUBLICO=1 libera).
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Match
+
+from cache import caches_registrados
+
+ATIVAS = os.getenv("ESCOLA_METRICAS", "1") == "1"
+PUBLICO = os.getenv("ESCOLA_METRICAS_PUBLICO", "0") == "1"
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_STATEMENTS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SEM_ROTA = "<sem rota>"
+HOSTS_LOCAIS = {"127.0.0.1", "::1", "localhost"}
+TIPO_CONTEUDO = "text/plain; version=0.0.4"
+
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)  # Último = +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(self.buckets, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class ContagemDB:
+    """Statements e tempo de banco da requisição atual"""
+    __slots__ = ("statements", "segundos")
+
+    def __init__(self):
+        self.statements = 0
+        self.segundos = 0.0
+
+
+_requisicao_atual = contextvars.ContextVar("metricas_db", default=None)
+
+
+def registrar_db(statements: int, segundos: float):
+    """Soma ao contador da requisição atual (sem requisição: ignora)"""
+    contagem = _requisicao_atual.get()
+    if contagem is not None:
+        contagem.statements += statements
+        contagem.segundos += segundos
+
+
+# ===== DB-API =====
+
+class CursorMedido:
+    """Cursor DB-API que mede execute/executemany; o resto é repassado"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(*args, **kwargs)
+        finally:
+            registrar_db(1, time.perf_counter() - inicio)
+
+    def executemany(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(*args, **kwargs)
+        finally:
+            registrar_db(1, time.perf_counter() - inicio)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+class ConexaoMedida:
+    """Conexão DB-API (sqlite3/pymysql) cujos statements entram nas métricas"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conn.cursor(*args, **kwargs))
+
+    def execute(self, *args, **kwargs):  # Atalho do sqlite3
+        inicio = time.perf_counter()
+        try:
+            return self._conn.execute(*args, **kwargs)
+        finally:
+            registrar_db(1, time.perf_counter() - inicio)
+
+    def executemany(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._conn.executemany(*args, **kwargs)
+        finally:
+            registrar_db(1, time.perf_counter() - inicio)
+
+    def commit(self):
+        inicio = time.perf_counter()
+        try:
+            return self._conn.commit()
+        finally:
+            registrar_db(0, time.perf_counter() - inicio)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+
+def medir_conexao(conn):
+    """Envolve a conexão se as métricas estiverem ligadas"""
+    return ConexaoMedida(conn) if ATIVAS else conn
+
+
+# ===== SQLAlchemy =====
+
+def instalar_sqlalchemy(engine):
+    """Listeners no engine (idempotente)"""
+    from sqlalchemy import event
+
+    if event.contains(engine, "before_cursor_execute", _antes_sqlalchemy):
+        return
+    event.listen(engine, "before_cursor_execute", _antes_sqlalchemy)
+    event.listen(engine, "after_cursor_execute", _depois_sqlalchemy)
+
+
+def stats_pool_sqlalchemy(engine) -> dict:
+    """Estado do pool de conexões do engine (QueuePool)"""
+    pool = engine.pool
+    stats = {}
+    for campo, metodo in (("tamanho", "size"), ("em_uso", "checkedout"), ("livres", "checkedin"), ("overflow", "overflow")):
+        if hasattr(pool, metodo):
+            stats[campo] = getattr(pool, metodo)()
+    return stats
+
+
+def _antes_sqlalchemy(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+
+def _depois_sqlalchemy(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("metricas_inicio")
+    if inicios:
+        registrar_db(1, time.perf_counter() - inicios.pop())
+
+
+# ===== REGISTRO =====
+
+class Metricas:
+    """Contadores e histogramas por (método, rota); coletores lidos no scrape"""
+
+    def __init__(self, app_nome: str):
+        self.app_nome = app_nome
+        self._lock = threading.Lock()
+        self.requisicoes = {}     # (método, rota, status) -> total
+        self.latencia = {}        # (método, rota) -> Histograma
+        self.em_andamento = {}    # (método, rota) -> gauge
+        self.statements = {}      # (método, rota) -> Histograma de statements por requisição
+        self.tempo_db = {}        # (método, rota) -> Histograma de segundos no banco
+        self.coletores = {}       # grupo -> função sem argumentos que devolve dict
+        self.iniciado_em = time.time()
+
+    def registrar_coletor(self, grupo: str, funcao: Callable[[], dict]):
+        self.coletores[grupo] = funcao
+
+    def iniciar(self, chave):
+        with self._lock:
+            self.em_andamento[chave] = self.em_andamento.get(chave, 0) + 1
+
+    def finalizar(self, chave, status: int, segundos: float, contagem: ContagemDB):
+        with self._lock:
+            self.em_andamento[chave] -= 1
+            chave_status = (*chave, str(status))
+            self.requisicoes[chave_status] = self.requisicoes.get(chave_status, 0) + 1
+            if chave not in self.latencia:
+                self.latencia[chave] = Histograma(BUCKETS_SEGUNDOS)
+                self.statements[chave] = Histograma(BUCKETS_STATEMENTS)
+                self.tempo_db[chave] = Histograma(BUCKETS_SEGUNDOS)
+            self.latencia[chave].observar(segundos)
+            self.statements[chave].observar(contagem.statements)
+            self.tempo_db[chave].observar(contagem.segundos)
+
+    # ===== EXPOSIÇÃO =====
+
+    def _rotulos(self, **rotulos) -> str:
+        pares = [f'app="{self.app_nome}"'] + [f'{k}="{_escapar(str(v))}"' for k, v in rotulos.items()]
+        return "{" + ",".join(pares) + "}"
+
+    def _histograma(self, linhas: list, nome: str, ajuda: str, dados: dict):
+        linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} histogram"]
+        for (metodo, rota), h in sorted(dados.items()):
+            acumulado = 0
+            for limite, quantidade in zip((*h.buckets, "+Inf"), h.contagens):
+                acumulado += quantidade
+                rotulos = self._rotulos(method=metodo, route=rota, le=limite)
+                linhas.append(f"{nome}_bucket{rotulos} {acumulado}")
+            rotulos = self._rotulos(method=metodo, route=rota)
+            linhas.append(f"{nome}_sum{rotulos} {h.soma:.6f}")
+            linhas.append(f"{nome}_count{rotulos} {h.total}")
+
+    def exportar(self) -> str:
+        linhas = []
+        with self._lock:
+            linhas += ["# HELP escola_http_requests_total Requisições HTTP por rota e status",
+                       "# TYPE escola_http_requests_total counter"]
+            for (metodo, rota, status), total in sorted(self.requisicoes.items()):
+                linhas.append(f"escola_http_requests_total{self._rotulos(method=metodo, route=rota, status=status)} {total}")
+            linhas += ["# HELP escola_http_requests_in_flight Requisições em andamento",
+                       "# TYPE escola_http_requests_in_flight gauge"]
+            for (metodo, rota), total in sorted(self.em_andamento.items()):
+                linhas.append(f"escola_http_requests_in_flight{self._rotulos(method=metodo, route=rota)} {total}")
+            self._histograma(linhas, "escola_http_request_duration_seconds", "Latência das requisições", self.latencia)
+            self._histograma(linhas, "escola_db_statements_per_request", "Statements SQL por requisição", self.statements)
+            self._histograma(linhas, "escola_db_time_seconds", "Tempo no banco por requisição", self.tempo_db)
+
+        linhas += ["# HELP escola_uptime_seconds Tempo desde o início do processo",
+                   "# TYPE escola_uptime_seconds gauge",
+                   f"escola_uptime_seconds{self._rotulos()} {time.time() - self.iniciado_em:.3f}"]
+        for grupo, funcao in sorted(self.coletores.items()):
+            try:
+                valores = funcao()
+            except Exception as e:
+                print(f"⚠️ Coletor de métricas '{grupo}' falhou: {e}")
+                continue
+            for campo, valor in sorted(_numericos(valores).items()):
+                nome = f"escola_{grupo}_{campo}"
+                linhas += [f"# TYPE {nome} gauge", f"{nome}{self._rotulos()} {valor}"]
+
+        stats_caches = [cache.stats() for cache in caches_registrados()]
+        for campo in ("acertos", "falhas", "invalidacoes", "taxa_acerto"):
+            nome = f"escola_cache_tabelas_{campo}"
+            linhas.append(f"# TYPE {nome} gauge")
+            for stats in stats_caches:
+                consultas = stats["acertos"] + stats["falhas"]
+                valor = (round(stats["acertos"] / consultas, 4) if consultas else 0) if campo == "taxa_acerto" else stats[campo]
+                linhas.append(f"{nome}{self._rotulos(cache=stats['nome'])} {valor}")
+        return "\n".join(linhas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numericos(valores: dict, prefixo: str = "") -> dict:
+    """Achata dicts aninhados mantendo só números (bool vira 0/1)"""
+    saida = {}
+    for chave, valor in valores.items():
+        nome = f"{prefixo}{chave}"
+        if isinstance(valor, dict):
+            saida.update(_numericos(valor, nome + "_"))
+        elif isinstance(valor, (int, float)):
+            saida["".join(c if c.isalnum() else "_" for c in nome)] = float(valor) if isinstance(valor, bool) else valor
+    return saida
+
+
+# ===== MIDDLEWARE =====
+
+class MetricasHTTP:
+    """Middleware ASGI que alimenta `metricas`; a rota é o template (/alunos/{aluno_id})"""
+
+    MAX_CAMINHOS = 4096
+
+    def __init__(self, app, metricas: Metricas, router):
+        self.app = app
+        self.metricas = metricas
+        self.router = router
+        self._rotas = {}  # (método, caminho) -> template
+
+    def _rota(self, scope) -> str:
+        chave = (scope["method"], scope["path"])
+        rota = self._rotas.get(chave)
+        if rota is None:
+            rota = SEM_ROTA
+            for candidata in self.router.routes:
+                correspondencia, _ = candidata.matches(scope)
+                if correspondencia != Match.NONE:
+                    rota = getattr(candidata, "path", SEM_ROTA)
+                    if correspondencia == Match.FULL:
+                        break
+            if len(self._rotas) >= self.MAX_CAMINHOS:
+                self._rotas.clear()
+            self._rotas[chave] = rota
+        return rota
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        chave = (scope["method"], self._rota(scope))
+        contagem = ContagemDB()
+        token = _requisicao_atual.set(contagem)
+        status = 500
+        inicio = time.perf_counter()
+        self.metricas.iniciar(chave)
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _requisicao_atual.reset(token)
+            self.metricas.finalizar(chave, status, time.perf_counter() - inicio, contagem)
+
+
+def instalar_metricas(app, app_nome: str, coletores: Optional[Dict[str, Callable[[], dict]]] = None) -> Metricas:
+    """Adiciona o middleware e GET /metrics ao app FastAPI (chamar por último entre os middlewares)"""
+    metricas = Metricas(app_nome)
+    for grupo, funcao in (coletores or {}).items():
+        metricas.registrar_coletor(grupo, funcao)
+    if not ATIVAS:
+        return metricas
+
+    async def endpoint_metricas(request: Request):
+        if not PUBLICO and (request.client is None or request.client.host not in HOSTS_LOCAIS):
+            return Response(status_code=404)
+        return PlainTextResponse(metricas.exportar(), media_type=TIPO_CONTEUDO)
+
+    app.add_route("/metrics", endpoint_metricas, methods=["GET"], include_in_schema=False)
+    app.add_middleware(MetricasHTTP, metricas=metricas, router=app.router)
+    return metricas
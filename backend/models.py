@@ -3,7 +3,7 @@ from sqlalchemy import Column, Integer, String, Date, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel, EmailStr, validator
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 import re
 
@@ -17,6 +17,7 @@ class Turma(Base):
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), unique=True, nullable=False, index=True)
     capacidade = Column(Integer, nullable=False)
+    ocupacao = Column(Integer, nullable=False, default=0, server_default="0")  # Mantida por triggers (ocupacao.py)
     
     # Relacionamento com alunos
     alunos = relationship("Aluno", back_populates="turma")
@@ -235,6 +236,26 @@ class MatriculaCreate(BaseModel):
             raise ValueError('ID da turma deve ser um número positivo')
         return v
 
+class MatriculaLoteCreate(BaseModel):
+    turma_id: int
+    aluno_ids: List[int]
+    
+    @validator('turma_id')
+    def validar_turma_id(cls, v):
+        if v <= 0:
+            raise ValueError('ID da turma deve ser um número positivo')
+        return v
+    
+    @validator('aluno_ids')
+    def validar_aluno_ids(cls, v):
+        if not v:
+            raise ValueError('Informe pelo menos um aluno')
+        if len(v) > 500:
+            raise ValueError('Máximo de 500 alunos por lote')
+        if any(aluno_id <= 0 for aluno_id in v):
+            raise ValueError('IDs de alunos devem ser números positivos')
+        return v
+
 class MatriculaResponse(BaseModel):
     aluno_id: int
     aluno_nome: str
@@ -0,0 +1,163 @@
+# Ocupação materializada das turmas
+# turmas.ocupacao guarda quantos alunos estão na turma e é mantida por
+# triggers em alunos (INSERT/UPDATE/DELETE), na mesma transação da alteração.
+# Checagens de capacidade e listagens leem uma linha em vez de COUNT(*), e os
+# triggers recusam qualquer escrita que ultrapasse turmas.capacidade.
+#
+# Uso: python ocupacao.py [--corrigir]   (verifica o banco configurado em database.py)
+import sys
+
+# Erro levantado pelos triggers quando a turma já está cheia
+ERRO_TURMA_LOTADA = "turma_lotada"
+
+# O incremento é condicional (ocupacao < capacidade): se não houver vaga a
+# instrução que alterou alunos é abortada, então a capacidade nunca é excedida
+SQL_TRIGGERS_SQLITE = [
+    "DROP TRIGGER IF EXISTS turmas_ocupacao_ai",
+    f"""CREATE TRIGGER turmas_ocupacao_ai AFTER INSERT ON alunos
+    WHEN new.turma_id IS NOT NULL BEGIN
+        UPDATE turmas SET ocupacao = ocupacao + 1 WHERE id = new.turma_id AND ocupacao < capacidade;
+        SELECT RAISE(ABORT, '{ERRO_TURMA_LOTADA}')
+        WHERE changes() = 0 AND EXISTS (SELECT 1 FROM turmas WHERE id = new.turma_id);
+    END""",
+    "DROP TRIGGER IF EXISTS turmas_ocupacao_ad",
+    """CREATE TRIGGER turmas_ocupacao_ad AFTER DELETE ON alunos
+    WHEN old.turma_id IS NOT NULL BEGIN
+        UPDATE turmas SET ocupacao = ocupacao - 1 WHERE id = old.turma_id;
+    END""",
+    "DROP TRIGGER IF EXISTS turmas_ocupacao_au",
+    f"""CREATE TRIGGER turmas_ocupacao_au AFTER UPDATE OF turma_id ON alunos
+    WHEN old.turma_id IS NOT new.turma_id BEGIN
+        UPDATE turmas SET ocupacao = ocupacao - 1 WHERE id = old.turma_id;
+        UPDATE turmas SET ocupacao = ocupacao + 1 WHERE id = new.turma_id AND ocupacao < capacidade;
+        SELECT RAISE(ABORT, '{ERRO_TURMA_LOTADA}')
+        WHERE new.turma_id IS NOT NULL AND changes() = 0
+          AND EXISTS (SELECT 1 FROM turmas WHERE id = new.turma_id);
+    END""",
+]
+
+# MySQL < 8.0.29 não tem CREATE TRIGGER IF NOT EXISTS: recria sempre
+SQL_TRIGGERS_MYSQL = [
+    "DROP TRIGGER IF EXISTS turmas_ocupacao_ai",
+    f"""CREATE TRIGGER turmas_ocupacao_ai AFTER INSERT ON alunos FOR EACH ROW
+    BEGIN
+        IF NEW.turma_id IS NOT NULL THEN
+            UPDATE turmas SET ocupacao = ocupacao + 1 WHERE id = NEW.turma_id AND ocupacao < capacidade;
+            IF ROW_COUNT() = 0 THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = '{ERRO_TURMA_LOTADA}';
+            END IF;
+        END IF;
+    END""",
+    "DROP TRIGGER IF EXISTS turmas_ocupacao_ad",
+    """CREATE TRIGGER turmas_ocupacao_ad AFTER DELETE ON alunos FOR EACH ROW
+    BEGIN
+        IF OLD.turma_id IS NOT NULL THEN
+            UPDATE turmas SET ocupacao = ocupacao - 1 WHERE id = OLD.turma_id;
+        END IF;
+    END""",
+    "DROP TRIGGER IF EXISTS turmas_ocupacao_au",
+    f"""CREATE TRIGGER turmas_ocupacao_au AFTER UPDATE ON alunos FOR EACH ROW
+    BEGIN
+        IF NOT (OLD.turma_id <=> NEW.turma_id) THEN
+            IF OLD.turma_id IS NOT NULL THEN
+                UPDATE turmas SET ocupacao = ocupacao - 1 WHERE id = OLD.turma_id;
+            END IF;
+            IF NEW.turma_id IS NOT NULL THEN
+                UPDATE turmas SET ocupacao = ocupacao + 1 WHERE id = NEW.turma_id AND ocupacao < capacidade;
+                IF ROW_COUNT() = 0 THEN
+                    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = '{ERRO_TURMA_LOTADA}';
+                END IF;
+            END IF;
+        END IF;
+    END""",
+]
+
+SQL_BACKFILL = """
+    UPDATE turmas SET ocupacao = (
+        SELECT COUNT(*) FROM alunos WHERE alunos.turma_id = turmas.id
+    )
+"""
+
+SQL_DIVERGENCIAS = """
+    SELECT t.id, t.nome, t.ocupacao, COUNT(a.id) AS total_alunos
+    FROM turmas t
+    LEFT JOIN alunos a ON a.turma_id = t.id
+    GROUP BY t.id, t.nome, t.ocupacao
+    HAVING t.ocupacao <> COUNT(a.id)
+"""
+
+
+def _possui_coluna(cursor, dialeto: str) -> bool:
+    if dialeto == "sqlite":
+        cursor.execute("PRAGMA table_info(turmas)")
+        return any(coluna[1] == "ocupacao" for coluna in cursor.fetchall())
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = 'turmas' AND column_name = 'ocupacao'"
+    )
+    return cursor.fetchone() is not None
+
+
+def instalar_ocupacao(conn, dialeto: str = "sqlite") -> bool:
+    """
+    Cria a coluna turmas.ocupacao e (re)cria os triggers (idempotente).
+    Na primeira instalação preenche a coluna a partir de alunos.
+    Retorna True se houve backfill.
+    """
+    cursor = conn.cursor()
+    try:
+        nova = not _possui_coluna(cursor, dialeto)
+        if nova:
+            cursor.execute("ALTER TABLE turmas ADD COLUMN ocupacao INTEGER NOT NULL DEFAULT 0")
+        for sql in (SQL_TRIGGERS_SQLITE if dialeto == "sqlite" else SQL_TRIGGERS_MYSQL):
+            cursor.execute(sql)
+        if nova:
+            cursor.execute(SQL_BACKFILL)
+        conn.commit()
+        return nova
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def verificar_ocupacao(conn, corrigir: bool = False) -> list:
+    """
+    Compara turmas.ocupacao com COUNT(*) de alunos.
+    Retorna as divergências [{turma_id, nome, ocupacao, alunos}]; com
+    corrigir=True recalcula todas as turmas.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SQL_DIVERGENCIAS)
+        divergencias = [
+            {"turma_id": linha[0], "nome": linha[1], "ocupacao": linha[2], "alunos": linha[3]}
+            for linha in cursor.fetchall()
+        ]
+        if divergencias and corrigir:
+            cursor.execute(SQL_BACKFILL)
+            conn.commit()
+        return divergencias
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    corrigir = "--corrigir" in sys.argv
+    conn = engine.raw_connection()
+    try:
+        instalar_ocupacao(conn, engine.dialect.name)
+        divergencias = verificar_ocupacao(conn, corrigir)
+    finally:
+        conn.close()
+
+    if not divergencias:
+        print("✅ Ocupação das turmas consistente")
+    for d in divergencias:
+        print(f"❌ Turma {d['turma_id']} ({d['nome']}): ocupacao={d['ocupacao']}, alunos={d['alunos']}")
+    if divergencias:
+        print("🔧 Ocupação recalculada" if corrigir else "💡 Use --corrigir para recalcular")
+        sys.exit(0 if corrigir else 1)
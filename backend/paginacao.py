@@ -0,0 +1,116 @@
+# Paginação por cursor (keyset) e seleção de campos para os endpoints de listagem
+# O cursor guarda os valores das chaves de ordenação do último item da página;
+# a próxima página começa com "(chaves) > (cursor)", sem OFFSET.
+import base64
+import json
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from serializacao import linhas_para_dicts
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 500
+
+
+def codificar_cursor(valores: list) -> str:
+    """Serializa as chaves de ordenação em um token opaco para a URL"""
+    bruto = json.dumps(valores, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, quantidade: int) -> list:
+    """Lê o token gerado por codificar_cursor; 400 se estiver corrompido"""
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return valores
+
+
+def selecionar_campos(fields: Optional[str], permitidos: List[str], obrigatorios=("id",)) -> List[str]:
+    """Interpreta fields=nome,email mantendo a ordem original das colunas"""
+    if not fields:
+        return list(permitidos)
+    pedidos = {campo.strip() for campo in fields.split(",") if campo.strip()}
+    invalidos = pedidos - set(permitidos)
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos inválidos: {', '.join(sorted(invalidos))}. Permitidos: {', '.join(permitidos)}"
+        )
+    pedidos.update(obrigatorios)
+    return [campo for campo in permitidos if campo in pedidos]
+
+
+class Paginacao:
+    """
+    Monta SELECTs paginados para uma listagem.
+    colunas: campo de saída -> expressão SQL
+    ordem: campos de ordenação; o último precisa ser único (ex.: id)
+    """
+
+    def __init__(self, colunas: dict, ordem: List[str], decrescente: bool = False, placeholder: str = "?"):
+        self.colunas = colunas
+        self.ordem = ordem
+        self.decrescente = decrescente
+        self.placeholder = placeholder
+
+    def consulta(self, from_sql: str, where: list = None, params: list = None,
+                 fields: Optional[str] = None, limit: Optional[int] = None, after: Optional[str] = None,
+                 relevancia: Optional[str] = None, params_relevancia: list = None):
+        """
+        Retorna (sql, params, campos_de_saida)
+        relevancia: expressão ORDER BY aplicada antes das chaves quando não há
+        paginação (ex.: ranking da busca textual); o cursor só conhece as chaves.
+        """
+        campos = selecionar_campos(fields, list(self.colunas))
+        where = list(where or [])
+        params = list(params or [])
+
+        select = [f"{self.colunas[c]} AS {c}" for c in campos]
+        # Chaves de ordenação vão no fim da linha para montar o próximo cursor
+        select += [f"{self.colunas[c]} AS _chave{i}" for i, c in enumerate(self.ordem)]
+        chaves = ", ".join(self.colunas[c] for c in self.ordem)
+
+        if after:
+            valores = decodificar_cursor(after, len(self.ordem))
+            operador = "<" if self.decrescente else ">"
+            marcadores = ", ".join([self.placeholder] * len(valores))
+            where.append(f"({chaves}) {operador} ({marcadores})")
+            params.extend(valores)
+
+        sql = f"SELECT {', '.join(select)} {from_sql}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        direcao = " DESC" if self.decrescente else ""
+        ordenacao = [self.colunas[c] + direcao for c in self.ordem]
+        paginado = limit is not None or bool(after)
+        if relevancia and not paginado:
+            ordenacao.insert(0, relevancia)
+            params.extend(params_relevancia or [])
+        sql += " ORDER BY " + ", ".join(ordenacao)
+
+        if paginado:
+            # Um item a mais indica se existe próxima página
+            sql += f" LIMIT {int(limit or LIMITE_PADRAO) + 1}"
+        return sql, params, campos
+
+    def resposta(self, linhas, campos: List[str], limit: Optional[int] = None, after: Optional[str] = None):
+        """
+        Sem limit/after: lista simples, como antes da paginação.
+        Com limit/after: {"items": [...], "next_cursor": "..." ou None}
+        """
+        if limit is None and not after:
+            return linhas_para_dicts(linhas, campos)
+
+        limite = int(limit or LIMITE_PADRAO)
+        itens = linhas_para_dicts(linhas[:limite], campos)
+        proximo = None
+        if len(linhas) > limite:
+            ultima = linhas[limite - 1]
+            proximo = codificar_cursor([ultima[len(campos) + i] for i in range(len(self.ordem))])
+        return {"items": itens, "next_cursor": proximo}
@@ -0,0 +1,322 @@
+# Perfil de SQL por requisição e log de queries lentas (opt-in: ESCOLA_PERFIL_SQL=1)
+# Cada statement executado na requisição é registrado com o formato dos
+# parâmetros (nunca os valores), a duração (execute + fetch) e as linhas
+# devolvidas/afetadas. A resposta ganha os cabeçalhos X-Query-Count e
+# X-DB-Time (ms). Statements acima de ESCOLA_SQL_LENTA_MS vão para o log de
+# queries lentas com o plano (EXPLAIN QUERY PLAN no SQLite, EXPLAIN no MySQL),
+# e o mesmo SQL repetido muitas vezes na requisição é denunciado como N+1.
+# Instrumenta tanto conexões DB-API (sqlite3/pymysql) quanto engines SQLAlchemy.
+import contextvars
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+ATIVO = os.getenv("ESCOLA_PERFIL_SQL", "0") == "1"
+LIMITE_LENTA_MS = float(os.getenv("ESCOLA_SQL_LENTA_MS", "100"))
+ARQUIVO_LENTAS = os.getenv("ESCOLA_SQL_LENTA_ARQUIVO")  # Além do console, se definido
+LIMITE_REPETICOES = int(os.getenv("ESCOLA_PERFIL_SQL_REPETICOES", "10"))  # Mesmo SQL N vezes = N+1
+
+_ESPACOS = re.compile(r"\s+")
+_COM_LINHAS = ("SELECT", "WITH", "PRAGMA", "EXPLAIN")
+_COM_PLANO = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def _compactar(sql: str) -> str:
+    return _ESPACOS.sub(" ", sql).strip()
+
+
+def formato_parametros(parametros, varios: bool = False) -> str:
+    """Descreve os parâmetros sem expor valores: '3 posicionais', 'nomeados: a, b'"""
+    if varios:
+        quantidade = len(parametros) if hasattr(parametros, "__len__") else "?"
+        return f"executemany ({quantidade} linhas)"
+    if not parametros:
+        return "sem parâmetros"
+    if isinstance(parametros, dict):
+        return "nomeados: " + ", ".join(sorted(map(str, parametros)))
+    return f"{len(parametros)} posicionais"
+
+
+class Statement:
+    __slots__ = ("sql", "parametros", "duracao", "linhas", "devolve_linhas", "explicado", "plano")
+
+    def __init__(self, sql: str, parametros: str):
+        self.sql = _compactar(sql)
+        self.parametros = parametros
+        self.duracao = 0.0
+        self.linhas = None
+        self.devolve_linhas = self.sql[:8].upper().startswith(_COM_LINHAS)
+        self.explicado = False
+        self.plano = None
+
+    def como_dict(self) -> dict:
+        return {"sql": self.sql, "parametros": self.parametros, "duracao_ms": round(self.duracao * 1000, 3),
+                "linhas": self.linhas, "plano": self.plano}
+
+
+class PerfilRequisicao:
+    """Statements da requisição atual"""
+
+    def __init__(self, descricao: str):
+        self.descricao = descricao
+        self.statements = []
+
+    @property
+    def tempo_db(self) -> float:
+        return sum(s.duracao for s in self.statements)
+
+    def repetidos(self, limite: int = LIMITE_REPETICOES) -> list:
+        """[(sql, vezes)] dos statements executados `limite` vezes ou mais"""
+        contagem = Counter(s.sql for s in self.statements)
+        return [(sql, vezes) for sql, vezes in contagem.most_common() if vezes >= limite]
+
+
+_perfil_atual = contextvars.ContextVar("perfil_sql", default=None)
+
+
+def perfil_atual() -> Optional[PerfilRequisicao]:
+    return _perfil_atual.get()
+
+
+# ===== PLANO E LOG =====
+
+def _explicar(conn_dbapi, dialeto: str, sql: str, parametros) -> list:
+    """Plano do statement na mesma conexão (linhas de texto)"""
+    prefixo = "EXPLAIN QUERY PLAN " if dialeto == "sqlite" else "EXPLAIN "
+    cursor = conn_dbapi.cursor()
+    try:
+        cursor.execute(prefixo + sql, parametros or ())
+        return [" | ".join(str(coluna) for coluna in linha) for linha in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _registrar_lenta(statement: Statement, perfil: Optional[PerfilRequisicao]):
+    origem = perfil.descricao if perfil else "fora de requisição"
+    contadas = f", linhas={statement.linhas}" if statement.linhas is not None else ""
+    linhas = [f"🐢 SQL lenta ({statement.duracao * 1000:.1f} ms, {origem}, {statement.parametros}{contadas}): "
+              f"{statement.sql}"]
+    linhas += [f"     plano: {linha}" for linha in statement.plano or []]
+    print("\n".join(linhas))
+    if ARQUIVO_LENTAS:
+        try:
+            with open(ARQUIVO_LENTAS, "a", encoding="utf-8") as arquivo:
+                arquivo.write(f"{datetime.now().isoformat(timespec='seconds')} " + "\n".join(linhas) + "\n")
+        except OSError as e:
+            print(f"⚠️ Não foi possível gravar o log de queries lentas: {e}")
+
+
+def _verificar_lenta(statement: Statement, conn_dbapi, dialeto: str, sql: str, parametros):
+    if statement.explicado or statement.duracao * 1000 < LIMITE_LENTA_MS:
+        return
+    statement.explicado = True
+    if statement.sql[:8].upper().startswith(_COM_PLANO) and conn_dbapi is not None:
+        try:
+            statement.plano = _explicar(conn_dbapi, dialeto, sql, parametros)
+        except Exception as e:
+            statement.plano = [f"(EXPLAIN falhou: {e})"]
+    _registrar_lenta(statement, perfil_atual())
+
+
+# ===== DB-API (sqlite3 / pymysql) =====
+
+def _dialeto(conn) -> str:
+    return "sqlite" if type(conn).__module__.startswith("sqlite3") else "mysql"
+
+
+def _bruta(conn):
+    """Conexão do driver por baixo de proxies (ex.: metricas.ConexaoMedida)"""
+    while hasattr(conn, "_conn"):
+        conn = conn._conn
+    return conn
+
+
+class CursorPerfilado:
+    """Cursor que registra execute/executemany e conta as linhas lidas"""
+
+    def __init__(self, cursor, conexao: "ConexaoPerfilada"):
+        self._cursor = cursor
+        self._conexao = conexao
+        self._statement = None
+        self._sql = None
+        self._parametros = None
+
+    def _executar(self, metodo, sql, parametros, varios: bool):
+        perfil = perfil_atual()
+        statement = Statement(sql, formato_parametros(parametros, varios))
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(sql, parametros) if parametros is not None else metodo(sql)
+        finally:
+            statement.duracao = time.perf_counter() - inicio
+            if perfil is not None:
+                perfil.statements.append(statement)
+        rowcount = getattr(self._cursor, "rowcount", -1)
+        if not statement.devolve_linhas:
+            statement.linhas = rowcount
+        elif rowcount is not None and rowcount >= 0 and self._conexao.dialeto == "mysql":
+            statement.linhas = rowcount  # pymysql já traz o resultado inteiro no execute
+        self._statement, self._sql, self._parametros = statement, sql, parametros
+        if not varios and not (statement.devolve_linhas and self._conexao.dialeto == "sqlite"):
+            self._verificar()  # SELECT no sqlite3: verifica depois do fetch, com as linhas contadas
+        return self if resultado is self._cursor or resultado is getattr(self._cursor, "_cursor", None) else resultado
+
+    def _verificar(self):
+        _verificar_lenta(self._statement, self._conexao.bruta, self._conexao.dialeto, self._sql, self._parametros)
+
+    def _lidas(self, inicio: float, quantidade: int):
+        statement = self._statement
+        if statement is None:
+            return
+        statement.duracao += time.perf_counter() - inicio
+        if statement.devolve_linhas and self._conexao.dialeto == "sqlite":
+            statement.linhas = (statement.linhas or 0) + quantidade
+        self._verificar()
+
+    def execute(self, sql, parametros=None):
+        return self._executar(self._cursor.execute, sql, parametros, False)
+
+    def executemany(self, sql, parametros):
+        return self._executar(self._cursor.executemany, sql, parametros, True)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        linha = self._cursor.fetchone()
+        self._lidas(inicio, 0 if linha is None else 1)
+        return linha
+
+    def fetchmany(self, *args):
+        inicio = time.perf_counter()
+        linhas = self._cursor.fetchmany(*args)
+        self._lidas(inicio, len(linhas))
+        return linhas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        linhas = self._cursor.fetchall()
+        self._lidas(inicio, len(linhas))
+        return linhas
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+class ConexaoPerfilada:
+    """Conexão DB-API cujos statements entram no perfil da requisição"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.bruta = _bruta(conn)
+        self.dialeto = _dialeto(self.bruta)
+
+    def cursor(self, *args, **kwargs):
+        return CursorPerfilado(self._conn.cursor(*args, **kwargs), self)
+
+    def execute(self, sql, parametros=None):  # Atalho do sqlite3: cursor novo
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+
+def perfilar_conexao(conn):
+    """Envolve a conexão quando o perfil está ligado (senão devolve a própria)"""
+    return ConexaoPerfilada(conn) if ATIVO else conn
+
+
+# ===== SQLAlchemy =====
+
+def instalar_perfil_sqlalchemy(engine):
+    """Listeners no engine (idempotente; só com o perfil ligado)"""
+    from sqlalchemy import event
+
+    if not ATIVO or event.contains(engine, "before_cursor_execute", _antes_sqlalchemy):
+        return
+    event.listen(engine, "before_cursor_execute", _antes_sqlalchemy)
+    event.listen(engine, "after_cursor_execute", _depois_sqlalchemy)
+
+
+def _antes_sqlalchemy(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("perfil_inicio", []).append(time.perf_counter())
+
+
+def _depois_sqlalchemy(conn, cursor, sql, parameters, context, executemany):
+    inicios = conn.info.get("perfil_inicio")
+    if not inicios:
+        return
+    statement = Statement(sql, formato_parametros(parameters, executemany))
+    statement.duracao = time.perf_counter() - inicios.pop()
+    rowcount = getattr(cursor, "rowcount", -1)
+    statement.linhas = rowcount if rowcount is not None and rowcount >= 0 else None
+    perfil = perfil_atual()
+    if perfil is not None:
+        perfil.statements.append(statement)
+    if not executemany:
+        _verificar_lenta(statement, cursor.connection, conn.dialect.name, sql, parameters)
+
+
+# ===== MIDDLEWARE =====
+
+class PerfilSQL:
+    """
+    Middleware ASGI: um PerfilRequisicao por requisição, cabeçalhos
+    X-Query-Count / X-DB-Time e aviso de SQL repetido (N+1).
+    Deve ficar fora de caches de resposta, para não guardar os cabeçalhos.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        perfil = PerfilRequisicao(f"{scope['method']} {scope['path']}")
+        token = _perfil_atual.set(perfil)
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                headers = list(mensagem.get("headers", []))
+                headers += [(b"x-query-count", str(len(perfil.statements)).encode()),
+                            (b"x-db-time", f"{perfil.tempo_db * 1000:.3f}".encode())]
+                mensagem = {**mensagem, "headers": headers}
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _perfil_atual.reset(token)
+            for sql, vezes in perfil.repetidos():
+                print(f"⚠️ {perfil.descricao}: mesmo SQL executado {vezes}x (possível N+1): {sql[:200]}")
+
+
+def instalar_perfil(app) -> bool:
+    """Adiciona o middleware se ESCOLA_PERFIL_SQL=1 (adicionar depois dos caches de resposta)"""
+    if ATIVO:
+        app.add_middleware(PerfilSQL)
+        print(f"🔍 Perfil de SQL ligado (queries lentas acima de {LIMITE_LENTA_MS:.0f} ms)")
+    return ATIVO
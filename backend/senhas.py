@@ -0,0 +1,106 @@
+# Hash de senhas com KDF (scrypt ou PBKDF2 do hashlib)
+# Formato gravado em usuarios.senha_hash:
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>      pbkdf2_sha256$<iteracoes>$<salt>$<hash>
+# Senhas antigas (SHA-256 sem salt, 64 caracteres hex) continuam válidas e
+# são regravadas no formato atual no próximo login bem-sucedido; o mesmo vale
+# quando o custo configurado muda.
+# O cálculo é caro de propósito: nos endpoints async ele roda em um pool de
+# threads limitado (hashlib libera o GIL), sem travar o event loop.
+import base64
+import hashlib
+import hmac
+import os
+import re
+
+from db_async import DBExecutor
+
+ALGORITMO = os.getenv("ESCOLA_HASH_ALGORITMO", "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256")
+SCRYPT_N = int(os.getenv("ESCOLA_SCRYPT_N", str(2 ** 14)))  # Custo de CPU/memória (potência de 2)
+SCRYPT_R = int(os.getenv("ESCOLA_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("ESCOLA_SCRYPT_P", "1"))
+PBKDF2_ITERACOES = int(os.getenv("ESCOLA_PBKDF2_ITERACOES", "600000"))
+HASH_WORKERS = int(os.getenv("ESCOLA_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+TAMANHO_SALT = 16
+TAMANHO_HASH = 32
+
+_SHA256_LEGADO = re.compile(r"^[0-9a-f]{64}$")
+
+# Pool exclusivo para os hashes: logins simultâneos não ocupam as threads do banco
+executor_senhas = DBExecutor(max_workers=HASH_WORKERS, nome="senhas")
+
+
+def _b64(dados: bytes) -> str:
+    return base64.b64encode(dados).decode().rstrip("=")
+
+
+def _de_b64(texto: str) -> bytes:
+    return base64.b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _scrypt(senha: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(senha.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=TAMANHO_HASH)
+
+
+def _pbkdf2(senha: str, salt: bytes, iteracoes: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", senha.encode(), salt, iteracoes, dklen=TAMANHO_HASH)
+
+
+def gerar_hash(senha: str) -> str:
+    """Hash no formato e custo configurados (com salt aleatório)"""
+    salt = os.urandom(TAMANHO_SALT)
+    if ALGORITMO == "scrypt":
+        calculado = _scrypt(senha, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(calculado)}"
+    calculado = _pbkdf2(senha, salt, PBKDF2_ITERACOES)
+    return f"pbkdf2_sha256${PBKDF2_ITERACOES}${_b64(salt)}${_b64(calculado)}"
+
+
+def verificar(senha: str, armazenado: str) -> bool:
+    """Confere a senha com qualquer formato suportado (inclusive o SHA-256 antigo)"""
+    if not armazenado:
+        return False
+    if _SHA256_LEGADO.match(armazenado):
+        return hmac.compare_digest(hashlib.sha256(senha.encode()).hexdigest(), armazenado)
+
+    partes = armazenado.split("$")
+    try:
+        if partes[0] == "scrypt" and len(partes) == 6:
+            n, r, p = int(partes[1]), int(partes[2]), int(partes[3])
+            calculado = _scrypt(senha, _de_b64(partes[4]), n, r, p)
+            return hmac.compare_digest(calculado, _de_b64(partes[5]))
+        if partes[0] == "pbkdf2_sha256" and len(partes) == 4:
+            calculado = _pbkdf2(senha, _de_b64(partes[2]), int(partes[1]))
+            return hmac.compare_digest(calculado, _de_b64(partes[3]))
+    except ValueError:
+        pass
+    return False
+
+
+def precisa_rehash(armazenado: str) -> bool:
+    """True se o hash está em formato antigo ou com custo diferente do configurado"""
+    if ALGORITMO == "scrypt":
+        atual = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$"
+    else:
+        atual = f"pbkdf2_sha256${PBKDF2_ITERACOES}$"
+    return not armazenado.startswith(atual)
+
+
+def _verificar_e_atualizar(senha: str, armazenado: str):
+    if not verificar(senha, armazenado):
+        return False, None
+    return True, gerar_hash(senha) if precisa_rehash(armazenado) else None
+
+
+async def hash_senha(senha: str) -> str:
+    """gerar_hash() fora do event loop"""
+    return await executor_senhas.run(gerar_hash, senha)
+
+
+async def verificar_senha(senha: str, armazenado: str):
+    """
+    Confere a senha fora do event loop. Retorna (ok, novo_hash); novo_hash
+    vem preenchido quando o hash armazenado deve ser regravado.
+    """
+    return await executor_senhas.run(_verificar_e_atualizar, senha, armazenado)
@@ -0,0 +1,70 @@
+# Serialização rápida das listagens (opt-in: ESCOLA_JSON_RAPIDO=1)
+# No caminho padrão do FastAPI, a lista de dicts devolvida pelo endpoint passa
+# pelo response_model (validação item a item), pelo jsonable_encoder e só então
+# pelo json da stdlib. Para linhas que vêm direto do banco esse trabalho é
+# repetido: no modo rápido o endpoint devolve uma Response já pronta (o FastAPI
+# não revalida Responses) e o corpo é gerado pelo orjson, quando instalado.
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Iterable, List, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Opcional: sem ele o modo rápido usa o json da stdlib
+    orjson = None
+
+JSON_RAPIDO = os.getenv("ESCOLA_JSON_RAPIDO", "0") == "1"
+
+
+def _converter(valor):
+    """Tipos que vêm do driver e o encoder não conhece (mesma saída do jsonable_encoder)"""
+    if isinstance(valor, Decimal):
+        return int(valor) if valor == valor.to_integral_value() else float(valor)
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, bytes):
+        return valor.decode()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def serializar(dados) -> bytes:
+    """JSON compacto em UTF-8 (orjson se disponível)"""
+    if orjson is not None:
+        return orjson.dumps(dados, default=_converter)
+    return json.dumps(dados, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_converter).encode("utf-8")
+
+
+class RespostaJSONRapida(JSONResponse):
+    """JSONResponse que serializa com serializar()"""
+
+    def render(self, content) -> bytes:
+        return serializar(content)
+
+
+def linhas_para_dicts(linhas: Iterable, campos: List[str]) -> list:
+    """
+    Linha do banco (tupla ou sqlite3.Row) -> dict de saída, na ordem de campos.
+    Colunas além de campos (ex.: chaves do cursor) são ignoradas pelo zip.
+    """
+    return [dict(zip(campos, linha)) for linha in linhas]
+
+
+def responder_lista(dados, response: Optional[Response] = None):
+    """
+    Modo rápido: Response pronta, mantendo os cabeçalhos definidos pelas
+    dependencies (ETag, Cache-Control). Sem ele devolve os dados como estão.
+    """
+    if not JSON_RAPIDO:
+        return dados
+    resposta = RespostaJSONRapida(dados)
+    if response is not None:
+        for chave, valor in response.headers.items():
+            if chave != "content-length":
+                resposta.headers[chave] = valor
+    return resposta
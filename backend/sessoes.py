@@ -0,0 +1,192 @@
+# Registro de sessões de login (app_sqlite.py)
+# Cada login grava uma linha em "sessoes" e o JWT carrega o id da sessão (sid).
+# A tabela é a fonte da verdade; em memória fica só um índice das sessões
+# ativas, carregado no startup, para que a checagem de revogação em cada
+# requisição seja uma consulta a dicionário, sem ida ao banco.
+# O índice só muda depois do commit (incluir/remover, chamados pelo endpoint):
+# uma transação desfeita não deixa sessão fantasma nem revogação que não houve.
+# O índice é por processo. Com vários workers, uma sessão criada em outro
+# worker não está no índice: buscar() confere no banco na primeira vez e a
+# inclui (sids recusados ficam num cache de negativas). Logouts feitos em outro
+# worker chegam por sincronizar(), chamado pela leitura periódica das versões
+# (ESCOLA_VERSOES_INTERVALO): até lá o token continua valendo neste worker.
+import heapq
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+SQL_TABELA_SESSOES = """
+CREATE TABLE IF NOT EXISTS sessoes (
+    id VARCHAR(32) PRIMARY KEY,
+    usuario_id INTEGER NOT NULL,
+    criada_em REAL NOT NULL,
+    expira_em REAL NOT NULL,
+    revogada_em REAL NULL,
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+)
+"""
+SQL_INDICE_SESSOES = "CREATE INDEX IF NOT EXISTS idx_sessoes_usuario ON sessoes(usuario_id)"
+SQL_INDICE_REVOGACAO = "CREATE INDEX IF NOT EXISTS idx_sessoes_revogada ON sessoes(revogada_em)"
+
+DIAS_HISTORICO = 30  # Sessões encerradas há mais tempo são apagadas no startup
+MAX_RECUSADAS = 10000  # sids inexistentes/encerrados lembrados para não ir ao banco de novo
+MARGEM_SINCRONIZAR = 30.0  # s: revogação gravada com um horário e commitada depois
+
+
+class RegistroSessoes:
+    """Índice em memória das sessões ativas: sid -> (usuario_id, criada_em, expira_em)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ativas = {}
+        self._por_usuario = {}
+        self._expiracoes = []  # heap (expira_em, sid) para despejo por TTL
+        self._recusadas = OrderedDict()  # sid -> None, LRU
+        self._sincronizado_ate = time.time()
+
+    # ===== ÍNDICE =====
+
+    def _adicionar(self, sid: str, usuario_id: int, criada_em: float, expira_em: float):
+        self._ativas[sid] = (usuario_id, criada_em, expira_em)
+        self._por_usuario.setdefault(usuario_id, set()).add(sid)
+        heapq.heappush(self._expiracoes, (expira_em, sid))
+
+    def _remover(self, sid: str):
+        sessao = self._ativas.pop(sid, None)
+        if sessao is not None:
+            sids = self._por_usuario.get(sessao[0])
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._por_usuario[sessao[0]]
+
+    def _despejar_expiradas(self, agora: float):
+        while self._expiracoes and self._expiracoes[0][0] <= agora:
+            _, sid = heapq.heappop(self._expiracoes)
+            self._remover(sid)
+
+    def incluir(self, sid: str, usuario_id: int, criada_em: float, expira_em: float):
+        """Inclui no índice uma sessão gravada por criar() (chamar após o commit)"""
+        with self._lock:
+            self._despejar_expiradas(time.time())
+            self._adicionar(sid, usuario_id, criada_em, expira_em)
+
+    def remover(self, sids: Iterable[str]):
+        """Tira do índice sessões revogadas no banco (chamar após o commit)"""
+        with self._lock:
+            for sid in sids:
+                self._remover(sid)
+                self._recusar(sid)
+
+    def _recusar(self, sid: str):
+        self._recusadas[sid] = None
+        self._recusadas.move_to_end(sid)
+        if len(self._recusadas) > MAX_RECUSADAS:
+            self._recusadas.popitem(last=False)
+
+    def recusada(self, sid: Optional[str]) -> bool:
+        """sid já conferido no banco e encerrado (ou inexistente)"""
+        return not sid or sid in self._recusadas
+
+    def ativa(self, sid: Optional[str]) -> bool:
+        """Sessão existe, não foi revogada e não expirou (O(1), sem banco)"""
+        sessao = self._ativas.get(sid) if sid else None
+        return sessao is not None and sessao[2] > time.time()
+
+    def criada_em(self, sid: str) -> Optional[float]:
+        sessao = self._ativas.get(sid)
+        return sessao[1] if sessao else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._despejar_expiradas(time.time())
+            return {"sessoes_ativas": len(self._ativas), "usuarios_conectados": len(self._por_usuario)}
+
+    # ===== BANCO (conexão DB-API; commit fica com quem chama) =====
+
+    def carregar(self, conn):
+        """Cria a tabela, apaga o histórico antigo e monta o índice com as sessões ativas"""
+        agora = time.time()
+        conn.execute(SQL_TABELA_SESSOES)
+        conn.execute(SQL_INDICE_SESSOES)
+        conn.execute(SQL_INDICE_REVOGACAO)
+        conn.execute(
+            "DELETE FROM sessoes WHERE expira_em < ? OR revogada_em < ?",
+            (agora - DIAS_HISTORICO * 86400, agora - DIAS_HISTORICO * 86400)
+        )
+        linhas = conn.execute(
+            "SELECT id, usuario_id, criada_em, expira_em FROM sessoes WHERE revogada_em IS NULL AND expira_em > ?",
+            (agora,)
+        ).fetchall()
+        with self._lock:
+            self._ativas.clear()
+            self._por_usuario.clear()
+            self._expiracoes = []
+            self._recusadas.clear()
+            self._sincronizado_ate = agora
+            for sid, usuario_id, criada_em, expira_em in linhas:
+                self._adicionar(sid, usuario_id, criada_em, expira_em)
+
+    def buscar(self, conn, sid: str) -> bool:
+        """Sessão fora do índice (criada em outro worker): confere no banco e guarda o resultado"""
+        linha = conn.execute(
+            "SELECT usuario_id, criada_em, expira_em FROM sessoes WHERE id = ? AND revogada_em IS NULL", (sid,)
+        ).fetchone()
+        if linha is not None and linha[2] > time.time():
+            self.incluir(sid, *linha)
+            return True
+        with self._lock:
+            self._recusar(sid)
+        return False
+
+    def sincronizar(self, conn) -> int:
+        """Tira do índice as sessões revogadas por outros workers desde a última chamada"""
+        agora = time.time()
+        linhas = conn.execute(
+            "SELECT id FROM sessoes WHERE revogada_em > ?", (self._sincronizado_ate - MARGEM_SINCRONIZAR,)
+        ).fetchall()
+        self._sincronizado_ate = agora
+        revogadas = [sid for sid, in linhas if sid in self._ativas]
+        if revogadas:
+            self.remover(revogadas)
+        return len(revogadas)
+
+    def contar(self, conn, usuario_id: int) -> int:
+        """Sessões ativas do usuário em todos os workers"""
+        linha = conn.execute(
+            "SELECT COUNT(*) FROM sessoes WHERE usuario_id = ? AND revogada_em IS NULL AND expira_em > ?",
+            (usuario_id, time.time())
+        ).fetchone()
+        return linha[0]
+
+    def criar(self, conn, usuario_id: int, duracao: float) -> tuple:
+        """Grava uma sessão nova; retorna (sid, criada_em, expira_em) para incluir() após o commit"""
+        sid = secrets.token_hex(16)
+        criada_em = time.time()
+        expira_em = criada_em + duracao
+        conn.execute(
+            "INSERT INTO sessoes (id, usuario_id, criada_em, expira_em) VALUES (?, ?, ?, ?)",
+            (sid, usuario_id, criada_em, expira_em)
+        )
+        return sid, criada_em, expira_em
+
+    def revogar(self, conn, sid: str) -> bool:
+        """Marca a sessão como encerrada; remover([sid]) após o commit a derruba nas próximas requisições"""
+        cursor = conn.execute(
+            "UPDATE sessoes SET revogada_em = ? WHERE id = ? AND revogada_em IS NULL", (time.time(), sid)
+        )
+        return cursor.rowcount > 0
+
+    def revogar_usuario(self, conn, usuario_id: int) -> List[str]:
+        """Encerra todas as sessões ativas do usuário; retorna os sids para remover() após o commit"""
+        agora = time.time()
+        conn.execute(
+            "UPDATE sessoes SET revogada_em = ? WHERE usuario_id = ? AND revogada_em IS NULL AND expira_em > ?",
+            (agora, usuario_id, agora)
+        )
+        linhas = conn.execute(
+            "SELECT id FROM sessoes WHERE usuario_id = ? AND revogada_em = ?", (usuario_id, agora)
+        ).fetchall()
+        return [sid for sid, in linhas]
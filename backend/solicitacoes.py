@@ -0,0 +1,145 @@
+# Aprovação/rejeição de solicitações de matrícula em lote (app_sqlite.py)
+# Todo o lote roda em uma transação com instruções sobre conjuntos: um SELECT
+# classifica as solicitações, um INSERT ... SELECT cria os alunos, um UPDATE
+# marca as solicitações e outro INSERT ... SELECT cria as vinculações.
+# A capacidade da turma é conferida para o lote inteiro antes de gravar.
+from typing import List, Optional
+
+MAX_LOTE = 1000
+
+MOTIVO_NAO_ENCONTRADA = "Solicitação não encontrada"
+MOTIVO_PROCESSADA = "Solicitação já foi processada"
+MOTIVO_EMAIL = "Email do aluno já cadastrado"
+
+
+class LoteRecusado(Exception):
+    """O lote inteiro foi recusado (nada foi gravado)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _marcadores(valores) -> str:
+    return ", ".join("?" for _ in valores)
+
+
+def _classificar(conn, ids: List[int]):
+    """Separa as solicitações pendentes; as demais recebem o motivo da recusa"""
+    linhas = conn.execute(
+        f"SELECT id, status, email_aluno FROM solicitacoes_matricula WHERE id IN ({_marcadores(ids)})", ids
+    ).fetchall()
+    encontradas = {linha[0]: linha for linha in linhas}
+    pendentes, recusadas = [], {}
+    for solicitacao_id in ids:
+        linha = encontradas.get(solicitacao_id)
+        if linha is None:
+            recusadas[solicitacao_id] = MOTIVO_NAO_ENCONTRADA
+        elif linha[1] != "pendente":
+            recusadas[solicitacao_id] = MOTIVO_PROCESSADA
+        else:
+            pendentes.append(linha)
+    return pendentes, recusadas
+
+
+def _emails_em_uso(conn, pendentes) -> set:
+    """Solicitações cujo email já existe em alunos ou se repete no lote"""
+    emails = [linha[2] for linha in pendentes if linha[2]]
+    if not emails:
+        return set()
+    existentes = {
+        linha[0] for linha in
+        conn.execute(f"SELECT email FROM alunos WHERE email IN ({_marcadores(emails)})", emails).fetchall()
+    }
+    conflitos, vistos = set(), set()
+    for solicitacao_id, _, email in pendentes:
+        if email and (email in existentes or email in vistos):
+            conflitos.add(solicitacao_id)
+        vistos.add(email)
+    return conflitos
+
+
+def _verificar_capacidade(conn, turma_id: int, quantidade: int):
+    turma = conn.execute(
+        "SELECT capacidade, (SELECT COUNT(*) FROM alunos WHERE turma_id = t.id) FROM turmas t WHERE id = ?",
+        (turma_id,)
+    ).fetchone()
+    if turma is None:
+        raise LoteRecusado(404, "Turma não encontrada")
+    vagas = turma[0] - turma[1]
+    if quantidade > vagas:
+        raise LoteRecusado(422, f"Turma tem {max(vagas, 0)} vaga(s) para {quantidade} aprovação(ões)")
+
+
+def processar_lote(conn, acao: str, ids: List[int], turma_id: Optional[int] = None,
+                   resposta_admin: Optional[str] = None) -> dict:
+    """
+    Aprova ou rejeita as solicitações pendentes de ids (sem commit).
+    Retorna o resultado por item na ordem recebida; levanta LoteRecusado
+    se a turma não existir ou não comportar todas as aprovações.
+    """
+    ids = list(dict.fromkeys(ids))
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")  # Trava de escrita desde a leitura das solicitações
+
+    pendentes, recusadas = _classificar(conn, ids)
+    alunos_criados = {}
+
+    if acao == "rejeitar":
+        validas = [linha[0] for linha in pendentes]
+        if validas:
+            conn.execute(f"""
+                UPDATE solicitacoes_matricula
+                SET status = 'rejeitada', data_resposta = CURRENT_TIMESTAMP, resposta_admin = ?
+                WHERE id IN ({_marcadores(validas)})
+            """, [resposta_admin or "Solicitação rejeitada", *validas])
+    else:
+        conflitos = _emails_em_uso(conn, pendentes)
+        recusadas.update((solicitacao_id, MOTIVO_EMAIL) for solicitacao_id in conflitos)
+        validas = sorted(linha[0] for linha in pendentes if linha[0] not in conflitos)
+        if turma_id is not None:
+            _verificar_capacidade(conn, turma_id, len(validas))
+
+        if validas:
+            marcadores = _marcadores(validas)
+            # Os ids são atribuídos na ordem do SELECT, então ordenar os dois
+            # lados associa cada solicitação ao aluno criado a partir dela
+            criados = conn.execute(f"""
+                INSERT INTO alunos (nome, data_nascimento, email, status, turma_id)
+                SELECT nome_aluno, data_nascimento, email_aluno, 'ativo', ?
+                FROM solicitacoes_matricula WHERE id IN ({marcadores}) ORDER BY id
+                RETURNING id
+            """, [turma_id, *validas]).fetchall()
+            alunos_criados = dict(zip(validas, sorted(linha[0] for linha in criados)))
+
+            pares = ", ".join("(?, ?)" for _ in validas)
+            conn.execute(f"""
+                WITH criados(solicitacao_id, aluno_id) AS (VALUES {pares})
+                UPDATE solicitacoes_matricula
+                SET status = 'aprovada', data_resposta = CURRENT_TIMESTAMP, resposta_admin = ?,
+                    aluno_id = (SELECT aluno_id FROM criados WHERE solicitacao_id = solicitacoes_matricula.id)
+                WHERE id IN ({marcadores})
+            """, [*(v for par in alunos_criados.items() for v in par), resposta_admin or "Solicitação aprovada", *validas])
+
+            conn.execute(f"""
+                INSERT INTO vinculacoes (usuario_id, aluno_id, tipo_vinculo)
+                SELECT usuario_id, aluno_id, 'responsavel'
+                FROM solicitacoes_matricula WHERE id IN ({marcadores})
+            """, validas)
+
+    resultados = []
+    for solicitacao_id in ids:
+        if solicitacao_id in recusadas:
+            resultados.append({"id": solicitacao_id, "status": "erro", "motivo": recusadas[solicitacao_id]})
+        elif acao == "rejeitar":
+            resultados.append({"id": solicitacao_id, "status": "rejeitada"})
+        else:
+            resultados.append({"id": solicitacao_id, "status": "aprovada", "aluno_id": alunos_criados[solicitacao_id]})
+
+    return {
+        "acao": acao,
+        "processadas": len(ids) - len(recusadas),
+        "recusadas": len(recusadas),
+        "resultados": resultados,
+    }
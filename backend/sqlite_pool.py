@@ -0,0 +1,290 @@
+# Pool de conexões SQLite para o Sistema de Gestão Escolar
+# Mantém um número limitado de conexões abertas e já configuradas (WAL,
+# busy_timeout, cache), evitando abrir o arquivo e reler o schema a cada requisição.
+# No código async use acquire_async/release_async: a espera por vaga acontece
+# no event loop (semáforo do tamanho do pool) e não numa thread do DBExecutor.
+# Esperar dentro da thread prendia todas elas em acquire() sob carga, e quem já
+# tinha conexão não conseguia rodar a query nem devolvê-la até o timeout.
+import asyncio
+import contextvars
+import itertools
+import sqlite3
+import threading
+import time
+import traceback
+import weakref
+from contextlib import contextmanager
+
+# Configuração padrão aplicada a cada nova conexão
+PRAGMAS_PADRAO = {
+    "journal_mode": "WAL",      # Leitores não bloqueiam o escritor
+    "synchronous": "NORMAL",    # Seguro com WAL e bem mais rápido que FULL
+    "busy_timeout": 5000,       # ms esperando lock antes de falhar
+    "cache_size": -16000,       # Negativo = KiB (~16 MB de cache de páginas)
+    "mmap_size": 134217728,     # 128 MB de leitura via mmap
+    "temp_store": "MEMORY",
+}
+
+
+# Requisição HTTP dona das conexões retiradas no contexto atual (modo debug)
+requisicao_atual = contextvars.ContextVar("requisicao_atual", default=None)
+_ids_requisicao = itertools.count(1)
+
+
+class PoolEsgotado(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo limite"""
+
+
+class SQLitePool:
+    """Pool limitado de conexões SQLite com métricas de uso"""
+
+    def __init__(self, db_path: str, max_size: int = 8, timeout: float = 30.0,
+                 cached_statements: int = 256, pragmas: dict = None, debug: bool = False):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.pragmas = dict(PRAGMAS_PADRAO if pragmas is None else pragmas)
+        self.debug = debug
+
+        self._lock = threading.Condition()
+        self._livres = []
+        self._criadas = 0
+        self._fechado = False
+
+        # Métricas
+        self._em_uso = 0
+        self._checkouts = 0
+        self._esperas = 0
+        self._tempo_espera_total = 0.0
+        self._tempo_espera_max = 0.0
+        self._timeouts = 0
+
+        # Modo debug: id(conn) -> (requisição, instante, pilha da retirada)
+        self._rastreadas = {}
+        self._vazamentos = 0
+
+        # Vagas para acquire_async, um semáforo por event loop
+        self._vagas = weakref.WeakKeyDictionary()
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre uma conexão nova e aplica os PRAGMAs configurados"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.pragmas.get("busy_timeout", 5000) / 1000,
+            check_same_thread=False,  # A conexão circula entre threads do pool
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        for nome, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nome}={valor}")
+        return conn
+
+    def acquire(self, timeout: float = None) -> sqlite3.Connection:
+        """Retira uma conexão do pool, esperando se todas estiverem em uso"""
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.perf_counter()
+        esperou = False
+        criar = False
+
+        with self._lock:
+            while True:
+                if self._fechado:
+                    raise PoolEsgotado("Pool de conexões fechado")
+                if self._livres:
+                    conn = self._livres.pop()
+                    break
+                if self._criadas < self.max_size:
+                    self._criadas += 1
+                    conn = None
+                    criar = True
+                    break
+
+                esperou = True
+                restante = timeout - (time.perf_counter() - inicio)
+                if restante <= 0:
+                    self._timeouts += 1
+                    raise PoolEsgotado(
+                        f"Nenhuma conexão livre após {timeout:.1f}s "
+                        f"({self._em_uso}/{self.max_size} em uso)"
+                    )
+                self._lock.wait(restante)
+
+            self._em_uso += 1
+            self._checkouts += 1
+            if esperou:
+                self._registrar_espera(time.perf_counter() - inicio)
+
+        if criar:
+            # Abrir fora do lock para não serializar as outras threads
+            try:
+                conn = self._conectar()
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                    self._em_uso -= 1
+                    self._lock.notify()
+                raise
+
+        if self.debug:
+            pilha = "".join(traceback.format_stack(limit=12)[:-1])
+            with self._lock:
+                self._rastreadas[id(conn)] = (requisicao_atual.get(), time.monotonic(), pilha)
+        return conn
+
+    def _registrar_espera(self, espera: float):
+        """Métricas de espera (com o lock)"""
+        self._esperas += 1
+        self._tempo_espera_total += espera
+        self._tempo_espera_max = max(self._tempo_espera_max, espera)
+
+    def _vagas_do_loop(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            vagas = self._vagas.get(loop)
+            if vagas is None:
+                vagas = self._vagas[loop] = asyncio.Semaphore(self.max_size)
+            return vagas
+
+    async def acquire_async(self, executor) -> sqlite3.Connection:
+        """
+        acquire() para o event loop: espera a vaga sem ocupar uma thread do executor.
+        Devolva com release_async() no mesmo loop.
+        """
+        vagas = self._vagas_do_loop()
+        if vagas.locked():
+            inicio = time.perf_counter()
+            try:
+                await asyncio.wait_for(vagas.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._timeouts += 1
+                    em_uso = self._em_uso
+                raise PoolEsgotado(
+                    f"Nenhuma conexão livre após {self.timeout:.1f}s ({em_uso}/{self.max_size} em uso)"
+                ) from None
+            with self._lock:
+                self._registrar_espera(time.perf_counter() - inicio)
+        else:
+            await vagas.acquire()
+        # Só espera aqui se conexões síncronas (connection()) estiverem fora do pool
+        retirada = asyncio.ensure_future(executor.run(self.acquire))
+        try:
+            return await asyncio.shield(retirada)
+        except asyncio.CancelledError:
+            # A thread pode terminar o acquire depois do cancelamento: devolve quando terminar
+            def devolver(futuro):
+                if not futuro.cancelled() and futuro.exception() is None:
+                    self.release(futuro.result())
+                vagas.release()
+            retirada.add_done_callback(devolver)
+            raise
+        except BaseException:
+            vagas.release()
+            raise
+
+    async def release_async(self, conn: sqlite3.Connection, executor):
+        """Devolve uma conexão retirada com acquire_async()"""
+        try:
+            await executor.run(self.release, conn)
+        finally:
+            self._vagas_do_loop().release()
+
+    def release(self, conn: sqlite3.Connection):
+        """Devolve a conexão ao pool, descartando transações pendentes"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            reutilizar = True
+        except sqlite3.Error:
+            reutilizar = False
+
+        with self._lock:
+            self._rastreadas.pop(id(conn), None)
+            self._em_uso -= 1
+            if reutilizar and not self._fechado:
+                self._livres.append(conn)
+            else:
+                self._criadas -= 1
+                conn.close()
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Conexão do pool com commit em caso de sucesso e rollback em caso de erro"""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def stats(self) -> dict:
+        """Métricas atuais do pool"""
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "abertas": self._criadas,
+                "em_uso": self._em_uso,
+                "livres": len(self._livres),
+                "checkouts": self._checkouts,
+                "esperas": self._esperas,
+                "tempo_espera_total_ms": round(self._tempo_espera_total * 1000, 3),
+                "tempo_espera_max_ms": round(self._tempo_espera_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "debug": self.debug,
+                "vazamentos_detectados": self._vazamentos,
+            }
+
+    def verificar_vazamentos(self, requisicao) -> int:
+        """Registra as conexões da requisição que não foram devolvidas ao final dela"""
+        agora = time.monotonic()
+        with self._lock:
+            pendentes = [
+                (inicio, pilha) for dono, inicio, pilha in self._rastreadas.values()
+                if dono == requisicao
+            ]
+            self._vazamentos += len(pendentes)
+            abertas, em_uso = self._criadas, self._em_uso
+
+        for inicio, pilha in pendentes:
+            print(
+                f"⚠️ Conexão retida após o fim da requisição {requisicao} "
+                f"({agora - inicio:.3f}s, {em_uso}/{abertas} em uso). Retirada em:\n{pilha}"
+            )
+        return len(pendentes)
+
+    def close(self):
+        """Fecha as conexões livres; as em uso são fechadas ao serem devolvidas"""
+        with self._lock:
+            self._fechado = True
+            for conn in self._livres:
+                conn.close()
+            self._criadas -= len(self._livres)
+            self._livres.clear()
+            self._lock.notify_all()
+
+
+class RastreadorConexoes:
+    """Middleware ASGI (modo debug) que marca cada requisição e denuncia conexões retidas"""
+
+    def __init__(self, app, pool_factory):
+        self.app = app
+        self.pool_factory = pool_factory
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requisicao = f"{scope.get('method')} {scope.get('path')} #{next(_ids_requisicao)}"
+        token = requisicao_atual.set(requisicao)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            requisicao_atual.reset(token)
+            # As dependências com yield já terminaram aqui
+            self.pool_factory().verificar_vazamentos(requisicao)
@@ -0,0 +1,86 @@
+# Cache de tokens JWT já verificados (app_sqlite.py e app_final.py)
+# O painel dispara várias requisições paralelas com o mesmo token; em vez de
+# refazer jwt.decode (checagem da assinatura) em cada uma, o usuário extraído
+# do token fica guardado por um tempo curto, nunca além do "exp" do próprio token.
+# A chave é o SHA-256 do token, então o token em si não fica em memória.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+TAMANHO_PADRAO = int(os.getenv("ESCOLA_TOKEN_CACHE_TAMANHO", "1024"))
+TTL_PADRAO = float(os.getenv("ESCOLA_TOKEN_CACHE_TTL", "300"))
+
+
+class CacheTokens:
+    """LRU limitado de {digest do token: (usuário, expira_em)}"""
+
+    def __init__(self, tamanho: int = TAMANHO_PADRAO, ttl: float = TTL_PADRAO):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.descartados = 0  # Removidos por falta de espaço
+
+    @staticmethod
+    def _chave(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def obter(self, token: str, verificar: Callable[[str], Tuple[dict, Optional[float]]]) -> dict:
+        """
+        Retorna uma cópia do usuário do token. Em falha chama verificar(token),
+        que deve devolver (usuario, exp) ou levantar exceção (nada é guardado).
+        """
+        chave = self._chave(token)
+        agora = time.time()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                if item[1] > agora:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return dict(item[0])
+                del self._itens[chave]
+                self.expirados += 1
+            self.falhas += 1
+
+        usuario, exp = verificar(token)
+        expira_em = agora + self.ttl
+        if exp is not None:
+            expira_em = min(expira_em, float(exp))
+        if self.tamanho > 0 and expira_em > agora:
+            with self._lock:
+                self._itens[chave] = (usuario, expira_em)
+                self._itens.move_to_end(chave)
+                while len(self._itens) > self.tamanho:
+                    self._itens.popitem(last=False)
+                    self.descartados += 1
+        return dict(usuario)
+
+    def invalidar(self, token: str):
+        """Remove um token do cache (ex.: logout)"""
+        with self._lock:
+            self._itens.pop(self._chave(token), None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "tamanho": len(self._itens),
+                "tamanho_maximo": self.tamanho,
+                "ttl_segundos": self.ttl,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "expirados": self.expirados,
+                "descartados": self.descartados,
+                "taxa_acerto": round(self.acertos / consultas, 3) if consultas else 0.0,
+            }
@@ -108,7 +108,15 @@ class SistemaEscolar {
         });
     }
 
-    logout() {
+    async logout() {
+        // Encerra a sessão no servidor; o token deixa de valer mesmo se tiver sido copiado
+        if (this.token) {
+            try {
+                await this.fazerRequisicao('/logout', { method: 'POST' });
+            } catch (error) {
+                console.error('Erro ao encerrar sessão:', error);
+            }
+        }
         localStorage.removeItem('token');
         localStorage.removeItem('user');
         window.location.href = 'login.html';